@@ -2,17 +2,32 @@ from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import os
 import json
+import gzip
 from werkzeug.utils import secure_filename
 from PIL import Image
 import io
 import uuid
+import zipfile
 import base64
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timezone
 import shutil
+import tempfile
 import requests
 import time
-from urllib.parse import urlparse
+import random
+import socket
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait as wait_futures
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse, quote
+import migrations
+import image_processing
+from image_store import ImageStore, content_hash
+from sync_client import SyncClient
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
@@ -29,33 +44,69 @@ CORS(app,
     }
 )
 
+# 모든 응답에 공통으로 붙는 고정 헤더 (요청마다 새로 만들지 않음)
+COMMON_RESPONSE_HEADERS = {
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With, Accept, Origin',
+    'Access-Control-Expose-Headers': 'Content-Type, X-CSRFToken',
+    'Access-Control-Max-Age': '3600',
+    # 보안 헤더
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'SAMEORIGIN',
+    'X-XSS-Protection': '1; mode=block',
+    'Referrer-Policy': 'no-referrer',
+}
+
+# 캐시 정책 기본값 - 아래 CACHE_POLICIES에 없는 응답은 저장하지 않음
+NO_STORE_HEADERS = {
+    'Cache-Control': 'no-cache, no-store, must-revalidate',
+    'Pragma': 'no-cache',
+    'Expires': '0',
+}
+
+# 엔드포인트별 캐시 정책 (GET/HEAD의 200/304 응답에만 적용)
+# no-cache: 브라우저가 저장하되 매번 ETag/Last-Modified로 재검증
+CACHE_POLICIES = {
+    'get_menu': 'no-cache',
+    'get_categories': 'no-cache',
+    'update_category_order': 'no-cache',
+    # 같은 파일명으로 교체될 수 있으므로(logo.png 등) 내용 해시 ETag로 재검증
+    'serve_image': 'public, no-cache',
+    # 아이콘은 로고가 바뀔 때만 달라지므로 하루 동안 재검증 없이 사용
+    'favicon': 'public, max-age=86400',
+    'apple_touch_icon': 'public, max-age=86400',
+    'logo_icon': 'public, max-age=86400',
+    'web_manifest': 'public, no-cache',
+}
+
 # 모든 응답에 CORS 헤더 추가
 @app.after_request
 def after_request(response):
-    origin = request.headers.get('Origin')
-    if origin:
-        response.headers['Access-Control-Allow-Origin'] = origin
-    else:
-        response.headers['Access-Control-Allow-Origin'] = '*'
-    
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With, Accept, Origin'
-    response.headers['Access-Control-Expose-Headers'] = 'Content-Type, X-CSRFToken'
-    response.headers['Access-Control-Max-Age'] = '3600'
-    
-    # 캐시 방지 헤더 추가
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin') or '*'
+    response.headers.update(COMMON_RESPONSE_HEADERS)
     
-    # 보안 헤더 추가
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Referrer-Policy'] = 'no-referrer'
+    # 캐시 헤더 (라우트별 정책)
+    policy = CACHE_POLICIES.get(request.endpoint)
+    if policy and request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = policy
+        response.headers.pop('Pragma', None)
+        response.headers.pop('Expires', None)
+    else:
+        response.headers.update(NO_STORE_HEADERS)
     
     return response
 
+# 일괄 업로드가 아닌 요청은 본문을 읽기 전에 UPLOAD_MAX_BYTES로 제한
+# (MAX_CONTENT_LENGTH는 일괄 업로드 기준이라 더 큼)
+@app.before_request
+def limit_request_size():
+    if request.endpoint not in LARGE_BODY_ENDPOINTS and (request.content_length or 0) > UPLOAD_MAX_BYTES:
+        return jsonify({'error': f'요청 크기가 {UPLOAD_MAX_BYTES // (1024 * 1024)}MB를 넘습니다.'}), 413
+
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({'error': '요청 크기가 너무 큽니다.'}), 413
+
 # 설정
 UPLOAD_FOLDER = os.path.join('static', 'images')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -87,6 +138,7 @@ if os.environ.get('RENDER'):
             print(f"데이터베이스 폴더 생성: {DB_FOLDER}")
         
         DATABASE = os.path.join(DB_FOLDER, 'menu.db')
+        IMAGE_ROOT = os.path.join(RENDER_DISK_PATH, 'images')
         print(f"Render 환경 감지됨. 데이터베이스 경로: {DATABASE}")
         print(f"Render 디스크 경로 존재 여부: {os.path.exists(RENDER_DISK_PATH)}")
         print(f"데이터베이스 파일 경로 존재 여부: {os.path.exists(DATABASE)}")
@@ -114,147 +166,322 @@ else:
         os.makedirs(data_dir)
         print(f"로컬 데이터 디렉토리 생성: {data_dir}")
     DATABASE = os.path.join(data_dir, 'menu.db')
+    IMAGE_ROOT = os.path.join(data_dir, 'images')
     print(f"로컬 환경 감지됨. 데이터베이스 경로: {DATABASE}")
     
     # Render API URL 설정
     RENDER_API_URL = "https://bariosk.onrender.com"  # Render 서버 URL
     print(f"로컬 환경 감지됨. Render API URL: {RENDER_API_URL}")
 
-def get_db():
+# 변경을 보낼 동기화 대상 서버 (로컬 환경에서는 Render 서버, Render 서버 자신은 보내지 않음)
+SYNC_TARGET_URL = os.environ.get('SYNC_TARGET_URL') or (None if os.environ.get('RENDER') else RENDER_API_URL)
+# 동기화 요청 제한 시간, 대기열 확인 간격, 재시도 간격(지수 백오프)과 최대 시도 횟수
+SYNC_REQUEST_TIMEOUT = float(os.environ.get('SYNC_REQUEST_TIMEOUT', 10))
+SYNC_POLL_INTERVAL = float(os.environ.get('SYNC_POLL_INTERVAL', 2))
+SYNC_BACKOFF_BASE = float(os.environ.get('SYNC_BACKOFF_BASE', 2))
+SYNC_BACKOFF_MAX = float(os.environ.get('SYNC_BACKOFF_MAX', 300))
+SYNC_MAX_ATTEMPTS = int(os.environ.get('SYNC_MAX_ATTEMPTS', 20))
+# 변경 기록에 남기는 이 서버의 이름과, 동기화 대상 서버의 변경을 받아 오는 간격(초, 0이면 받지 않음)
+SYNC_NODE_ID = os.environ.get('SYNC_NODE_ID') or ('render' if os.environ.get('RENDER') else socket.gethostname())
+SYNC_PULL_INTERVAL = float(os.environ.get('SYNC_PULL_INTERVAL', 30))
+# GET /api/changes 한 번에 돌려주는 최대 변경 수, POST /api/changes 한 번에 받는 최대 변경 수
+CHANGE_PAGE_SIZE = int(os.environ.get('CHANGE_PAGE_SIZE', 500))
+CHANGE_BATCH_MAX = int(os.environ.get('CHANGE_BATCH_MAX', 2000))
+# 연속 편집(드래그 등)을 모아 한 번에 보내는 시간(초) - 이 시간 동안 같은 항목의 변경은 마지막 상태만 전송
+SYNC_COALESCE_WINDOW = float(os.environ.get('SYNC_COALESCE_WINDOW', 1.5))
+SYNC_COALESCE_MAX_ROWS = int(os.environ.get('SYNC_COALESCE_MAX_ROWS', 200))
+# 이미지 동기화 동시 다운로드 수와 이미지 하나의 다운로드 제한 시간(초)
+IMAGE_SYNC_WORKERS = int(os.environ.get('IMAGE_SYNC_WORKERS', 4))
+IMAGE_SYNC_TIMEOUT = float(os.environ.get('IMAGE_SYNC_TIMEOUT', 30))
+
+# 카테고리 순서를 바로 전달할 서버 목록 (요청을 받은 서버 자신은 제외하고 전송)
+SYNC_PEERS = [
+    peer.strip().rstrip('/')
+    for peer in os.environ.get(
+        'SYNC_PEERS', 'https://bariosk.onrender.com,http://localhost:3000,https://www.bariosk.com'
+    ).split(',')
+    if peer.strip()
+]
+# 서버별 요청 제한 시간, 전체 마감 시간, 동시 요청 수, 회로 차단 기준(연속 실패 횟수)과 대기 시간
+sync_client = SyncClient(
+    max_workers=int(os.environ.get('SYNC_FANOUT_WORKERS', 4)),
+    timeout=float(os.environ.get('SYNC_FANOUT_TIMEOUT', 8)),
+    deadline=float(os.environ.get('SYNC_FANOUT_DEADLINE', 10)),
+    failure_threshold=int(os.environ.get('SYNC_BREAKER_FAILURES', 3)),
+    reset_timeout=float(os.environ.get('SYNC_BREAKER_RESET', 30))
+)
+
+# 이미지 파일 저장소 (내용 주소 파일, images 테이블에는 메타데이터만 저장)
+IMAGE_ROOT = os.environ.get('IMAGE_ROOT', IMAGE_ROOT)
+image_store = ImageStore(IMAGE_ROOT)
+print(f"이미지 저장소 경로: {IMAGE_ROOT}")
+# 앞단 웹 서버(nginx/Apache 등)가 X-Sendfile을 처리하는 경우에만 켬
+# (꺼져 있으면 WSGI 서버의 file_wrapper가 sendfile로 전송)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# 크기별 이미지 변형 (가로 px) - ?w= 요청은 이 중 요청 이상인 가장 작은 값으로 맞춤
+IMAGE_VARIANT_WIDTHS = tuple(sorted(
+    int(width) for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '160,320,800').split(',') if width.strip()
+))
+
+# 이미지 인코딩 (형식: (PIL 형식, MIME 타입, 저장 옵션))
+IMAGE_ENCODINGS = {
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'avif': ('AVIF', 'image/avif', {'quality': 60}),
+}
+
+# 로고가 바뀔 때 미리 만들어 두는 아이콘 (이름: (가로, 형식)) - logo.png의 image_variants로 저장
+LOGO_ICONS = {
+    'favicon.ico': (48, 'ico'),  # 16/32/48px 포함
+    'apple-touch-icon.png': (180, 'png'),
+    'icon-192.png': (192, 'png'),
+    'icon-512.png': (512, 'png'),
+}
+ICON_MIME_TYPES = {'ico': 'image/x-icon', 'png': 'image/png'}
+
+# AVIF는 Pillow 11.2 미만에서는 pillow-avif-plugin이 설치된 경우에만 사용 가능
+try:
+    import pillow_avif
+except ImportError:
+    pass
+Image.init()
+
+# JPEG와 함께 저장하고 Accept 헤더로 고를 최신 형식 (작은 순서, 인코더가 있는 것만)
+MODERN_IMAGE_FORMATS = [
+    fmt for fmt in ('avif', 'webp') if IMAGE_ENCODINGS[fmt][0] in Image.SAVE
+]
+print(f"이미지 최신 형식 지원: {MODERN_IMAGE_FORMATS}")
+
+# 이미지 바이트 메모리 캐시 용량 (MB, 워커 프로세스마다 따로 사용)
+IMAGE_CACHE_MB = float(os.environ.get('IMAGE_CACHE_MB', 32))
+
+# 없는 이미지 파일명을 기억하는 시간(초)과 최대 개수 - 그동안은 DB를 조회하지 않음
+MISSING_IMAGE_TTL = float(os.environ.get('MISSING_IMAGE_TTL', 60))
+MISSING_IMAGE_CACHE_SIZE = int(os.environ.get('MISSING_IMAGE_CACHE_SIZE', 4096))
+
+# 업로드 이미지 최대 크기 (이보다 크면 비율을 유지하며 축소)
+UPLOAD_IMAGE_MAX_SIZE = (800, 800)
+
+def _available_cpus():
     try:
-        # 데이터베이스 디렉토리 확인 및 생성
-        db_dir = os.path.dirname(DATABASE)
-        if not os.path.exists(db_dir):
-            try:
-                os.makedirs(db_dir)
-                print(f"데이터베이스 디렉토리 생성: {db_dir}")
-            except Exception as e:
-                print(f"데이터베이스 디렉토리 생성 실패: {str(e)}")
-                raise
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# 업로드 이미지 처리 프로세스 수 - 워커 프로세스마다 처음 업로드할 때 따로 만들어지므로
+# 기본값은 사용 가능한 코어의 절반 (0이면 풀 없이 요청 스레드에서 바로 처리)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', max(1, _available_cpus() // 2)))
+# 이 시간(초)이 지나도 pending인 작업은 실패로 보고 (처리하던 워커가 재시작된 경우 등)
+IMAGE_JOB_TIMEOUT = float(os.environ.get('IMAGE_JOB_TIMEOUT', 300))
+# 상태 조회(?wait=)에서 처리 완료를 기다리는 최대 시간(초)
+IMAGE_JOB_MAX_WAIT = float(os.environ.get('IMAGE_JOB_MAX_WAIT', 10))
+
+# 일괄 업로드 제한 - 파일 수, (zip은 압축 해제 후) 전체 크기, 처리 대기 시간(초)
+BATCH_UPLOAD_MAX_FILES = int(os.environ.get('BATCH_UPLOAD_MAX_FILES', 300))
+BATCH_UPLOAD_MAX_BYTES = int(os.environ.get('BATCH_UPLOAD_MAX_BYTES', 200 * 1024 * 1024))
+BATCH_UPLOAD_TIMEOUT = float(os.environ.get('BATCH_UPLOAD_TIMEOUT', 300))
+
+# 업로드 크기 제한 - 요청(일괄 업로드 제외)/파일 하나의 최대 크기와 디코딩할 수 있는 최대 픽셀 수
+UPLOAD_MAX_BYTES = int(float(os.environ.get('UPLOAD_MAX_MB', 20)) * 1024 * 1024)
+UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 40 * 1000 * 1000))
+# 이보다 큰 업로드 파일은 메모리 대신 임시 파일에 받아 처리 프로세스에 경로로 넘김
+UPLOAD_SPOOL_THRESHOLD = int(float(os.environ.get('UPLOAD_SPOOL_THRESHOLD_KB', 1024)) * 1024)
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR') or tempfile.gettempdir()
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# 요청 본문 최대 크기 (일괄 업로드가 가장 크므로 그 값 - 다른 요청은 limit_request_size에서 확인)
+app.config['MAX_CONTENT_LENGTH'] = max(UPLOAD_MAX_BYTES, BATCH_UPLOAD_MAX_BYTES)
+# 본문 전체 크기 제한을 따로 받는 엔드포인트
+LARGE_BODY_ENDPOINTS = {'upload_images'}
+
+# 커넥션 풀 설정
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 8192))
+DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024))
+# 유휴 시간이 이보다 긴 연결은 다시 꺼낼 때 상태를 확인
+DB_HEALTH_CHECK_IDLE = float(os.environ.get('DB_HEALTH_CHECK_IDLE', 30))
+
+class PooledConnection:
+    """풀에서 빌려준 sqlite3 연결 래퍼.
+
+    close()는 실제로 연결을 닫지 않고 풀에 반납한다. ``with get_db() as db:``
+    형태로 사용하면 블록 종료 시 커밋/롤백 후 반납된다.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
 
-        # 데이터베이스 연결 시도
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("이미 풀에 반납된 연결입니다.")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
         try:
-            db = sqlite3.connect(DATABASE)
-            db.row_factory = sqlite3.Row
-            print("데이터베이스 연결 성공")
-            return db
-        except Exception as e:
-            print(f"데이터베이스 연결 실패: {str(e)}")
+            self._conn.__exit__(exc_type, exc_value, tb)
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        conn = self.__dict__.get('_conn')
+        if conn is not None:
+            self._conn = None
+            self._pool.release(conn)
+
+    def __del__(self):
+        # close()를 호출하지 않은 핸들러가 있어도 풀 슬롯이 새지 않도록 반납
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """프로세스(워커)별로 재사용하는 크기 제한 SQLite 커넥션 풀"""
+
+    def __init__(self, database, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._created = 0
+        self._pid = os.getpid()
+
+        # 데이터베이스 디렉토리는 풀 생성 시 한 번만 확인
+        db_dir = os.path.dirname(database)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+            print(f"데이터베이스 디렉토리 생성: {db_dir}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # 연결 생성 시 한 번만 PRAGMA 설정
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+        conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        with self._lock:
+            self._created += 1
+        print(f"새 데이터베이스 연결 생성 (총 {self._created}개)")
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error as e:
+            print(f"데이터베이스 연결 상태 확인 실패: {str(e)}")
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f"데이터베이스 커넥션 풀 대기 시간 초과 ({self.size}개 사용 중)")
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    return self._connect()
+                conn, idle_since = entry
+                if time.monotonic() - idle_since < DB_HEALTH_CHECK_IDLE or self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
             raise
-        
+
+    def release(self, conn):
+        try:
+            # 커밋되지 않은 트랜잭션이 남아 있으면 롤백 후 반납
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        except sqlite3.Error as e:
+            print(f"데이터베이스 연결 반납 실패, 연결 폐기: {str(e)}")
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def health_check(self):
+        conn = self.acquire()
+        try:
+            healthy = self._is_healthy(conn)
+            journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        finally:
+            self.release(conn)
+        with self._lock:
+            idle = len(self._idle)
+            created = self._created
+        return {
+            'healthy': healthy,
+            'journal_mode': journal_mode,
+            'pool_size': self.size,
+            'connections': created,
+            'idle': idle,
+            'in_use': created - idle
+        }
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    global _db_pool
+    pool = _db_pool
+    # gunicorn 워커 fork 이후에는 부모 프로세스의 연결을 공유하지 않고 새 풀을 생성
+    if pool is None or pool._pid != os.getpid():
+        with _db_pool_lock:
+            if _db_pool is None or _db_pool._pid != os.getpid():
+                _db_pool = ConnectionPool(DATABASE)
+            pool = _db_pool
+    return pool
+
+def get_db():
+    try:
+        pool = get_db_pool()
+        return PooledConnection(pool, pool.acquire())
     except Exception as e:
         print(f"데이터베이스 연결 실패: {str(e)}")
         raise
 
 def init_db():
+    """스키마 마이그레이션 실행 (앱 시작 시 한 번)"""
     try:
-        # 데이터베이스 파일이 있는지 확인
-        db_exists = os.path.exists(DATABASE)
-        print(f"데이터베이스 파일 존재 여부: {db_exists}")
-        
-        # 데이터베이스 연결
+        print(f"데이터베이스 파일 존재 여부: {os.path.exists(DATABASE)}")
         conn = get_db()
-        
-        # 메뉴 테이블 생성 (order_index 필드 추가)
-        conn.execute('''
-                CREATE TABLE IF NOT EXISTS menu (
-                    id INTEGER PRIMARY KEY,
-                    category TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    price TEXT NOT NULL,
-                    image TEXT NOT NULL,
-                    temperature TEXT,
-                    order_index INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-        # 이미지 테이블 생성
-        conn.execute('''
-                CREATE TABLE IF NOT EXISTS images (
-                    filename TEXT PRIMARY KEY,
-                    data BLOB NOT NULL,
-                    content_type TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-        # 카테고리 순서 전용 테이블 생성
-        conn.execute('''
-                CREATE TABLE IF NOT EXISTS category_order (
-                    id INTEGER PRIMARY KEY,
-                    category TEXT NOT NULL,
-                    order_index INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(category)
-                )
-            ''')
-            
-        conn.commit()
-        print("테이블 생성 성공")
-        
-        # 테이블 구조 확인 및 필요시 업데이트
-        update_schema(conn)
-
-        # 테이블에 데이터가 있는지 확인
-        cursor = conn.execute('SELECT COUNT(*) FROM menu')
-        count = cursor.fetchone()[0]
-        print(f"현재 데이터베이스의 메뉴 수: {count}")
-            
-        # 데이터가 없을 때만 초기 데이터 삽입
-        if count == 0:
-            print("데이터베이스가 비어있어 초기 데이터를 삽입합니다.")
-            initial_data = {
-                "coffee": [
-                    {
-                        "id": 1,
-                        "name": "아메리카노",
-                        "price": "2000",
-                        "image": "logo.png",
-                        "temperature": "H",
-                        "order_index": 0
-                    },
-                    {
-                        "id": 2,
-                        "name": "카페라떼",
-                        "price": "2500",
-                        "image": "logo.png",
-                        "temperature": "H",
-                        "order_index": 1
-                    }
-                ]
-            }
-                
-            # 초기 데이터 저장
-            for category, items in initial_data.items():
-                # 카테고리 순서 저장
-                try:
-                    conn.execute(
-                        'INSERT INTO category_order (category, order_index) VALUES (?, ?)',
-                        (category, 0)
-                    )
-                    print(f"카테고리 '{category}' 순서 저장 완료")
-                except Exception as e:
-                    print(f"카테고리 순서 저장 중 오류: {str(e)}")
-                    
-                for item in items:
-                    try:
-                        conn.execute(
-                            'INSERT INTO menu (id, category, name, price, image, temperature, order_index) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                            (item['id'], category, item['name'], str(item['price']), item['image'], item.get('temperature', ''), item.get('order_index', 0))
-                        )
-                        print(f"초기 메뉴 항목 저장 성공: {item['name']}")
-                    except Exception as e:
-                        print(f"초기 메뉴 항목 저장 실패: {str(e)}")
-                        continue
-            
-            conn.commit()
-            print("초기 데이터 삽입 완료")
-        else:
-            print("기존 데이터가 있어 초기화를 건너뜁니다.")
-            
-        conn.close()
-        print("데이터베이스 초기화 성공")
+        try:
+            version = migrations.migrate(conn, {'image_root': IMAGE_ROOT})
+        finally:
+            conn.close()
+        print(f"데이터베이스 초기화 성공 (스키마 버전: {version})")
+        return version
     except Exception as e:
         print(f"데이터베이스 초기화 실패: {str(e)}")
         import traceback
@@ -262,161 +489,506 @@ def init_db():
         print(traceback.format_exc())
         raise
 
-# 데이터베이스 스키마 업데이트 함수
-def update_schema(conn):
+# 데이터베이스 초기화 (워커 시작 시 한 번, 요청 경로에서는 스키마를 확인하지 않음)
+with app.app_context():
     try:
-        print("=== 데이터베이스 스키마 확인 시작 ===")
-        cursor = conn.cursor()
-        
-        # 테이블 존재 여부 확인
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='category_order'")
-        if not cursor.fetchone():
-            print("category_order 테이블이 존재하지 않아 생성합니다.")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS category_order (
-                    id INTEGER PRIMARY KEY,
-                    category TEXT NOT NULL,
-                    order_index INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(category)
-                )
-            ''')
-            conn.commit()
-            print("category_order 테이블 생성 완료")
-            
-            # 기존 카테고리 정보를 새 테이블에 추가
-            cursor.execute("SELECT DISTINCT category FROM menu ORDER BY category")
-            categories = cursor.fetchall()
-            
-            for idx, cat in enumerate(categories):
-                category = cat['category']
-                cursor.execute(
-                    "INSERT INTO category_order (category, order_index) VALUES (?, ?)",
-                    (category, idx)
-                )
-            
-            conn.commit()
-            print(f"{len(categories)}개 카테고리를 category_order 테이블에 추가 완료")
-        
-        # 현재 테이블의 칼럼 정보 가져오기
-        cursor.execute("PRAGMA table_info(menu)")
-        columns = cursor.fetchall()
-        column_names = [col['name'] for col in columns]
-        print(f"현재 테이블 칼럼: {column_names}")
-        
-        # order_index 칼럼이 없는 경우 추가
-        if 'order_index' not in column_names:
-            print("order_index 칼럼이 없어 추가합니다.")
-            cursor.execute("ALTER TABLE menu ADD COLUMN order_index INTEGER DEFAULT 0")
-            conn.commit()
-            print("order_index 칼럼 추가 완료")
-            
-            # 모든 레코드의 order_index 값을 업데이트
-            cursor.execute("SELECT id, category FROM menu ORDER BY id")
-            items = cursor.fetchall()
-            
-            # 카테고리별로 정렬하여 order_index 설정
-            category_indices = {}
-            for item in items:
-                category = item['category']
-                if category not in category_indices:
-                    category_indices[category] = 0
-                
-                cursor.execute(
-                    "UPDATE menu SET order_index = ? WHERE id = ?", 
-                    (category_indices[category], item['id'])
-                )
-                category_indices[category] += 1
-            
-            conn.commit()
-            print("order_index 값 업데이트 완료")
-        
-        print("=== 데이터베이스 스키마 확인 완료 ===")
+        init_db()
     except Exception as e:
-        print(f"데이터베이스 스키마 업데이트 실패: {str(e)}")
+        print(f"앱 시작 시 데이터베이스 초기화 실패: {str(e)}")
         import traceback
         print("상세 오류:")
         print(traceback.format_exc())
-        raise
 
-# 데이터베이스 초기화 및 테이블 확인
-def ensure_db():
-    try:
-        # 데이터베이스 파일이 없으면 초기화
-        if not os.path.exists(DATABASE):
-            print(f"데이터베이스 파일이 존재하지 않습니다: {DATABASE}")
-            init_db()
+# 정렬 키 간격: 항목 하나를 옮길 때 이웃 사이의 중간값을 사용하고,
+# 간격이 모두 소진된 경우에만 해당 그룹 전체를 다시 배치한다.
+ORDER_GAP = migrations.ORDER_GAP
+
+def _longest_increasing_ids(ordered_ids, keys):
+    """새 순서에서 기존 키가 이미 증가 순서인 가장 긴 id 집합 (그대로 둘 항목)"""
+    tails = []      # 길이별 마지막 위치
+    parents = {}
+    positions = [i for i, item_id in enumerate(ordered_ids) if keys.get(item_id) is not None]
+    for pos in positions:
+        key = keys[ordered_ids[pos]]
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[ordered_ids[tails[mid]]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        parents[pos] = tails[lo - 1] if lo > 0 else None
+        if lo == len(tails):
+            tails.append(pos)
         else:
-            print(f"데이터베이스 파일이 존재합니다: {DATABASE}")
-            # 파일 크기 확인
-            file_size = os.path.getsize(DATABASE)
-            print(f"데이터베이스 파일 크기: {file_size} bytes")
+            tails[lo] = pos
+    keep = set()
+    pos = tails[-1] if tails else None
+    while pos is not None:
+        keep.add(ordered_ids[pos])
+        pos = parents[pos]
+    return keep
+
+def plan_order_keys(ordered_ids, keys, floor=0):
+    """ordered_ids 순서가 되도록 새 정렬 키가 필요한 항목만 {id: 새 키}로 반환
+
+    keys는 현재 {id: 키}이며 새 항목은 없어도 된다. 이미 상대 순서가 맞는
+    항목은 건드리지 않으므로 한 항목 이동은 한 행만 변경된다.
+    """
+    keep = _longest_increasing_ids(ordered_ids, keys)
+    result = {}
+    prev_key = None
+    i = 0
+    while i < len(ordered_ids):
+        if ordered_ids[i] in keep:
+            prev_key = keys[ordered_ids[i]]
+            i += 1
+            continue
+        # 연속으로 다시 배치할 구간 [i, j)
+        j = i
+        while j < len(ordered_ids) and ordered_ids[j] not in keep:
+            j += 1
+        count = j - i
+        lo = prev_key if prev_key is not None else floor
+        hi = keys[ordered_ids[j]] if j < len(ordered_ids) else None
+        if hi is None:
+            hi = lo + (count + 1) * ORDER_GAP
+        step = (hi - lo) // (count + 1)
+        if step < 1:
+            # 간격 소진 - 전체 재배치
+            return rebalance_order_keys(ordered_ids, keys, floor)
+        for offset in range(count):
+            result[ordered_ids[i + offset]] = lo + step * (offset + 1)
+        prev_key = result[ordered_ids[j - 1]]
+        i = j
+    return result
+
+def rebalance_order_keys(ordered_ids, keys, floor=0):
+    """모든 항목을 ORDER_GAP 간격으로 다시 배치 (값이 바뀌는 항목만 반환)"""
+    result = {}
+    for index, item_id in enumerate(ordered_ids):
+        key = floor + (index + 1) * ORDER_GAP
+        if keys.get(item_id) != key:
+            result[item_id] = key
+    return result
+
+def key_between(lo, hi, floor=0):
+    """두 이웃 키 사이의 새 키 (자리가 없으면 None)"""
+    lo = floor if lo is None else lo
+    if hi is None:
+        return lo + ORDER_GAP
+    key = (lo + hi) // 2
+    return key if lo < key < hi else None
+
+def get_menu_version(conn):
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'menu_version'").fetchone()
+    return row[0] if row else 0
+
+def get_images_version(conn):
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'images_version'").fetchone()
+    return row[0] if row else 0
+
+def bump_menu_version(conn):
+    """메뉴 데이터 버전 증가 (호출한 쪽의 트랜잭션 안에서 실행) 후 새 버전 반환"""
+    conn.execute(
+        "UPDATE app_meta SET value = value + 1, updated_at = ? WHERE key = 'menu_version'",
+        (time.time(),)
+    )
+    return get_menu_version(conn)
+
+def is_reorder_payload(data):
+    """{카테고리: [id, id, ...]} 형태의 순서 전용 요청인지 확인
+
+    모든 목록이 비어 있으면 전체 저장(카테고리 비우기)과 구분할 수 없으므로
+    id가 하나 이상 있을 때만 순서 전용 요청으로 본다.
+    """
+    return bool(data) and isinstance(data, dict) and all(
+        isinstance(ids, list) and all(not isinstance(item_id, dict) for item_id in ids)
+        for ids in data.values()
+    ) and any(data.values())
+
+def get_category_id(conn, name):
+    row = conn.execute('SELECT id FROM categories WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+def ensure_category(conn, name):
+    """카테고리 id 반환 (없으면 맨 뒤에 추가)"""
+    category_id = get_category_id(conn, name)
+    if category_id is None:
+        max_order = conn.execute('SELECT MAX(order_index) FROM categories').fetchone()[0]
+        cursor = conn.execute(
+            'INSERT INTO categories (name, order_index) VALUES (?, ?)',
+            (name, key_between(max_order, None))
+        )
+        category_id = cursor.lastrowid
+        print(f"새 카테고리 추가: {name}")
+    return category_id
+
+def reorder_menu_items(order):
+    """카테고리별 id 목록 순서대로 order_index만 갱신하고 (변경 수, 새 버전) 반환"""
+    with get_db() as db:
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            # id -> (카테고리 id, 현재 order_index) 색인
+            cursor = db.execute('SELECT id, category_id, order_index FROM menu')
+            rows = {row['id']: (row['category_id'], row['order_index']) for row in cursor}
+            category_ids = {row['name']: row['id'] for row in db.execute('SELECT id, name FROM categories')}
+            
+            updates = []
+            seen_ids = set()
+            for category, ids in order.items():
+                category_id = category_ids.get(category)
+                if category_id is None:
+                    raise ValueError(f"존재하지 않는 카테고리입니다: {category}")
+                ordered_ids = []
+                for item_id in ids:
+                    try:
+                        item_id = int(item_id)
+                    except (TypeError, ValueError):
+                        raise ValueError(f"잘못된 메뉴 ID입니다: {item_id}")
+                    if item_id in seen_ids:
+                        raise ValueError(f"중복된 메뉴 ID입니다: {item_id}")
+                    seen_ids.add(item_id)
+                    
+                    row = rows.get(item_id)
+                    if row is None:
+                        raise ValueError(f"메뉴를 찾을 수 없습니다: {item_id}")
+                    if row[0] != category_id:
+                        raise ValueError(f"메뉴 {item_id}는 '{category}' 카테고리에 없습니다.")
+                    ordered_ids.append(item_id)
+                
+                # 목록에 없는 같은 카테고리 메뉴는 기존 순서대로 뒤에 유지
+                # (빠진 항목의 키도 함께 계획해야 새 키와 겹치지 않음)
+                listed = set(ordered_ids)
+                ordered_ids.extend(sorted(
+                    (item_id for item_id, row in rows.items() if row[0] == category_id and item_id not in listed),
+                    key=lambda item_id: (rows[item_id][1], item_id)
+                ))
+                
+                # 상대 순서가 바뀐 항목만 새 정렬 키 부여
+                keys = {item_id: rows[item_id][1] for item_id in ordered_ids}
+                updates.extend(
+                    (key, item_id) for item_id, key in plan_order_keys(ordered_ids, keys).items()
+                )
             
-            # 테이블 존재 여부 확인
-            conn = get_db()
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='menu'")
-            if not cursor.fetchone():
-                print("menu 테이블이 존재하지 않습니다. 초기화를 진행합니다.")
-                conn.close()
-                init_db()
+            if updates:
+                db.executemany('UPDATE menu SET order_index = ? WHERE id = ?', updates)
+                version = bump_menu_version(db)
+                log_changes(db, [menu_change(db, item_id, {'order_index': key}) for key, item_id in updates])
             else:
-                # 테이블은 있지만 스키마 업데이트 확인
-                print("기존 데이터베이스 스키마 업데이트 확인")
-                update_schema(conn)
-                conn.close()
-    except Exception as e:
-        print(f"데이터베이스 확인 중 오류 발생: {str(e)}")
-        import traceback
-        print("상세 오류:")
-        print(traceback.format_exc())
+                version = get_menu_version(db)
+            db.commit()
+            if updates:
+                refresh_menu_snapshot(db)
+                sync_worker.wake()
+            print(f"메뉴 순서 변경: {len(updates)}개 항목, 버전 {version}")
+            return len(updates), version
+        except Exception:
+            db.rollback()
+            raise
 
-# 데이터베이스 초기화
-with app.app_context():
+def move_menu_item(menu_id, before=None, after=None):
+    """메뉴 하나를 같은 카테고리의 다른 메뉴 앞/뒤로 이동하고 (변경 수, 새 버전) 반환"""
+    with get_db() as db:
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT category_id, order_index FROM menu WHERE id = ?', (menu_id,)).fetchone()
+            if row is None:
+                raise LookupError('메뉴를 찾을 수 없습니다.')
+            category_id = row['category_id']
+            anchor_id = before if before is not None else after
+            anchor = db.execute(
+                'SELECT order_index FROM menu WHERE id = ? AND category_id = ?',
+                (anchor_id, category_id)
+            ).fetchone()
+            if anchor is None or anchor_id == menu_id:
+                raise ValueError(f"같은 카테고리에서 기준 메뉴를 찾을 수 없습니다: {anchor_id}")
+            
+            # 기준 메뉴의 바로 이웃 키 조회
+            if before is not None:
+                hi = anchor['order_index']
+                lo = db.execute("""
+                    SELECT MAX(order_index) FROM menu
+                    WHERE category_id = ? AND order_index < ? AND id != ?
+                """, (category_id, hi, menu_id)).fetchone()[0]
+            else:
+                lo = anchor['order_index']
+                hi = db.execute("""
+                    SELECT MIN(order_index) FROM menu
+                    WHERE category_id = ? AND order_index > ? AND id != ?
+                """, (category_id, lo, menu_id)).fetchone()[0]
+            
+            key = key_between(lo, hi)
+            if key is not None:
+                updates = [(key, menu_id)]
+            else:
+                # 간격 소진 - 해당 카테고리만 다시 배치
+                print(f"카테고리 {category_id} 정렬 키 재배치")
+                cursor = db.execute("""
+                    SELECT id, order_index FROM menu
+                    WHERE category_id = ?
+                    ORDER BY order_index, id
+                """, (category_id,))
+                keys = {r['id']: r['order_index'] for r in cursor}
+                ordered_ids = [item_id for item_id in keys if item_id != menu_id]
+                position = ordered_ids.index(anchor_id) + (0 if before is not None else 1)
+                ordered_ids.insert(position, menu_id)
+                updates = [(k, item_id) for item_id, k in rebalance_order_keys(ordered_ids, keys).items()]
+            
+            db.executemany('UPDATE menu SET order_index = ? WHERE id = ?', updates)
+            version = bump_menu_version(db)
+            log_changes(db, [menu_change(db, item_id, {'order_index': k}) for k, item_id in updates])
+            db.commit()
+            refresh_menu_snapshot(db)
+            sync_worker.wake()
+            return len(updates), version
+        except Exception:
+            db.rollback()
+            raise
+
+def move_category(category_name, before=None, after=None):
+    """카테고리 하나를 다른 카테고리 앞/뒤로 이동하고 (변경 수, 새 버전) 반환"""
+    with get_db() as db:
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            category_id = get_category_id(db, category_name)
+            if category_id is None:
+                raise LookupError('존재하지 않는 카테고리입니다.')
+            anchor_name = before if before is not None else after
+            anchor = db.execute(
+                'SELECT id, order_index FROM categories WHERE name = ?', (anchor_name,)
+            ).fetchone()
+            if anchor is None or anchor['id'] == category_id:
+                raise ValueError(f"기준 카테고리를 찾을 수 없습니다: {anchor_name}")
+            
+            if before is not None:
+                hi = anchor['order_index']
+                lo = db.execute(
+                    'SELECT MAX(order_index) FROM categories WHERE order_index < ? AND id != ?',
+                    (hi, category_id)
+                ).fetchone()[0]
+            else:
+                lo = anchor['order_index']
+                hi = db.execute(
+                    'SELECT MIN(order_index) FROM categories WHERE order_index > ? AND id != ?',
+                    (lo, category_id)
+                ).fetchone()[0]
+            
+            key = key_between(lo, hi)
+            if key is not None:
+                updates = [(key, category_id)]
+            else:
+                print("카테고리 정렬 키 재배치")
+                cursor = db.execute('SELECT id, order_index FROM categories ORDER BY order_index, id')
+                keys = {r['id']: r['order_index'] for r in cursor}
+                ordered_ids = [item_id for item_id in keys if item_id != category_id]
+                position = ordered_ids.index(anchor['id']) + (0 if before is not None else 1)
+                ordered_ids.insert(position, category_id)
+                updates = [(k, item_id) for item_id, k in rebalance_order_keys(ordered_ids, keys).items()]
+            
+            db.executemany('UPDATE categories SET order_index = ? WHERE id = ?', updates)
+            version = bump_menu_version(db)
+            names = {
+                item_id: db.execute('SELECT name FROM categories WHERE id = ?', (item_id,)).fetchone()[0]
+                for _, item_id in updates
+            }
+            log_changes(db, [category_change(db, names[item_id], k) for k, item_id in updates])
+            db.commit()
+            refresh_menu_snapshot(db)
+            sync_worker.wake()
+            return len(updates), version
+        except Exception:
+            db.rollback()
+            raise
+
+# 메뉴 스냅샷 - 전체 메뉴와 카테고리 순서를 데이터 버전과 함께 메모리에 보관
+#
+# 스냅샷은 만든 뒤 수정하지 않는다. 쓰기 요청이 app_meta의 menu_version을
+# 올리면 새 스냅샷을 만들어 통째로 교체하고, 읽기 요청은 버전(기본 키 조회)만
+# 확인한 뒤 메모리의 스냅샷을 그대로 사용한다. (다른 워커 프로세스의 쓰기도
+# 버전으로 감지된다.)
+_menu_snapshot = None
+_menu_snapshot_lock = threading.Lock()
+
+class MenuSnapshot:
+    """특정 데이터 버전의 메뉴/카테고리 순서 (읽기 전용으로 취급)"""
+    __slots__ = ('version', 'updated_at', 'menu', 'categories')
+
+    def __init__(self, version, updated_at, menu):
+        self.version = version
+        self.updated_at = updated_at
+        self.menu = menu  # {카테고리: [메뉴, ...]} - 카테고리 순서대로
+        self.categories = tuple(menu)
+
+def build_menu_snapshot(conn):
+    """버전과 메뉴를 같은 읽기 트랜잭션에서 조회하여 스냅샷 생성"""
+    conn.execute('BEGIN')
     try:
-        ensure_db()
+        row = conn.execute(
+            "SELECT value, updated_at FROM app_meta WHERE key = 'menu_version'"
+        ).fetchone()
+        cursor = conn.execute('''
+            SELECT c.name AS category, m.id, m.name, m.price, m.image, m.temperature, m.order_index
+            FROM categories c
+            LEFT JOIN menu m ON m.category_id = c.id
+            ORDER BY c.order_index, c.id, m.order_index, m.id
+        ''')
+        menu = {}
+        for item in cursor:
+            items = menu.setdefault(item['category'], [])
+            if item['id'] is None:
+                continue
+            items.append({
+                'id': item['id'],
+                'name': item['name'],
+                'price': item['price'],
+                'image': item['image'],
+                'temperature': item['temperature'],
+                'order_index': item['order_index']
+            })
+    finally:
+        conn.rollback()
+    return MenuSnapshot(row['value'] if row else 0, row['updated_at'] if row else time.time(), menu)
+
+def get_menu_snapshot(conn=None):
+    """현재 데이터 버전의 메뉴 스냅샷 반환 (버전이 바뀌었으면 다시 생성)"""
+    global _menu_snapshot
+    if conn is None:
+        with get_db() as conn:
+            return get_menu_snapshot(conn)
+
+    version = get_menu_version(conn)
+    snapshot = _menu_snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _menu_snapshot_lock:
+        # 잠금을 기다리는 동안 다른 스레드가 이미 만들었을 수 있음
+        snapshot = _menu_snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = build_menu_snapshot(conn)
+            print(f"메뉴 스냅샷 생성: 버전 {snapshot.version}, 카테고리 {len(snapshot.categories)}개")
+            _menu_snapshot = snapshot
+        return snapshot
+
+def refresh_menu_snapshot(conn=None):
+    """쓰기 커밋 후 호출 - 다음 읽기 요청이 기다리지 않도록 새 스냅샷을 미리 생성"""
+    try:
+        return get_menu_snapshot(conn)
     except Exception as e:
-        print(f"앱 시작 시 데이터베이스 초기화 실패: {str(e)}")
-        import traceback
-        print("상세 오류:")
-        print(traceback.format_exc())
+        # 스냅샷 생성 실패는 쓰기 결과에 영향 없음 (다음 읽기에서 다시 시도)
+        print(f"메뉴 스냅샷 갱신 실패: {str(e)}")
+        return None
+
+# 응답 캐시 - 읽기 API의 JSON 응답을 인코딩된 바이트(원본 + gzip)로 보관
+#
+# 항목은 (엔드포인트, 메뉴 데이터 버전)으로 구분된다. 쓰기 요청이 버전을
+# 올리면 다음 읽기에서 한 번만 다시 인코딩하고, 그 전까지는 저장된 바이트를
+# 그대로 응답한다.
+JSON_GZIP_LEVEL = int(os.environ.get('JSON_GZIP_LEVEL', 6))
+
+class CachedResponse:
+    __slots__ = ('version', 'body', 'gzip_body')
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=JSON_GZIP_LEVEL, mtime=0)
+
+class ResponseCache:
+    """엔드포인트별 최신 버전의 인코딩된 응답 하나씩 보관"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint, version, build):
+        """캐시된 응답 반환 (없거나 버전이 다르면 build()로 만든 데이터를 인코딩하여 저장)"""
+        entry = self._entries.get(endpoint)
+        if entry is not None and entry.version == version:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        # jsonify와 같은 방식으로 인코딩 (키 정렬, 구분자 등 기존 응답 형식 유지)
+        entry = CachedResponse(version, app.json.response(build()).get_data())
+        with self._lock:
+            self.misses += 1
+            current = self._entries.get(endpoint)
+            if current is None or current.version <= version:
+                self._entries[endpoint] = entry
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'entries': {endpoint: entry.version for endpoint, entry in self._entries.items()},
+                'bytes': sum(len(e.body) + len(e.gzip_body) for e in self._entries.values())
+            }
+
+response_cache = ResponseCache()
+
+def menu_etags(endpoint, snapshot):
+    """데이터 버전 기반 강한 ETag (원본, gzip 본문은 서로 다른 표현이므로 따로 구분)"""
+    # 변경 시각을 함께 넣어 데이터베이스를 새로 만들어 버전이 다시 시작돼도 겹치지 않게 함
+    tag = f"{endpoint}-v{snapshot.version}-{int(snapshot.updated_at)}"
+    return tag, f"{tag}-gz"
+
+def is_not_modified(etags, last_modified):
+    """If-None-Match / If-Modified-Since 조건부 요청이 현재 버전과 일치하는지 확인"""
+    if request.if_none_match:
+        # If-None-Match가 있으면 If-Modified-Since는 무시 (RFC 9110)
+        return any(request.if_none_match.contains_weak(tag) for tag in etags)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+def cached_json_response(endpoint, snapshot, build, status=200):
+    """캐시된 JSON 바이트로 응답 생성 (조건부 요청이면 304, 클라이언트가 지원하면 gzip 본문)"""
+    etags = menu_etags(endpoint, snapshot)
+    # HTTP 날짜는 초 단위
+    last_modified = datetime.fromtimestamp(int(snapshot.updated_at), timezone.utc)
+    use_gzip = bool(request.accept_encodings['gzip'])
+    
+    if is_not_modified(etags, last_modified):
+        response = app.response_class(status=304)
+    else:
+        entry = response_cache.get(endpoint, snapshot.version, build)
+        response = app.response_class(
+            entry.gzip_body if use_gzip else entry.body,
+            status=status,
+            mimetype='application/json'
+        )
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    
+    response.set_etag(etags[1] if use_gzip else etags[0])
+    response.last_modified = last_modified
+    response.vary.add('Accept-Encoding')
+    return response
 
 def load_menu_data():
     try:
         print("=== 메뉴 데이터 로드 시작 ===")
-        with get_db() as db:
-            # 카테고리별로 데이터를 가져오되, order_index 순서로 정렬하고 시스템 항목 제외
-            cursor = db.execute('''
-                SELECT * FROM menu 
-                WHERE order_index > -900 OR name != 'bariosk'
-                ORDER BY category, order_index
-            ''')
-            menu_data = {}
-            for row in cursor:
-                category = row['category']
-                if category not in menu_data:
-                    menu_data[category] = []
-                menu_data[category].append({
-                    'id': row['id'],
-                    'name': row['name'],
-                    'price': row['price'],
-                    'image': row['image'],
-                    'temperature': row['temperature'],
-                    'order_index': row['order_index']
-                })
-            
-            # 빈 카테고리도 추가
-            cursor = db.execute('''
-                SELECT DISTINCT category FROM menu
-            ''')
-            for row in cursor:
-                category = row['category']
-                if category not in menu_data:
-                    menu_data[category] = []
-            
-            print(f"메뉴 데이터 로드 성공: {list(menu_data.keys())}")
-            print("=== 메뉴 데이터 로드 완료 ===")
-            return menu_data
+        snapshot = get_menu_snapshot()
+        # 호출한 쪽에서 수정해도 스냅샷이 바뀌지 않도록 복사본 반환
+        menu_data = {
+            category: [dict(item) for item in items]
+            for category, items in snapshot.menu.items()
+        }
+        print(f"메뉴 데이터 로드 성공: {list(menu_data.keys())}")
+        print("=== 메뉴 데이터 로드 완료 ===")
+        return menu_data
     except Exception as e:
         print(f"메뉴 데이터 로드 실패: {str(e)}")
         import traceback
@@ -425,6 +997,7 @@ def load_menu_data():
         return {}
 
 def save_menu_data(data):
+    """메뉴 전체를 data와 같게 맞추고 변경 수를 반환 (바뀐 행만 변경 기록에 남김)"""
     try:
         print("=== 메뉴 데이터 저장 시작 ===")
         print(f"저장할 메뉴 데이터 카테고리: {list(data.keys())}")
@@ -461,66 +1034,100 @@ def save_menu_data(data):
                 db.execute('BEGIN TRANSACTION')
                 
                 try:
-                    # 시스템 항목을 제외한 데이터 백업
-                    backup_data = {}
-                    cursor = db.execute('SELECT * FROM menu WHERE name = "bariosk" OR order_index <= -900')
-                    system_items = [dict(row) for row in cursor.fetchall()]
-                    print(f"보존할 시스템 항목 수: {len(system_items)}")
-                    
-                    # 정규 메뉴 항목만 삭제
-                    db.execute('DELETE FROM menu WHERE name != "bariosk" AND order_index > -900')
-                    print("정규 메뉴 항목 삭제 완료")
+                    # 현재 저장된 행과 비교하여 바뀐 행만 반영
+                    cursor = db.execute('SELECT id, category_id, name, price, image, temperature, order_index FROM menu')
+                    existing_rows = {row['id']: tuple(row) for row in cursor.fetchall()}
                     
-                    # 새 데이터 저장 (순서 유지를 위해 order_index 사용)
+                    inserts = []
+                    updates = []
+                    seen_ids = set()
+                    categories_added = 0
+                    logged = []
                     for category, items in data.items():
+                        # 빈 카테고리도 categories 테이블에 유지
+                        category_id = get_category_id(db, category)
+                        if category_id is None:
+                            category_id = ensure_category(db, category)
+                            categories_added += 1
+                            logged.append(category_change(db, category))
                         for index, item in enumerate(items):
+                            # 필수 필드 검증
+                            if not all(k in item for k in ['name', 'price', 'image']):
+                                print(f"경고: 필수 필드가 누락된 메뉴 항목이 있습니다: {item}")
+                            name = item.get('name') or f"메뉴항목_{item.get('id', index)}"
                             try:
-                                # 필수 필드 검증
-                                if not all(k in item for k in ['id', 'name', 'price', 'image']):
-                                    print(f"경고: 필수 필드가 누락된 메뉴 항목이 있습니다: {item}")
-                                    # 누락된 필드 채우기
-                                    if 'id' not in item:
-                                        item['id'] = index + 1000  # 임의의 ID 생성
-                                    if 'name' not in item:
-                                        item['name'] = f"메뉴항목_{item['id']}"
-                                    if 'price' not in item:
-                                        item['price'] = "0"
-                                    if 'image' not in item:
-                                        item['image'] = "logo.png"
-                                
-                                order_index = item.get('order_index', index)
-                                
-                                # 시스템 항목이 아닌 경우만 저장
-                                if item['name'] != "bariosk" and order_index > -900:
-                                    db.execute(
-                                        'INSERT INTO menu (id, category, name, price, image, temperature, order_index) VALUES (?, ?, ?, ?, ?, ?, ?)',
-                                        (item['id'], category, item['name'], str(item['price']), item['image'], item.get('temperature', ''), order_index)
-                                    )
-                                    print(f"메뉴 항목 저장: {category}/{item['name']}")
-                            except Exception as e:
-                                print(f"메뉴 항목 저장 실패: {str(e)}")
-                                print(f"실패한 항목: {item}")
-                                continue  # 단일 항목 실패 시 계속 진행
-                    
-                    # 빈 카테고리 확인 및 추가
-                    for category in data.keys():
-                        cursor = db.execute('SELECT COUNT(*) FROM menu WHERE category = ?', (category,))
-                        if cursor.fetchone()[0] == 0:
-                            # 카테고리가 없으면 시스템 항목 추가
-                            db.execute(
-                                'INSERT INTO menu (category, name, price, image, temperature, order_index) VALUES (?, ?, ?, ?, ?, ?)',
-                                (category, "bariosk", "0", "logo.png", "", -999)
+                                order_index = int(item['order_index'])
+                            except (KeyError, TypeError, ValueError):
+                                order_index = (index + 1) * ORDER_GAP
+                            
+                            try:
+                                item_id = int(item['id']) if item.get('id') is not None else None
+                            except (TypeError, ValueError):
+                                print(f"잘못된 메뉴 ID, 새 항목으로 저장: {item}")
+                                item_id = None
+                            if item_id is not None and item_id in seen_ids:
+                                print(f"중복된 메뉴 ID 무시: {item}")
+                                continue
+                            
+                            row = (
+                                category_id,
+                                str(name),
+                                str(item.get('price', "0")),
+                                str(item.get('image') or "logo.png"),
+                                str(item.get('temperature') or ''),
+                                order_index
                             )
-                            print(f"빈 카테고리 유지를 위한 시스템 항목 추가: {category}")
+                            if item_id is None or item_id not in existing_rows:
+                                inserts.append(((item_id,) + row, category))
+                            elif existing_rows[item_id][1:] != row:
+                                updates.append(row + (item_id,))
+                                # 바뀐 필드만 기록 (category_id는 카테고리 이름으로)
+                                fields = dict(zip(MENU_CHANGE_FIELDS, (category,) + row[1:]))
+                                previous = dict(zip(MENU_CHANGE_FIELDS, (None,) + existing_rows[item_id][2:]))
+                                if existing_rows[item_id][1] == category_id:
+                                    del fields['category']
+                                logged.append(menu_change(db, item_id, {
+                                    field: value for field, value in fields.items()
+                                    if field == 'category' or previous[field] != value
+                                }))
+                            if item_id is not None:
+                                seen_ids.add(item_id)
                     
-                    # 커밋 전 확인
-                    db.commit()
-                    print("모든 메뉴 데이터 저장 완료")
+                    # 요청에 없는 메뉴 항목 삭제
+                    deletes = [(row_id,) for row_id in existing_rows if row_id not in seen_ids]
                     
-                    # 저장된 데이터 확인
-                    cursor = db.execute('SELECT COUNT(*) FROM menu')
-                    count = cursor.fetchone()[0]
-                    print(f"저장된 데이터 확인: {count}개 항목")
+                    if deletes:
+                        logged.extend(menu_delete(db, row_id) for (row_id,) in deletes)
+                        db.executemany('DELETE FROM menu WHERE id = ?', deletes)
+                    if updates:
+                        db.executemany(
+                            'UPDATE menu SET category_id = ?, name = ?, price = ?, image = ?, temperature = ?, order_index = ? WHERE id = ?',
+                            updates
+                        )
+                    # 새 항목은 부여된 id를 기록해야 하므로 하나씩 추가
+                    for insert, category in inserts:
+                        sync_key = new_menu_sync_key()
+                        db.execute(
+                            'INSERT INTO menu (id, category_id, name, price, image, temperature, order_index, sync_key) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            insert + (sync_key,)
+                        )
+                        logged.append(('menu', sync_key, 'upsert', dict(zip(MENU_CHANGE_FIELDS, (category,) + insert[2:]))))
+                    
+                    changes = {
+                        'inserted': len(inserts),
+                        'updated': len(updates),
+                        'deleted': len(deletes),
+                        'categories_added': categories_added,
+                        'changed': len(inserts) + len(updates) + len(deletes) + categories_added
+                    }
+                    changes['version'] = bump_menu_version(db) if changes['changed'] else get_menu_version(db)
+                    log_changes(db, logged)
+                    db.commit()
+                    if changes['changed']:
+                        refresh_menu_snapshot(db)
+                        sync_worker.wake()
+                    print(f"메뉴 데이터 저장 완료: 추가 {changes['inserted']}, 수정 {changes['updated']}, 삭제 {changes['deleted']}")
                     
                 except Exception as e:
                     print(f"데이터 저장 중 오류 발생: {str(e)}")
@@ -544,12 +1151,8 @@ def save_menu_data(data):
                     print(f"백업 파일 저장 실패: {str(backup_error)}")
             raise
             
-        # 저장 결과 확인
-        if os.path.exists(DATABASE):
-            file_size = os.path.getsize(DATABASE)
-            print(f"저장 후 데이터베이스 파일 크기: {file_size} bytes")
-            
         print("=== 메뉴 데이터 저장 완료 ===")
+        return changes
     except Exception as e:
         print(f"메뉴 데이터 저장 실패: {str(e)}")
         import traceback
@@ -563,82 +1166,589 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'avif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def validate_image_data(data):
+    """저장 전에 한 번만 검사 - 열 수 있는 이미지인지(바이트 또는 파일 경로) 확인하고 MIME 타입 반환"""
+    try:
+        with image_processing.open_image(data, UPLOAD_MAX_PIXELS) as img:
+            img.verify()
+            content_type = Image.MIME.get(img.format)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"이미지 검사 실패: {str(e)}")
+        raise ValueError("이미지 파일을 처리할 수 없습니다.")
+    if not content_type:
+        raise ValueError("지원하지 않는 이미지 형식입니다.")
+    return content_type
+
+def store_image(conn, filename, data, content_type, size=None):
+    """이미지 바이트를 파일 저장소에 쓰고 파일명 -> 해시 메타데이터 저장 (커밋은 호출한 쪽에서)
+
+    같은 내용이 이미 있으면 파일을 다시 쓰지 않는다. 해시는 ETag로 사용한다.
+    """
+    if isinstance(data, bytes):
+        source, length = io.BytesIO(data), len(data)
+        digest = image_store.put(data)
+    else:
+        # 임시 파일에 받은 업로드 (spool_upload)
+        source, length = data, os.path.getsize(data)
+        digest = image_store.put_file(data)
+    if size is None:
+        with Image.open(source) as img:
+            size = img.size
+    record_image(conn, filename, digest, content_type, length, size)
+    return digest
+
+def record_image(conn, filename, digest, content_type, length, size):
+    """이미 저장소에 있는 파일(digest)을 filename의 이미지로 등록 (커밋은 호출한 쪽에서)"""
+    missing_images.discard(filename)
+    previous = conn.execute('SELECT sha256 FROM images WHERE filename = ?', (filename,)).fetchone()
+    conn.execute(
+        'INSERT OR REPLACE INTO images (filename, sha256, content_type, size, width, height) VALUES (?, ?, ?, ?, ?, ?)',
+        (filename, digest, content_type, length, size[0], size[1])
+    )
+    if previous and previous['sha256'] != digest:
+        # 내용이 바뀌었으므로 이전 원본으로 만든 변형은 삭제하고
+        # 모든 워커의 이미지 캐시가 비워지도록 버전 증가
+        conn.execute('DELETE FROM image_variants WHERE filename = ?', (filename,))
+        conn.execute(
+            "UPDATE app_meta SET value = value + 1, updated_at = ? WHERE key = 'images_version'",
+            (time.time(),)
+        )
+
+def pick_variant_width(requested, original_width):
+    """요청한 가로 크기에 맞는 변형 크기 (원본을 그대로 보내면 되는 경우 None)"""
+    for width in IMAGE_VARIANT_WIDTHS:
+        if width >= requested:
+            return width if width < (original_width or 0) else None
+    return None
+
+def negotiate_image_format():
+    """Accept 헤더에 명시된 형식 중 서버가 만들 수 있는 가장 작은 형식 (없으면 None - JPEG)"""
+    # */*, image/* 같은 와일드카드는 지원 여부를 알 수 없으므로 명시된 타입만 인정
+    accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+    for fmt in MODERN_IMAGE_FORMATS:
+        if IMAGE_ENCODINGS[fmt][1] in accepted:
+            return fmt
+    return None
+
+def variant_targets(original_width):
+    """업로드 시 만들 (가로, 형식) 목록 - 작은 크기의 JPEG와 모든 크기의 최신 형식"""
+    return image_processing.variant_targets(original_width, IMAGE_VARIANT_WIDTHS, MODERN_IMAGE_FORMATS)
+
+def encode_variant(img, width, fmt='jpeg'):
+    """이미지를 가로 width로 줄여 지정한 형식의 바이트로 변환"""
+    return image_processing.encode_image(img, width, IMAGE_ENCODINGS[fmt])
+
+def store_image_variants(conn, filename, source_sha256, img, targets):
+    """(가로, 형식) 목록의 변형을 만들어 저장하고 {(가로, 형식): 해시} 반환 (커밋은 호출한 쪽에서)
+
+    원본이 그사이 교체됐으면(source_sha256 불일치) 변형 행을 남기지 않는다.
+    """
+    created = {}
+    for width, fmt in targets:
+        if width > img.width:
+            continue
+        data = encode_variant(img, width, fmt)
+        digest = image_store.put(data)
+        if record_image_variant(conn, filename, source_sha256, width, fmt, digest, IMAGE_ENCODINGS[fmt][1], len(data)):
+            created[(width, fmt)] = digest
+    return created
+
+def record_image_variant(conn, filename, source_sha256, width, fmt, digest, content_type, length):
+    """저장소에 있는 변형 파일을 등록 (원본이 source_sha256일 때만, 등록했으면 True)"""
+    cursor = conn.execute('''
+        INSERT OR REPLACE INTO image_variants (filename, width, format, sha256, content_type, size)
+        SELECT ?, ?, ?, ?, ?, ?
+        WHERE EXISTS (SELECT 1 FROM images WHERE filename = ? AND sha256 = ?)
+    ''', (filename, width, fmt, digest, content_type, length, filename, source_sha256))
+    return cursor.rowcount > 0
+
+def store_logo(conn, data, content_type, size=None):
+    """logo.png를 교체하고 아이콘 세트(favicon, 앱 아이콘)도 함께 저장 (커밋은 호출한 쪽에서)"""
+    digest = store_image(conn, 'logo.png', data, content_type, size)
+    with image_processing.open_image(data, UPLOAD_MAX_PIXELS) as img:
+        # 가장 큰 아이콘 크기까지만 줄여 디코딩 (JPEG)
+        largest = max(width for width, _ in LOGO_ICONS.values())
+        img.draft('RGB', (largest, largest))
+        img.load()
+        store_logo_icons(conn, digest, img)
+    return digest
+
+def store_logo_icons(conn, source_sha256, img):
+    """로고 이미지로 LOGO_ICONS를 만들어 logo.png의 변형으로 저장하고 {이름: 해시} 반환"""
+    created = {}
+    for name, (width, fmt) in LOGO_ICONS.items():
+        data = image_processing.encode_icon(img, width, fmt)
+        digest = image_store.put(data)
+        if record_image_variant(conn, 'logo.png', source_sha256, width, fmt, digest, ICON_MIME_TYPES[fmt], len(data)):
+            created[name] = digest
+    return created
+
+def get_logo_icon(name):
+    """미리 만든 로고 아이콘 (해시, MIME 타입, 바이트) - 로고가 없으면 None
+
+    이전 버전에서 저장해 아이콘 세트가 없는 로고는 처음 요청될 때 만들어 둔다.
+    """
+    width, fmt = LOGO_ICONS[name]
+    key = ('logo.png', width, fmt)
+    conn = get_db()
+    try:
+        image_cache.check_version(get_images_version(conn))
+        cached = image_cache.get(key)
+        if cached:
+            return cached
+        
+        row = conn.execute(
+            'SELECT sha256, content_type FROM image_variants WHERE filename = ? AND width = ? AND format = ?',
+            ('logo.png', width, fmt)
+        ).fetchone()
+        if row and image_store.exists(row['sha256']):
+            digest, content_type = row['sha256'], row['content_type']
+        else:
+            logo = conn.execute('SELECT sha256 FROM images WHERE filename = ?', ('logo.png',)).fetchone()
+            if not logo or not image_store.exists(logo['sha256']):
+                return None
+            print("로고 아이콘 세트 생성")
+            with Image.open(image_store.path_for(logo['sha256'])) as img:
+                img.load()
+                created = store_logo_icons(conn, logo['sha256'], img)
+            conn.commit()
+            if name not in created:
+                return None
+            digest, content_type = created[name], ICON_MIME_TYPES[fmt]
+        data = image_store.read(digest)
+    finally:
+        conn.close()
+    
+    image_cache.put(key, digest, content_type, data)
+    return digest, content_type, data
+
+def get_image_variant(filename, source_sha256, width, fmt='jpeg'):
+    """크기/형식별 변형 조회 (없으면 원본에서 만들어 저장) - (해시, MIME 타입) 또는 None"""
+    conn = get_db()
+    try:
+        row = conn.execute(
+            'SELECT sha256, content_type FROM image_variants WHERE filename = ? AND width = ? AND format = ?',
+            (filename, width, fmt)
+        ).fetchone()
+        if row and image_store.exists(row['sha256']):
+            return row['sha256'], row['content_type']
+        
+        # 기존 이미지의 변형은 처음 요청될 때 만들어 둠
+        print(f"이미지 변형 생성: {filename} ({width}px, {fmt})")
+        with Image.open(image_store.path_for(source_sha256)) as img:
+            img.load()
+            created = store_image_variants(conn, filename, source_sha256, img, [(width, fmt)])
+        conn.commit()
+        if (width, fmt) in created:
+            return created[(width, fmt)], IMAGE_ENCODINGS[fmt][1]
+        return None
+    finally:
+        conn.close()
+
+def load_image_bytes(conn, filename):
+    """파일명으로 저장된 원본 이미지 바이트 조회 (메모리 캐시 사용, 없으면 None)"""
+    image_cache.check_version(get_images_version(conn))
+    key = (filename, None, None)
+    cached = image_cache.get(key)
+    if cached:
+        return cached[2]
+    
+    row = conn.execute('SELECT sha256, content_type FROM images WHERE filename = ?', (filename,)).fetchone()
+    if not row:
+        return None
+    try:
+        data = image_store.read(row['sha256'])
+    except FileNotFoundError:
+        print(f"이미지 파일 없음: {filename} ({row['sha256']})")
+        return None
+    image_cache.put(key, row['sha256'], row['content_type'], data)
+    return data
+
+def image_file_response(digest, content_type):
+    """저장소 파일을 그대로 전송 (sendfile/X-Sendfile, 조건부 요청은 해시 ETag로 처리)"""
+    return send_file(
+        image_store.path_for(digest),
+        mimetype=content_type,
+        etag=digest,
+        conditional=True,
+        max_age=None
+    )
+
+class ImageBytesCache:
+    """용량(바이트) 제한 LRU - (파일명, 요청 가로, 형식)별 이미지 바이트
+
+    기존 파일명의 이미지가 교체되면 app_meta의 images_version이 올라가므로,
+    요청마다 버전을 확인해 바뀌었으면 전체를 비운다. (다른 워커의 교체도 반영)
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        # 큰 파일 하나가 캐시를 다 밀어내지 않도록 항목 크기 제한
+        self.max_entry_bytes = self.max_bytes // 8
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def check_version(self, version):
+        with self._lock:
+            if self._version != version:
+                if self._entries:
+                    self.invalidations += 1
+                    print(f"이미지 캐시 비움: 이미지 버전 {self._version} -> {version}")
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+
+    def get(self, key):
+        """(해시, MIME 타입, 바이트) 또는 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, digest, content_type, data):
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[2])
+            self._entries[key] = (digest, content_type, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[2])
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'images_version': self._version
+            }
+
+image_cache = ImageBytesCache(IMAGE_CACHE_MB * 1024 * 1024)
+
+class MissingImageCache:
+    """없는 이미지 파일명 -> (만료 시각, 자리표시 라벨, 메뉴 버전) (부정 캐시)
+
+    크롤러나 오래된 키오스크가 없는 파일명을 반복 요청해도 TTL 동안은 DB를
+    조회하지 않고 메모리의 자리표시 이미지로 응답한다. 다른 서버에서 동기화된
+    이미지는 최대 TTL 뒤에 보이며, 이 프로세스에서 등록한 이미지는 바로 지운다.
+    라벨은 메뉴 이름에 따라 달라지므로 이 프로세스의 메뉴 스냅샷 버전이 바뀌면
+    항목을 버리고 다시 확인한다.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        # 자리표시 이미지 응답 수 (종류별)
+        self.placeholders = {'missing': 0, 'pending': 0}
+
+    def get(self, filename, menu_version):
+        """저장된 자리표시 라벨 (없거나 만료됐거나 메뉴 버전이 다르면 None)"""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None:
+                return None
+            expires, label, version = entry
+            if expires < time.time() or version != menu_version:
+                del self._entries[filename]
+                return None
+            self.hits += 1
+            return label
+
+    def add(self, filename, label, menu_version):
+        with self._lock:
+            self._entries.pop(filename, None)
+            self._entries[filename] = (time.time() + self.ttl, label, menu_version)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, filename):
+        with self._lock:
+            self._entries.pop(filename, None)
+
+    def count_placeholder(self, kind):
+        with self._lock:
+            self.placeholders[kind] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'negative_hits': self.hits,
+                'placeholder_hits': dict(self.placeholders),
+                'placeholder_renders': placeholder_image.cache_info().misses,
+                'ttl': self.ttl
+            }
+
+missing_images = MissingImageCache(MISSING_IMAGE_TTL, MISSING_IMAGE_CACHE_SIZE)
+
+def image_bytes_response(digest, content_type, data):
+    """캐시된 이미지 바이트로 응답 (If-None-Match면 304)"""
+    response = app.response_class(data, mimetype=content_type)
+    response.set_etag(digest)
+    return response.make_conditional(request)
+
+# 업로드 이미지 처리 (프로세스 풀)
+#
+# 사진 축소/인코딩은 CPU를 오래 쓰고 GIL을 잡으므로 요청 스레드 대신 별도
+# 프로세스(image_processing.process_upload)에서 처리한다. 업로드 요청은 파일명을
+# 바로 돌려주고, 처리가 끝날 때까지 그 파일명의 이미지 요청에는 자리표시 이미지를
+# 보낸다. 진행 상태는 image_jobs 테이블에 기록하므로 어느 워커에서든 조회할 수 있고,
+# 완료되면 images/image_variants 행을 한 트랜잭션으로 추가한 뒤 작업 행을 지운다.
+
+_image_executor = None
+_image_executor_pid = None
+_image_executor_lock = threading.Lock()
+# 이 프로세스에서 처리 중인 작업 (파일명 -> Future)
+_image_futures = {}
+
+def get_image_executor(reset=False):
+    """이 워커 프로세스의 이미지 처리 풀 (처음 사용할 때 생성, IMAGE_WORKERS=0이면 None)"""
+    global _image_executor, _image_executor_pid
+    if IMAGE_WORKERS <= 0:
+        return None
+    with _image_executor_lock:
+        # fork된 워커는 부모의 풀을 쓸 수 없으므로 프로세스마다 새로 만듦
+        if reset or _image_executor is None or _image_executor_pid != os.getpid():
+            _image_executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+            _image_executor_pid = os.getpid()
+            print(f"이미지 처리 프로세스 풀 생성: {IMAGE_WORKERS}개")
+        return _image_executor
+
+def process_upload(data):
+    """업로드 이미지 변환을 현재 프로세스에서 실행 (IMAGE_WORKERS=0)"""
+    return image_processing.process_upload(*_process_upload_args(data))
+
+def submit_process_upload(data):
+    """업로드 이미지 변환을 처리 풀에 넘기고 Future 반환 (풀을 쓰지 않으면 None)"""
+    executor = get_image_executor()
+    if executor is None:
+        return None
+    try:
+        return executor.submit(image_processing.process_upload, *_process_upload_args(data))
+    except BrokenProcessPool:
+        # 처리 프로세스가 비정상 종료(메모리 부족 등)된 풀은 다시 만듦
+        print("이미지 처리 프로세스 풀 재생성")
+        return get_image_executor(reset=True).submit(image_processing.process_upload, *_process_upload_args(data))
+
+def _process_upload_args(source):
+    return (
+        source, IMAGE_ROOT, UPLOAD_IMAGE_MAX_SIZE, UPLOAD_MAX_PIXELS,
+        IMAGE_VARIANT_WIDTHS, IMAGE_ENCODINGS, MODERN_IMAGE_FORMATS
+    )
+
+class UploadTooLargeError(ValueError):
+    """업로드 파일이 크기 제한을 넘음 (응답은 413)"""
+
+def spool_upload(stream, limit=UPLOAD_MAX_BYTES):
+    """업로드 스트림을 나눠 읽어 작으면 바이트로, UPLOAD_SPOOL_THRESHOLD보다 크면 임시 파일 경로로 반환
+
+    limit를 넘으면 UploadTooLargeError(ValueError). 경로를 받았으면 다 쓴 뒤 release_upload()로 지운다.
+    """
+    buffer = io.BytesIO()
+    spool = None
+    total = 0
+    try:
+        for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+            total += len(chunk)
+            if total > limit:
+                raise UploadTooLargeError(f"파일 크기가 {limit // (1024 * 1024)}MB를 넘습니다.")
+            if spool is None and total > UPLOAD_SPOOL_THRESHOLD:
+                spool = tempfile.NamedTemporaryFile(dir=UPLOAD_SPOOL_DIR, prefix='upload-', delete=False)
+                spool.write(buffer.getvalue())
+                buffer = None
+            (spool or buffer).write(chunk)
+    except Exception:
+        if spool is not None:
+            spool.close()
+            release_upload(spool.name)
+        raise
+    if spool is None:
+        return buffer.getvalue()
+    spool.close()
+    return spool.name
+
+def release_upload(source):
+    """spool_upload가 만든 임시 파일 삭제 (바이트면 할 일 없음)"""
+    if isinstance(source, str):
+        try:
+            os.remove(source)
+        except FileNotFoundError:
+            pass
+
+def record_processed_image(conn, filename, result):
+    """process_upload 결과(원본과 변형)를 filename의 이미지로 등록 (커밋은 호출한 쪽에서)"""
+    size = (result['width'], result['height'])
+    record_image(conn, filename, result['sha256'], result['content_type'], result['size'], size)
+    for width, fmt, digest, content_type, length in result['variants']:
+        record_image_variant(conn, filename, result['sha256'], width, fmt, digest, content_type, length)
+
+def submit_image_job(filename, data):
+    """filename으로 저장할 업로드 이미지 처리를 시작 (완료 전에는 pending 상태)
+
+    data는 spool_upload의 결과(바이트 또는 임시 파일 경로)이며 처리가 끝나면 정리한다.
+    """
+    with get_db() as conn:
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO image_jobs (filename, status, error, created_at, updated_at) VALUES (?, 'pending', NULL, ?, ?)",
+            (filename, now, now)
+        )
+    
+    future = submit_process_upload(data)
+    if future is None:
+        try:
+            result = process_upload(data)
+        except Exception as e:
+            complete_image_job(filename, error=e)
+        else:
+            complete_image_job(filename, result)
+        finally:
+            release_upload(data)
+        return
+    
+    _image_futures[filename] = future
+    future.add_done_callback(lambda done: _on_image_job_done(filename, data, done))
+
+def _on_image_job_done(filename, data, future):
+    try:
+        error = future.exception()
+        complete_image_job(filename, None if error else future.result(), error)
+    finally:
+        release_upload(data)
+
+def complete_image_job(filename, result=None, error=None):
+    """처리 결과를 images/image_variants에 기록하고 작업 상태 갱신 (한 트랜잭션)"""
+    try:
+        with get_db() as conn:
+            if error is None:
+                record_processed_image(conn, filename, result)
+                conn.execute('DELETE FROM image_jobs WHERE filename = ?', (filename,))
+                print(f"이미지 저장 성공: {filename}")
+            else:
+                conn.execute(
+                    "UPDATE image_jobs SET status = 'failed', error = ?, updated_at = ? WHERE filename = ?",
+                    (str(error) or type(error).__name__, time.time(), filename)
+                )
+                print(f"이미지 처리 실패: {filename} - {error}")
+    except Exception as e:
+        print(f"이미지 처리 결과 저장 실패: {filename} - {str(e)}")
+        import traceback
+        print(traceback.format_exc())
+    finally:
+        _image_futures.pop(filename, None)
+
+def get_image_job_status(conn, filename):
+    """(상태, 오류) - 상태는 ready/pending/failed, 모르는 파일명이면 (None, None)"""
+    if conn.execute('SELECT 1 FROM images WHERE filename = ?', (filename,)).fetchone():
+        return 'ready', None
+    job = conn.execute(
+        'SELECT status, error, updated_at FROM image_jobs WHERE filename = ?', (filename,)
+    ).fetchone()
+    if not job:
+        return None, None
+    if job['status'] == 'pending' and time.time() - job['updated_at'] > IMAGE_JOB_TIMEOUT:
+        return 'failed', '처리 시간 초과'
+    return job['status'], job['error']
+
 def save_image(file):
+    """업로드 이미지를 백그라운드 처리에 넘기고 새 파일명을 바로 반환
+
+    크기/해상도 제한을 넘거나 이미지가 아니면 ValueError (upload_error_response로 응답).
+    """
+    file_data = None
     try:
-        # 파일 데이터를 메모리에 로드
-        file_data = file.read()
+        # 큰 파일은 메모리 대신 임시 파일에 받음
+        file_data = spool_upload(file.stream)
         if not file_data:
             raise ValueError("파일 데이터가 비어있습니다.")
         
-        # 이미지 데이터를 PIL Image로 변환
+        # 헤더만 읽어 이미지인지, 해상도가 제한 이내인지 확인 (디코딩/변환은 처리 프로세스에서)
         try:
-            img = Image.open(io.BytesIO(file_data))
-            print(f"이미지 포맷: {img.format}, 크기: {img.size}")
+            with image_processing.open_image(file_data, UPLOAD_MAX_PIXELS) as img:
+                print(f"이미지 포맷: {img.format}, 크기: {img.size}")
+        except ValueError:
+            raise
         except Exception as e:
             print(f"이미지 변환 실패: {str(e)}")
             raise ValueError("이미지 파일을 처리할 수 없습니다.")
         
-        # RGB 모드로 변환
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # 이미지 크기 조정 (최대 800x800)
-        max_size = (800, 800)
-        img.thumbnail(max_size, Image.LANCZOS)
-        
-        # 이미지를 JPEG로 변환
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=85, optimize=True, progressive=True)
-        image_data = output.getvalue()
-        
         # 고유한 파일명 생성
         unique_filename = f"{uuid.uuid4()}.jpg"
-        
-        # 데이터베이스에 이미지 저장
-        conn = get_db()
-        try:
-            conn.execute(
-                'INSERT OR REPLACE INTO images (filename, data, content_type) VALUES (?, ?, ?)',
-                (unique_filename, image_data, 'image/jpeg')
-            )
-            conn.commit()
-            print(f"이미지 저장 성공: {unique_filename}")
-        except Exception as e:
-            print(f"이미지 데이터베이스 저장 실패: {str(e)}")
-            raise
-        finally:
-            conn.close()
-        
+        submit_image_job(unique_filename, file_data)
+        file_data = None  # 처리 작업이 정리함
+        print(f"이미지 처리 시작: {unique_filename}")
         return unique_filename
         
     except Exception as e:
         print(f"이미지 저장 실패: {str(e)}")
-        return "logo.png"
+        raise
+    finally:
+        if file_data:
+            release_upload(file_data)
+
+def upload_error_response(error):
+    """save_image의 ValueError 응답 (파일 크기 초과는 413, 해상도/형식 오류는 400)"""
+    status = 413 if isinstance(error, UploadTooLargeError) else 400
+    return jsonify({'error': str(error)}), status
 
 @app.route('/')
 def index():
     return send_from_directory('.', 'index.html')
 
-def get_menu_from_render():
+@app.route('/api/images-manifest')
+def images_manifest():
     try:
-        response = requests.get(f"{RENDER_API_URL}/api/menu")
-        if response.status_code == 200:
-            menu_data = response.json()
-            print(f"Render 서버에서 메뉴 데이터 가져옴: {menu_data}")
-            
-            # 로컬 데이터베이스에 저장
-            if not os.environ.get('RENDER'):
-                save_menu_data(menu_data)
-                print("로컬 데이터베이스에 메뉴 데이터 저장 완료")
-            
-            return menu_data
-        else:
-            print(f"Render 서버에서 메뉴 데이터를 가져오는데 실패했습니다: {response.status_code}")
-            return {}
+        conn = get_db()
+        try:
+            images = load_image_manifest(conn)
+        finally:
+            conn.close()
+        return jsonify({'images': images, 'origin': SYNC_NODE_ID})
     except Exception as e:
-        print(f"Render 서버 연결 실패: {str(e)}")
-        return {}
-    
+        print(f"이미지 목록 조회 실패: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/images-sync', methods=['GET', 'POST'])
+def images_sync():
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            source = (data.get('source') or SYNC_TARGET_URL or '').rstrip('/')
+            if not source:
+                return jsonify({'error': '이미지를 받아 올 서버가 필요합니다.'}), 400
+            started = image_sync.start(source)
+            return jsonify(dict(image_sync.stats(), started=started)), 202
+        return jsonify(image_sync.stats())
+    except Exception as e:
+        print(f"이미지 동기화 요청 실패: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/images-list')
 def images_list():
     try:
@@ -654,104 +1764,665 @@ def images_list():
         print(f"이미지 목록 조회 실패: {str(e)}")
         return jsonify({"error": str(e)}), 500
     
-def save_menu_to_render(data):
-    try:
-        print(f"Render 서버에 저장할 데이터: {json.dumps(data, ensure_ascii=False)[:500]}...")
-        
-        # 요청 헤더 설정
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
+# 변경 기록 (change_log)
+#
+# 메뉴/카테고리를 바꾸는 요청은 같은 트랜잭션에서 바뀐 필드만 change_log에
+# 추가하고, 같은 묶음을 동기화 대기열로 보낸다(POST /api/changes). 다른 서버는
+# GET /api/changes?since=<seq>로 그 이후의 변경만 받아 갈 수 있다. 변경마다
+# 고유한 change_id(멱등 키)가 있고 받은 쪽도 같은 change_id로 기록하므로, 재전송이나
+# 여러 경로로 같은 변경이 도착해도 한 번만 적용된다.
+#
+# 변경 형식: {'id', 'origin', 'entity', 'key', 'op', 'data', 'created_at'[, 'merged': 합쳐진 이전 change_id 목록]}
+#   menu:     key=sync_key(서버 간 메뉴 식별 키), op=upsert(data=바뀐 필드) | delete
+#   category: key=이름, op=upsert(data={'order_index'}) | rename(data={'name'}) | delete
+
+MENU_CHANGE_FIELDS = ('category', 'name', 'price', 'image', 'temperature', 'order_index')
+
+CHANGE_OPS = {
+    ('menu', 'upsert'), ('menu', 'delete'),
+    ('category', 'upsert'), ('category', 'rename'), ('category', 'delete'),
+}
+
+def new_menu_sync_key():
+    return uuid.uuid4().hex
+
+def menu_sync_key(conn, menu_id):
+    """메뉴의 서버 간 식별 키 (menu.id는 서버마다 따로 증가하므로 변경 기록에는 이 키를 씀)"""
+    row = conn.execute('SELECT sync_key FROM menu WHERE id = ?', (menu_id,)).fetchone()
+    if row is None:
+        raise LookupError(f"메뉴를 찾을 수 없습니다: {menu_id}")
+    if row[0] is None:
+        sync_key = new_menu_sync_key()
+        conn.execute('UPDATE menu SET sync_key = ? WHERE id = ?', (sync_key, menu_id))
+        return sync_key
+    return row[0]
+
+def menu_change(conn, menu_id, fields):
+    return ('menu', menu_sync_key(conn, menu_id), 'upsert', fields)
+
+def menu_delete(conn, menu_id):
+    """메뉴 삭제 변경 (행을 지우기 전에 호출)"""
+    return ('menu', menu_sync_key(conn, menu_id), 'delete', None)
+
+def category_change(conn, name, order_index=None):
+    """카테고리 추가/순서 변경 (order_index가 없으면 현재 값 조회)"""
+    if order_index is None:
+        order_index = conn.execute('SELECT order_index FROM categories WHERE name = ?', (name,)).fetchone()[0]
+    return ('category', name, 'upsert', {'order_index': order_index})
+
+def insert_change(conn, entry):
+    """change_log에 변경 추가 (이미 기록됐거나 앞서 받은 합친 변경에 포함된 change_id면 False)
+
+    합친 변경이면 포함된 이전 change_id(merged)도 기록해, 그 변경이 다른 경로로
+    늦게 도착했을 때 더 새로운 값을 덮지 않도록 한다.
+    """
+    if conn.execute('SELECT 1 FROM change_aliases WHERE change_id = ?', (entry['id'],)).fetchone():
+        return False
+    merged = entry.get('merged') or []
+    inserted = conn.execute(
+        'INSERT OR IGNORE INTO change_log (change_id, origin, entity, entity_key, op, data, created_at, merged_ids) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            entry['id'], entry['origin'], entry['entity'], entry['key'], entry['op'],
+            json.dumps(entry['data'], ensure_ascii=False) if entry.get('data') is not None else None,
+            entry['created_at'],
+            json.dumps(merged) if merged else None
+        )
+    ).rowcount > 0
+    if inserted and merged:
+        conn.executemany('INSERT OR IGNORE INTO change_aliases (change_id) VALUES (?)', [(change_id,) for change_id in merged])
+    return inserted
+
+def log_changes(conn, changes):
+    """[(entity, key, op, data)] 로컬 변경을 change_log에 기록하고 동기화 대기열에 추가
+
+    변경과 같은 트랜잭션에서 호출하고, 커밋한 뒤 sync_worker.wake()를 호출한다.
+    기록한 변경 목록을 반환한다.
+    """
+    now = time.time()
+    entries = []
+    for entity, key, op, data in changes:
+        entry = {
+            'id': uuid.uuid4().hex,
+            'origin': SYNC_NODE_ID,
+            'entity': entity,
+            'key': str(key),
+            'op': op,
+            'data': data,
+            'created_at': now
         }
-        
-        # 타임아웃 설정 (15초)
-        response = requests.put(
-            f"{RENDER_API_URL}/api/menu", 
-            json=data, 
-            headers=headers,
-            timeout=15
+        insert_change(conn, entry)
+        entries.append(entry)
+    if entries:
+        enqueue_sync(conn, 'POST', '/api/changes', {'changes': entries})
+    return entries
+
+def change_entry(row):
+    entry = {
+        'seq': row['seq'],
+        'id': row['change_id'],
+        'origin': row['origin'],
+        'entity': row['entity'],
+        'key': row['entity_key'],
+        'op': row['op'],
+        'data': json.loads(row['data']) if row['data'] is not None else None,
+        'created_at': row['created_at']
+    }
+    if row['merged_ids'] is not None:
+        entry['merged'] = json.loads(row['merged_ids'])
+    return entry
+
+def validate_change(entry):
+    if not isinstance(entry, dict) or not all(
+        isinstance(entry.get(field), str) and entry[field] for field in ('id', 'origin', 'entity', 'key', 'op')
+    ):
+        raise ValueError(f"잘못된 변경 형식입니다: {entry}")
+    if (entry['entity'], entry['op']) not in CHANGE_OPS:
+        raise ValueError(f"지원하지 않는 변경입니다: {entry['entity']} {entry['op']}")
+    if entry['op'] in ('upsert', 'rename') and not isinstance(entry.get('data'), dict):
+        raise ValueError(f"변경 데이터가 없습니다: {entry['id']}")
+    if entry['op'] == 'rename' and not (isinstance(entry['data'].get('name'), str) and entry['data']['name']):
+        raise ValueError(f"새 카테고리 이름이 없습니다: {entry['id']}")
+    if entry['op'] == 'upsert':
+        # 정렬 키는 정수, 나머지 필드는 문자열만 허용 (잘못된 값이 모든 서버에 퍼지지 않도록)
+        for field, value in entry['data'].items():
+            if field == 'order_index':
+                valid = isinstance(value, int) and not isinstance(value, bool)
+            else:
+                valid = field in MENU_CHANGE_FIELDS and isinstance(value, str)
+            if not valid:
+                raise ValueError(f"잘못된 변경 값입니다: {field}={value!r} ({entry['id']})")
+        if entry['entity'] == 'category' and set(entry['data']) - {'order_index'}:
+            raise ValueError(f"카테고리 변경에는 order_index만 쓸 수 있습니다: {entry['id']}")
+    if entry['entity'] == 'menu' and len(entry['key']) > 64:
+        raise ValueError(f"잘못된 메뉴 동기화 키입니다: {entry['key']}")
+    merged = entry.get('merged')
+    if merged is not None and not (
+        isinstance(merged, list) and len(merged) <= CHANGE_BATCH_MAX
+        and all(isinstance(change_id, str) and change_id for change_id in merged)
+    ):
+        raise ValueError(f"잘못된 합친 변경 목록입니다: {entry['id']}")
+    if not isinstance(entry.get('created_at'), (int, float)):
+        entry['created_at'] = time.time()
+
+def apply_change(conn, entry):
+    """다른 서버의 변경 하나를 적용 (대상이 이미 없으면 무시)"""
+    key, op, data = entry['key'], entry['op'], entry.get('data') or {}
+    if entry['entity'] == 'category':
+        category_id = get_category_id(conn, key)
+        if op == 'upsert':
+            category_id = ensure_category(conn, key)
+            if data.get('order_index') is not None:
+                conn.execute('UPDATE categories SET order_index = ? WHERE id = ?', (int(data['order_index']), category_id))
+        elif op == 'rename':
+            if category_id is not None and get_category_id(conn, data['name']) is None:
+                conn.execute('UPDATE categories SET name = ? WHERE id = ?', (data['name'], category_id))
+            else:
+                ensure_category(conn, data['name'])
+        elif category_id is not None:
+            conn.execute('DELETE FROM menu WHERE category_id = ?', (category_id,))
+            conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
+        return
+    
+    # 메뉴는 서버마다 id가 다르므로 sync_key로 로컬 행을 찾음
+    row = conn.execute('SELECT id FROM menu WHERE sync_key = ?', (key,)).fetchone()
+    if op == 'delete':
+        if row is not None:
+            conn.execute('DELETE FROM menu WHERE id = ?', (row[0],))
+        return
+    fields = {field: data[field] for field in MENU_CHANGE_FIELDS if field in data}
+    if 'category' in fields:
+        fields['category_id'] = ensure_category(conn, fields.pop('category'))
+    if row is not None:
+        if fields:
+            conn.execute(
+                f"UPDATE menu SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ?",
+                list(fields.values()) + [row[0]]
+            )
+    elif 'category_id' in fields and 'name' in fields:
+        order_index = fields.get('order_index')
+        if order_index is None:
+            max_order = conn.execute(
+                'SELECT MAX(order_index) FROM menu WHERE category_id = ?', (fields['category_id'],)
+            ).fetchone()[0]
+            order_index = key_between(max_order, None)
+        # 로컬 id는 새로 부여 (다른 서버의 id를 그대로 쓰면 로컬 메뉴를 덮을 수 있음)
+        conn.execute(
+            'INSERT INTO menu (category_id, name, price, image, temperature, order_index, sync_key) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (
+                fields['category_id'], fields['name'], str(fields.get('price', '0')),
+                fields.get('image') or 'logo.png', fields.get('temperature', ''), order_index, key
+            )
         )
+    else:
+        print(f"없는 메뉴의 일부 변경 무시: {key} {data}")
+
+def coalesce_changes(entries):
+    """같은 메뉴/카테고리의 upsert를 하나로 합쳐 (합친 목록, 줄어든 변경 수) 반환
+
+    나중 값이 앞의 값을 덮고, 합친 변경은 마지막 변경의 change_id를 쓴다.
+    삭제는 같은 항목의 앞선 upsert를 없애며, 이름 변경/삭제 앞뒤의 변경은 서로
+    합치지 않는다. (카테고리 이름으로 참조하는 메뉴 변경의 순서가 바뀌지 않도록)
+    빠진 변경의 change_id는 남은 변경의 merged에 담는다. 대기열과 바로 전달이
+    따로 합치므로, 빠진 변경이 다른 경로로 늦게 도착해도 중복으로 처리되어야 한다.
+    """
+    merged = []
+    latest = {}  # (entity, key) -> 마지막 이름 변경/삭제 이후 merged 안의 위치
+    for entry in entries:
+        target = (entry['entity'], entry['key'])
+        index = latest.get(target)
+        if entry['op'] == 'upsert':
+            if index is None:
+                latest[target] = len(merged)
+                merged.append(entry)
+            else:
+                previous = merged[index]
+                merged[index] = dict(
+                    entry,
+                    data=dict(previous['data'], **entry['data']),
+                    merged=superseded_ids(previous, entry)
+                )
+            continue
+        if entry['op'] == 'delete' and index is not None:
+            entry = dict(entry, merged=superseded_ids(merged[index], entry))
+            merged[index] = None
+        latest.clear()
+        merged.append(entry)
+    merged = [entry for entry in merged if entry is not None]
+    return merged, len(entries) - len(merged)
+
+def superseded_ids(previous, entry):
+    """entry가 previous를 대신할 때 entry에 담을 이전 change_id 목록"""
+    return (previous.get('merged') or []) + [previous['id']] + (entry.get('merged') or [])
+
+def apply_changes(conn, entries):
+    """다른 서버의 변경 묶음을 순서대로 적용하고 (적용 수, 중복 수) 반환 (호출한 쪽 트랜잭션 안에서)
+
+    받은 변경은 다시 다른 서버로 보내지 않는다. (원래 서버가 직접 보냄)
+    """
+    applied = duplicates = 0
+    for entry in entries:
+        validate_change(entry)
+        if not insert_change(conn, entry):
+            duplicates += 1
+            continue
+        apply_change(conn, entry)
+        applied += 1
+    if applied:
+        bump_menu_version(conn)
+    return applied, duplicates
+
+# Render 서버 동기화 대기열 (sync_outbox)
+#
+# 로컬에서 데이터를 바꾸는 요청은 변경을 커밋하는 트랜잭션 안에서 보낼 요청을
+# sync_outbox에 추가하고 바로 응답한다. 워커 프로세스마다 백그라운드 스레드가
+# 대기열을 id 순서대로 하나씩 보내며, 연결 오류/5xx/429는 지수 백오프로 다시
+# 시도한다. 앞의 변경이 끝나야 다음 변경을 보내므로 순서가 유지되고, 여러 워커가
+# 같은 행을 동시에 보내지 않도록 맨 앞 행에 locked_until로 임대를 건다.
+
+def enqueue_sync(conn, method, path, body=None):
+    """동기화 대상 서버로 보낼 요청을 대기열에 추가 (변경과 같은 트랜잭션에서 호출)
+
+    동기화 대상이 없으면(Render 서버) 아무것도 하지 않고 False를 반환한다.
+    커밋한 뒤 sync_worker.wake()를 호출하면 바로 전송을 시작한다.
+    """
+    if not SYNC_TARGET_URL:
+        return False
+    now = time.time()
+    conn.execute(
+        'INSERT INTO sync_outbox (method, path, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)',
+        (method, path, json.dumps(body, ensure_ascii=False) if body is not None else None, now, now)
+    )
+    return True
+
+class SyncOutboxWorker:
+    """sync_outbox를 순서대로 전송하는 백그라운드 스레드 (워커 프로세스마다 하나)"""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_success_at = None
+        self.pulled = 0
+        self.last_pull_at = None
+        self._next_pull_at = 0
+        # 합쳐져 따로 보내지 않은 대기열 행 수와 변경 수
+        self.suppressed = 0
+        self.changes_sent = 0
+        self.changes_suppressed = 0
+
+    def ensure_started(self):
+        if not SYNC_TARGET_URL:
+            return
+        with self._lock:
+            # fork된 워커에는 부모의 스레드가 없으므로 프로세스마다 새로 시작
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sync-outbox', daemon=True)
+            self._thread.start()
+            print(f"동기화 대기열 전송 시작: {SYNC_TARGET_URL}")
+
+    def wake(self):
+        self.ensure_started()
+        self._wakeup.set()
+
+    def _run(self):
+        # 새로 시작한 노드도 바로 이미지를 갖추도록 처음 한 번 이미지 동기화
+        image_sync.start(SYNC_TARGET_URL)
+        while True:
+            try:
+                delay = self.drain_once()
+            except Exception as e:
+                print(f"동기화 대기열 처리 중 오류: {str(e)}")
+                delay = SYNC_POLL_INTERVAL
+            if delay > 0 and SYNC_PULL_INTERVAL > 0 and time.time() >= self._next_pull_at:
+                self._next_pull_at = time.time() + SYNC_PULL_INTERVAL
+                try:
+                    # 받아 온 메뉴가 새 이미지를 참조할 수 있으므로 이미지도 맞춤
+                    if self.pull_once():
+                        image_sync.start(SYNC_TARGET_URL)
+                except Exception as e:
+                    print(f"동기화 대상 서버의 변경 받기 실패: {str(e)}")
+            if delay > 0:
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+
+    def drain_once(self):
+        """맨 앞 요청(이어지는 변경 묶음은 합쳐서)을 보내고 다음 확인까지 기다릴 시간(초)을 반환 (바로 이어서 보내면 0)"""
+        now = time.time()
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT id, method, path, body, attempts, next_attempt_at, locked_until, created_at "
+                "FROM sync_outbox WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return SYNC_POLL_INTERVAL
+            wait = max(row['next_attempt_at'], row['locked_until'] or 0) - now
+            # 변경 묶음은 SYNC_COALESCE_WINDOW 동안 뒤따르는 편집을 기다렸다가 함께 보냄
+            if is_change_batch(row):
+                wait = max(wait, row['created_at'] + SYNC_COALESCE_WINDOW - now)
+            if wait > 0:
+                return min(wait, SYNC_POLL_INTERVAL)
+            claimed = conn.execute(
+                'UPDATE sync_outbox SET locked_until = ? WHERE id = ? AND (locked_until IS NULL OR locked_until <= ?)',
+                (now + SYNC_REQUEST_TIMEOUT * 2, row['id'], now)
+            ).rowcount
+            if not claimed:
+                return SYNC_POLL_INTERVAL
+            
+            # 바로 뒤에 이어지는 변경 묶음을 하나의 요청으로 합침 (맨 앞 행의 임대로 함께 보호됨)
+            row_ids = [row['id']]
+            body = row['body']
+            if is_change_batch(row):
+                entries = json.loads(row['body'])['changes']
+                following = conn.execute(
+                    "SELECT id, method, path, body FROM sync_outbox "
+                    "WHERE status = 'pending' AND id > ? ORDER BY id LIMIT ?",
+                    (row['id'], SYNC_COALESCE_MAX_ROWS)
+                ).fetchall()
+                for other in following:
+                    if not is_change_batch(other):
+                        break
+                    more = json.loads(other['body'])['changes']
+                    if len(entries) + len(more) > CHANGE_BATCH_MAX:
+                        break
+                    entries.extend(more)
+                    row_ids.append(other['id'])
+                merged, suppressed = coalesce_changes(entries)
+                body = json.dumps({'changes': merged}, ensure_ascii=False)
         
-        print(f"Render 서버 응답 상태 코드: {response.status_code}")
-        print(f"Render 서버 응답 내용: {response.text[:200]}")
+        error, retry = self._send(row['method'], row['path'], body)
+        attempts = row['attempts'] + 1
+        with get_db() as conn:
+            if error is None:
+                conn.executemany('DELETE FROM sync_outbox WHERE id = ?', [(row_id,) for row_id in row_ids])
+                self.sent += 1
+                self.suppressed += len(row_ids) - 1
+                if is_change_batch(row):
+                    self.changes_sent += len(merged)
+                    self.changes_suppressed += suppressed
+                self.last_success_at = time.time()
+                print(f"동기화 완료: {row['method']} {row['path']} (대기열 {len(row_ids)}개 합침)")
+                return 0
+            if retry and attempts < SYNC_MAX_ATTEMPTS:
+                delay = min(SYNC_BACKOFF_MAX, SYNC_BACKOFF_BASE * 2 ** row['attempts']) * random.uniform(0.5, 1.0)
+                conn.execute(
+                    'UPDATE sync_outbox SET attempts = ?, next_attempt_at = ?, locked_until = NULL, last_error = ? WHERE id = ?',
+                    (attempts, time.time() + delay, error, row['id'])
+                )
+                self.retried += 1
+                print(f"동기화 실패, {delay:.1f}초 후 다시 시도 ({attempts}회): {row['method']} {row['path']} - {error}")
+                return min(delay, SYNC_POLL_INTERVAL)
+            # 상대 서버가 거절했거나(4xx) 재시도 횟수를 넘김 - 기록만 남기고 다음 요청으로
+            conn.execute(
+                "UPDATE sync_outbox SET status = 'failed', attempts = ?, locked_until = NULL, last_error = ? WHERE id = ?",
+                (attempts, error, row['id'])
+            )
+            self.failed += 1
+            print(f"동기화 포기: {row['method']} {row['path']} - {error}")
+            return 0
+
+    def pull_once(self):
+        """동기화 대상 서버의 새 변경을 받아 적용하고 적용한 수를 반환
+
+        보낼 변경이 남아 있으면 받지 않는다. (먼저 보낸 뒤 받아야 로컬 변경이 덮이지 않음)
+        """
+        with get_db() as conn:
+            if conn.execute("SELECT 1 FROM sync_outbox WHERE status = 'pending' LIMIT 1").fetchone():
+                return 0
+            since = conn.execute("SELECT value FROM app_meta WHERE key = 'change_pull_seq'").fetchone()[0]
         
-        if response.status_code == 200:
-            print("메뉴 데이터가 Render 서버에 저장되었습니다.")
-            return True
-        else:
-            print(f"Render 서버에 메뉴 데이터를 저장하는데 실패했습니다: {response.status_code}")
-            print(f"응답 내용: {response.text[:200]}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Render 서버 요청 실패: {str(e)}")
-        import traceback
-        print("상세 오류:")
-        print(traceback.format_exc())
-        return False
+        total = 0
+        while True:
+            response = sync_client.session(SYNC_TARGET_URL).get(
+                f"{SYNC_TARGET_URL}/api/changes",
+                params={'since': since, 'exclude_origin': SYNC_NODE_ID},
+                timeout=SYNC_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            page = response.json()
+            with get_db() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    applied, _ = apply_changes(conn, page['changes'])
+                    conn.execute(
+                        "UPDATE app_meta SET value = ?, updated_at = ? WHERE key = 'change_pull_seq'",
+                        (page['last_seq'], time.time())
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            if applied:
+                refresh_menu_snapshot()
+                print(f"동기화 대상 서버의 변경 {applied}개 적용 (seq {since} -> {page['last_seq']})")
+            total += applied
+            since = page['last_seq']
+            if not page['has_more']:
+                break
+        self.pulled += total
+        self.last_pull_at = time.time()
+        return total
+
+    def _send(self, method, path, body):
+        """(오류 메시지, 다시 시도할지) - 성공이면 (None, False)"""
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        try:
+            response = sync_client.session(SYNC_TARGET_URL).request(
+                method,
+                f"{SYNC_TARGET_URL}{path}",
+                data=body.encode('utf-8') if body is not None else None,
+                headers=headers,
+                timeout=SYNC_REQUEST_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            return str(e), True
+        if response.status_code < 300:
+            return None, False
+        error = f"HTTP {response.status_code}: {response.text[:200]}"
+        return error, response.status_code >= 500 or response.status_code == 429
+
+    def stats(self):
+        now = time.time()
+        conn = get_db()
+        try:
+            depth = conn.execute("SELECT COUNT(*) FROM sync_outbox WHERE status = 'pending'").fetchone()[0]
+            failed = conn.execute("SELECT COUNT(*) FROM sync_outbox WHERE status = 'failed'").fetchone()[0]
+            head = conn.execute(
+                "SELECT method, path, attempts, next_attempt_at, last_error, created_at "
+                "FROM sync_outbox WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            'target': SYNC_TARGET_URL,
+            'worker_running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+            'pending': depth,
+            'failed': failed,
+            # 가장 오래 기다린 변경의 지연 시간 (초)
+            'lag_seconds': round(now - head['created_at'], 3) if head else 0,
+            'head': {
+                'method': head['method'],
+                'path': head['path'],
+                'attempts': head['attempts'],
+                'next_attempt_in': round(max(0, head['next_attempt_at'] - now), 3),
+                'last_error': head['last_error']
+            } if head else None,
+            # 이 워커 프로세스에서 보낸 결과
+            'sent': self.sent,
+            'retried': self.retried,
+            'gave_up': self.failed,
+            'last_success_at': self.last_success_at,
+            # 합쳐서 따로 보내지 않은 대기열 행 수, 보낸/합쳐져 빠진 변경 수
+            'suppressed': self.suppressed,
+            'changes_sent': self.changes_sent,
+            'changes_suppressed': self.changes_suppressed,
+            # 동기화 대상 서버에서 받아 온 변경
+            'pulled': self.pulled,
+            'last_pull_at': self.last_pull_at,
+            'coalesce_window': SYNC_COALESCE_WINDOW,
+            # 카테고리 순서를 바로 전달하는 서버들 (회로 차단기 상태, 보낸/합쳐진 수)
+            'peers': sync_client.stats(),
+            'fanout': peer_fanout.stats(),
+            'images': image_sync.stats()
+        }
+
+sync_worker = SyncOutboxWorker()
+
+def is_change_batch(row):
+    return row['method'] == 'POST' and row['path'] == '/api/changes'
+
+class PeerFanout:
+    """변경 묶음을 다른 서버들에 전달 (SYNC_COALESCE_WINDOW 동안 모아 합친 뒤 백그라운드에서 전송)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self.sent = 0
+        self.suppressed = 0
+        self.last_results = {}
+
+    def submit(self, peers, entries):
+        if not peers or not entries:
+            return
+        with self._lock:
+            self._pending.setdefault(tuple(peers), []).extend(entries)
+            if self._timer is None:
+                self._timer = threading.Timer(SYNC_COALESCE_WINDOW, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._timer = None
+        for peers, entries in pending.items():
+            merged, suppressed = coalesce_changes(entries)
+            try:
+                results = sync_client.fan_out(list(peers), 'POST', '/api/changes', json={'changes': merged})
+            except Exception as e:
+                print(f"서버 동기화 중 일반 오류: {str(e)}")
+                continue
+            self.sent += len(merged)
+            self.suppressed += suppressed
+            self.last_results.update(results)
+            for server_url, result in results.items():
+                if result['status'] == 'ok':
+                    print(f"{server_url}에 변경 {len(merged)}개 전달 성공 ({result['elapsed']}초, {suppressed}개 합침)")
+                else:
+                    # 개별 서버 동기화 실패는 무시 (대상 서버에는 대기열로도 전송됨)
+                    print(f"{server_url}에 변경 전달 실패: {result}")
+
+    def stats(self):
+        return {
+            'changes_sent': self.sent,
+            'changes_suppressed': self.suppressed,
+            'last_results': {server_url: result['status'] for server_url, result in self.last_results.items()}
+        }
+
+peer_fanout = PeerFanout()
+
+# 이전에 보내지 못한 변경도 전송되도록 워커 프로세스의 첫 요청에서 전송 스레드 시작
+@app.before_request
+def start_sync_worker():
+    sync_worker.ensure_started()
+
+@app.route('/api/sync/status', methods=['GET'])
+def sync_status():
+    try:
+        sync_worker.ensure_started()
+        return jsonify(sync_worker.stats())
     except Exception as e:
-        print(f"Render 서버 연결 실패: {str(e)}")
-        import traceback
-        print("상세 오류:")
-        print(traceback.format_exc())
-        return False
+        print(f"동기화 상태 조회 실패: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-@app.route('/api/menu', methods=['GET'])
-def get_menu():
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
     try:
-        print("=== 메뉴 데이터 조회 시작 ===")
+        since = request.args.get('since', 0, type=int)
+        limit = min(max(request.args.get('limit', CHANGE_PAGE_SIZE, type=int), 1), CHANGE_PAGE_SIZE)
+        # 요청한 서버가 만든 변경은 이미 가지고 있으므로 제외할 수 있음
+        exclude_origin = request.args.get('exclude_origin', '')
         conn = get_db()
-        cursor = conn.cursor()
-        
-        # 테이블 존재 여부 확인
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='menu'")
-        if not cursor.fetchone():
-            print("menu 테이블이 존재하지 않습니다.")
+        try:
+            # 두 조회를 같은 읽기 트랜잭션(스냅샷)에서 실행 - 그사이 커밋된 변경을 건너뛰지 않도록
+            conn.execute('BEGIN')
+            try:
+                rows = conn.execute(
+                    'SELECT seq, change_id, origin, entity, entity_key, op, data, created_at, merged_ids FROM change_log '
+                    'WHERE seq > ? AND origin != ? ORDER BY seq LIMIT ?',
+                    (since, exclude_origin, limit + 1)
+                ).fetchall()
+                latest_seq = conn.execute('SELECT MAX(seq) FROM change_log').fetchone()[0] or 0
+            finally:
+                conn.commit()
+        finally:
             conn.close()
-            init_db()
-            conn = get_db()
-            cursor = conn.cursor()
-        else:
-            # 테이블이 존재하면 스키마 업데이트 확인
-            update_schema(conn)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            'changes': [change_entry(row) for row in rows],
+            # 다음 요청의 since (제외된 변경이 끝에 있으면 그 번호까지 건너뜀)
+            'last_seq': rows[-1]['seq'] if has_more else max(since, latest_seq),
+            'has_more': has_more,
+            'origin': SYNC_NODE_ID
+        })
+    except Exception as e:
+        print(f"변경 기록 조회 실패: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/changes', methods=['POST'])
+def push_changes():
+    try:
+        data = request.get_json(silent=True) or {}
+        entries = data.get('changes')
+        if not isinstance(entries, list):
+            return jsonify({'error': '변경 목록이 필요합니다.'}), 400
+        if len(entries) > CHANGE_BATCH_MAX:
+            return jsonify({'error': f'한 번에 {CHANGE_BATCH_MAX}개까지 보낼 수 있습니다.'}), 400
         
+        conn = get_db()
         try:
-            # 카테고리별로 메뉴 조회
-            cursor.execute("""
-                SELECT id, category, name, price, image, temperature, order_index
-                FROM menu
-                ORDER BY category, order_index
-            """)
-            rows = cursor.fetchall()
-            print(f"조회된 메뉴 수: {len(rows)}")
-            
-            # 카테고리별로 메뉴 정리
-            menu_by_category = {}
-            for row in rows:
-                category = row['category']
-                if category not in menu_by_category:
-                    menu_by_category[category] = []
-                
-                menu_by_category[category].append({
-                    'id': row['id'],
-                    'name': row['name'],
-                    'price': row['price'],
-                    'image': row['image'],
-                    'temperature': row['temperature'],
-                    'order_index': row['order_index']
-                })
-            
-            print("=== 메뉴 데이터 조회 완료 ===")
-            return jsonify(menu_by_category)
-            
-        except Exception as e:
-            print(f"메뉴 데이터 조회 중 오류 발생: {str(e)}")
-            import traceback
-            print("상세 오류:")
-            print(traceback.format_exc())
-            return jsonify({'error': str(e)}), 500
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                applied, duplicates = apply_changes(conn, entries)
+                conn.commit()
+            except ValueError as e:
+                conn.rollback()
+                return jsonify({'error': str(e)}), 400
+            except Exception:
+                conn.rollback()
+                raise
+            if applied:
+                refresh_menu_snapshot(conn)
         finally:
             conn.close()
-            
+        
+        print(f"변경 묶음 수신: 적용 {applied}, 중복 {duplicates}")
+        return jsonify({'applied': applied, 'duplicates': duplicates}), 200
+    except Exception as e:
+        print(f"변경 묶음 적용 실패: {str(e)}")
+        import traceback
+        print("상세 오류:")
+        print(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/menu', methods=['GET'])
+def get_menu():
+    try:
+        print("=== 메뉴 데이터 조회 시작 ===")
+        # 메모리 스냅샷 사용 (데이터 버전이 바뀐 경우에만 다시 조회)
+        snapshot = get_menu_snapshot()
+        print(f"메뉴 스냅샷 버전: {snapshot.version}")
+        print("=== 메뉴 데이터 조회 완료 ===")
+        return cached_json_response('menu', snapshot, lambda: snapshot.menu)
     except Exception as e:
         print(f"메뉴 데이터 조회 실패: {str(e)}")
         import traceback
@@ -771,55 +2442,74 @@ def add_menu():
         if not data or 'category' not in data or 'name' not in data or 'price' not in data:
             return jsonify({'error': '필수 정보가 누락되었습니다.'}), 400
         
+        # 이미지 파일 처리 (메뉴 트랜잭션을 열기 전에 저장)
+        image = 'logo.png'  # 기본 이미지
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename:
+                try:
+                    # save_image 함수를 사용하여 이미지 저장
+                    image = save_image(file)
+                except ValueError as img_error:
+                    # 제한을 넘었거나 이미지가 아니면 메뉴를 추가하지 않고 알림
+                    return upload_error_response(img_error)
+                except Exception as img_error:
+                    print(f"이미지 저장 중 오류 발생: {str(img_error)}")
+                    # 이미지 저장 실패 시 기본 이미지 사용
+        
         conn = get_db()
         cursor = conn.cursor()
         
         # 트랜잭션 시작
-        conn.execute("BEGIN TRANSACTION")
+        conn.execute("BEGIN IMMEDIATE")
         
         try:
+            # 카테고리 조회 (없으면 추가)
+            category_id = ensure_category(conn, data['category'])
+            
             # 해당 카테고리의 마지막 order_index 조회
             cursor.execute("""
                 SELECT MAX(order_index) as max_order
                 FROM menu
-                WHERE category = ?
-            """, (data['category'],))
+                WHERE category_id = ?
+            """, (category_id,))
             result = cursor.fetchone()
-            next_order = (result['max_order'] + 1) if result['max_order'] is not None else 0
-            
-            # 이미지 파일 처리
-            image = 'logo.png'  # 기본 이미지
-            if 'image' in request.files:
-                file = request.files['image']
-                if file and file.filename:
-                    try:
-                        # save_image 함수를 사용하여 이미지 저장
-                        image = save_image(file)
-                    except Exception as img_error:
-                        print(f"이미지 저장 중 오류 발생: {str(img_error)}")
-                        # 이미지 저장 실패 시 기본 이미지 사용
+            next_order = key_between(result['max_order'], None)
             
             # 새 메뉴 추가
             cursor.execute("""
-                INSERT INTO menu (category, name, price, image, temperature, order_index)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO menu (category_id, name, price, image, temperature, order_index, sync_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (
-                data['category'],
+                category_id,
                 data['name'],
                 data['price'],
                 image,
                 data.get('temperature', ''),
-                next_order
+                next_order,
+                new_menu_sync_key()
             ))
+            inserted_id = cursor.lastrowid
+            bump_menu_version(conn)
+            log_changes(conn, [menu_change(conn, inserted_id, {
+                'category': data['category'],
+                'name': data['name'],
+                'price': str(data['price']),
+                'image': image,
+                'temperature': data.get('temperature') or '',
+                'order_index': next_order
+            })])
             
             # 트랜잭션 커밋
             conn.commit()
+            refresh_menu_snapshot(conn)
+            sync_worker.wake()
             
             # 성공 응답
-            inserted_id = cursor.lastrowid
             return jsonify({
                 'message': f'메뉴 "{data["name"]}"가 추가되었습니다.',
-                'id': inserted_id
+                'id': inserted_id,
+                'image': image
             })
             
         except Exception as e:
@@ -847,52 +2537,65 @@ def update_menu(menu_id, category):
         conn = get_db()
         cursor = conn.cursor()
         
+        # 기존 메뉴 정보 조회
+        cursor.execute("""
+            SELECT m.* FROM menu m
+            JOIN categories c ON c.id = m.category_id
+            WHERE m.id = ? AND c.name = ?
+        """, (menu_id, category))
+        menu = cursor.fetchone()
+        if not menu:
+            return jsonify({'error': '메뉴를 찾을 수 없습니다.'}), 404
+        
+        # 이미지 파일 처리 (메뉴 트랜잭션을 열기 전에 저장)
+        image = menu['image']  # 기본값으로 현재 이미지 사용
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename:
+                try:
+                    # save_image 함수를 사용하여 이미지 저장
+                    image = save_image(file)
+                except ValueError as img_error:
+                    # 제한을 넘었거나 이미지가 아니면 수정하지 않고 알림
+                    return upload_error_response(img_error)
+                except Exception as img_error:
+                    print(f"이미지 저장 중 오류 발생: {str(img_error)}")
+                    # 이미지 저장 실패 시 기존 이미지 유지
+        
         # 트랜잭션 시작
-        conn.execute("BEGIN TRANSACTION")
+        conn.execute("BEGIN IMMEDIATE")
         
         try:
-            # 기존 메뉴 정보 조회
-            cursor.execute("SELECT * FROM menu WHERE id = ? AND category = ?", (menu_id, category))
-            menu = cursor.fetchone()
-            if not menu:
-                return jsonify({'error': '메뉴를 찾을 수 없습니다.'}), 404
-            
-            # 이미지 파일 처리
-            image = menu['image']  # 기본값으로 현재 이미지 사용
-            if 'image' in request.files:
-                file = request.files['image']
-                if file and file.filename:
-                    try:
-                        # save_image 함수를 사용하여 이미지 저장
-                        image = save_image(file)
-                    except Exception as img_error:
-                        print(f"이미지 저장 중 오류 발생: {str(img_error)}")
-                        # 이미지 저장 실패 시 기존 이미지 유지
-            
             # 메뉴 정보 업데이트
             update_fields = []
             params = []
+            changed = {}
             for key in ['name', 'price', 'temperature']:
                 if key in data:
                     update_fields.append(f"{key} = ?")
                     params.append(data[key])
+                    changed[key] = data[key]
             
             # 이미지 필드 추가
             update_fields.append("image = ?")
             params.append(image)
+            changed['image'] = image
             
             if update_fields:
                 params.append(menu_id)
-                params.append(category)
                 cursor.execute(f"""
                     UPDATE menu
                     SET {', '.join(update_fields)}
-                    WHERE id = ? AND category = ?
+                    WHERE id = ?
                 """, params)
+                bump_menu_version(conn)
+                log_changes(conn, [menu_change(conn, menu_id, changed)])
             
             # 트랜잭션 커밋
             conn.commit()
-            return jsonify({'message': '메뉴가 수정되었습니다.'})
+            refresh_menu_snapshot(conn)
+            sync_worker.wake()
+            return jsonify({'message': '메뉴가 수정되었습니다.', 'image': image})
             
         except Exception as e:
             # 오류 발생 시 롤백
@@ -915,13 +2618,19 @@ def delete_menu(menu_id):
         conn.execute("BEGIN TRANSACTION")
         
         try:
-            # 메뉴 삭제
-            cursor.execute("DELETE FROM menu WHERE id = ?", (menu_id,))
-            if cursor.rowcount == 0:
+            # 메뉴 삭제 (동기화 키를 먼저 기록)
+            try:
+                change = menu_delete(conn, menu_id)
+            except LookupError:
                 return jsonify({'error': '메뉴를 찾을 수 없습니다.'}), 404
+            cursor.execute("DELETE FROM menu WHERE id = ?", (menu_id,))
+            bump_menu_version(conn)
+            log_changes(conn, [change])
             
             # 트랜잭션 커밋
             conn.commit()
+            refresh_menu_snapshot(conn)
+            sync_worker.wake()
             return jsonify({'message': '메뉴가 삭제되었습니다.'})
             
         except Exception as e:
@@ -935,6 +2644,38 @@ def delete_menu(menu_id):
         if 'conn' in locals():
             conn.close()
 
+@app.route('/api/menu/<int:menu_id>/move', methods=['POST'])
+def move_menu(menu_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        before = data.get('before')
+        after = data.get('after')
+        if (before is None) == (after is None):
+            return jsonify({'error': 'before 또는 after 중 하나만 지정해야 합니다.'}), 400
+        
+        try:
+            changed, version = move_menu_item(
+                menu_id,
+                before=int(before) if before is not None else None,
+                after=int(after) if after is not None else None
+            )
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'message': '메뉴 순서가 업데이트되었습니다.',
+            'changed': changed,
+            'version': version
+        }), 200
+    except Exception as e:
+        print(f"메뉴 이동 중 오류 발생: {str(e)}")
+        import traceback
+        print("상세 오류:")
+        print(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
 def create_default_image(filename, text=""):
     try:
         print(f"기본 이미지 생성 시작: {filename}")
@@ -970,10 +2711,7 @@ def create_default_image(filename, text=""):
         # 데이터베이스에 저장
         conn = get_db()
         try:
-            conn.execute(
-                'INSERT OR REPLACE INTO images (filename, data, content_type) VALUES (?, ?, ?)',
-                (filename, image_data, 'image/jpeg')
-            )
+            store_image(conn, filename, image_data, 'image/jpeg', img.size)
             conn.commit()
             print(f"이미지 저장 성공: {filename}")
         except Exception as e:
@@ -990,203 +2728,189 @@ def create_default_image(filename, text=""):
 
 @app.route('/api/images/<filename>', methods=['GET', 'OPTIONS'])
 def serve_image(filename):
-    print(f"\n=== 이미지 요청 시작: {filename} ===")
-    print(f"요청 메서드: {request.method}")
-    print(f"요청 URL: {request.url}")
-    print(f"요청 헤더: {dict(request.headers)}")
-    
-    if request.method == 'OPTIONS':
-        print("OPTIONS 요청 처리")
-        response = app.make_default_options_response()
-        return response
-
-    try:
-        print(f"이미지 파일 요청: {filename}")
-        
-        # 데이터베이스 연결 확인
-        conn = get_db()
-        if not conn:
-            error_msg = "데이터베이스 연결 실패"
-            print(error_msg)
-            return jsonify({'error': error_msg}), 500
-            
-        cursor = conn.cursor()
-        print("데이터베이스 연결 성공")
-        
-        try:
-            # 이미지 조회
-            cursor.execute('SELECT data, content_type FROM images WHERE filename = ?', (filename,))
-            result = cursor.fetchone()
-            
-            if result and result['data']:
-                print(f"이미지 찾음: {filename}, 데이터 크기: {len(result['data'])} bytes")
-                
-                # 이미지 데이터 검증
-                try:
-                    img = Image.open(io.BytesIO(result['data']))
-                    print(f"이미지 포맷: {img.format}, 크기: {img.size}")
-                    
-                    # 이미지 데이터를 다시 바이트로 변환
-                    img_byte_arr = io.BytesIO()
-                    img.save(img_byte_arr, format=img.format if img.format else 'JPEG', quality=85, optimize=True)
-                    img_byte_arr.seek(0)
-                    
-                    response = send_file(
-                        img_byte_arr,
-                        mimetype=result['content_type'],
-                        as_attachment=False,
-                        download_name=filename,
-                        conditional=True
-                    )
-                    
-                    # CORS 및 보안 헤더 설정
-                    origin = request.headers.get('Origin')
-                    if origin:
-                        response.headers['Access-Control-Allow-Origin'] = origin
-                    else:
-                        response.headers['Access-Control-Allow-Origin'] = '*'
-                    
-                    response.headers.update({
-                        'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                        'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With, Accept, Origin',
-                        'Access-Control-Max-Age': '3600',
-                        'X-Content-Type-Options': 'nosniff',
-                        'Cache-Control': 'public, max-age=31536000',
-                        'Pragma': 'cache',
-                        'Expires': 'Thu, 31 Dec 2037 23:55:55 GMT',
-                        'Referrer-Policy': 'no-referrer'
-                    })
-                    
-                    print(f"이미지 전송 완료: {filename}")
-                    return response
-                    
-                except Exception as img_error:
-                    print(f"이미지 처리 중 오류: {str(img_error)}")
-                    print("기본 이미지 생성 시도")
-                    return create_and_serve_default_image(filename)
-            else:
-                print(f"이미지를 찾을 수 없음: {filename}, 기본 이미지 생성")
-                return create_and_serve_default_image(filename)
-                
-        except Exception as e:
-            print(f"데이터베이스 쿼리 실패: {str(e)}")
-            return jsonify({'error': str(e)}), 500
-        finally:
-            conn.close()
-            print("데이터베이스 연결 종료")
-            
-    except Exception as e:
-        print(f"이미지 처리 중 오류 발생: {str(e)}")
-        import traceback
-        print("상세 오류:")
-        print(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
-    finally:
-        print(f"=== 이미지 요청 종료: {filename} ===\n")
-
-def create_and_serve_default_image(filename):
-    """기본 이미지를 생성하고 서빙하는 함수"""
-    try:
-        print(f"\n=== 기본 이미지 생성 시작: {filename} ===")
-        # 기본 이미지 생성 (회색 배경의 200x200 이미지)
-        img = Image.new('RGB', (200, 200), color='#CCCCCC')
-        
-        # 텍스트 추가
-        try:
-            from PIL import ImageDraw, ImageFont
-            draw = ImageDraw.Draw(img)
-            
-            # 기본 폰트 사용
-            try:
-                font_size = 20
-                font = ImageFont.truetype("Arial", font_size)
-            except:
-                print("Arial 폰트 로드 실패, 기본 폰트 사용")
-                font = ImageFont.load_default()
-            
-            # 파일명을 텍스트로 추가
-            text = filename.split('.')[0]  # 확장자 제거
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            # 텍스트를 이미지 중앙에 배치
-            x = (200 - text_width) / 2
-            y = (200 - text_height) / 2
-            draw.text((x, y), text, font=font, fill='#666666')
-            print("텍스트 추가 완료")
-            
-        except Exception as text_error:
-            print(f"텍스트 추가 실패: {str(text_error)}")
-        
-        # 이미지를 JPEG로 변환
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=85, optimize=True)
-        image_data = output.getvalue()
-        print(f"이미지 변환 완료: {len(image_data)} bytes")
-        
-        # 데이터베이스에 이미지 저장
-        conn = get_db()
-        try:
-            # 새 이미지 저장
-            conn.execute(
-                'INSERT OR REPLACE INTO images (filename, data, content_type) VALUES (?, ?, ?)',
-                (filename, image_data, 'image/jpeg')
-            )
-            conn.commit()
-            print(f"기본 이미지 데이터베이스 저장 완료: {filename}")
-            
-            # 이미지 서빙
-            img_io = io.BytesIO(image_data)
-            img_io.seek(0)
-            
-            response = send_file(
-                img_io,
-                mimetype='image/jpeg',
-                as_attachment=False,
-                download_name=filename,
-                conditional=True
-            )
-            
-            # CORS 및 보안 헤더 설정
-            origin = request.headers.get('Origin')
-            if origin:
-                response.headers['Access-Control-Allow-Origin'] = origin
-            else:
-                response.headers['Access-Control-Allow-Origin'] = '*'
-            
-            response.headers.update({
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With, Accept, Origin',
-                'Access-Control-Max-Age': '3600',
-                'X-Content-Type-Options': 'nosniff',
-                'Cache-Control': 'public, max-age=31536000',
-                'Pragma': 'cache',
-                'Expires': 'Thu, 31 Dec 2037 23:55:55 GMT',
-                'Referrer-Policy': 'no-referrer'
-            })
-            
-            print(f"기본 이미지 전송 준비 완료: {filename}")
-            return response
-            
-        except Exception as db_error:
-            print(f"기본 이미지 데이터베이스 저장 실패: {str(db_error)}")
-            import traceback
-            print("상세 오류:")
-            print(traceback.format_exc())
-            return jsonify({'error': '이미지를 생성할 수 없습니다.'}), 500
+    if request.method == 'OPTIONS':
+        return app.make_default_options_response()
+
+    try:
+        # ?w=가로 - 미리 만든 크기별 변형 중 가장 가까운 것 사용
+        requested_width = request.args.get('w', type=int)
+        if not requested_width or requested_width <= 0:
+            requested_width = None
+        # Accept 헤더로 WebP/AVIF 선택 (지원하지 않으면 JPEG/원본)
+        fmt = negotiate_image_format()
+        # 같은 변형으로 이어지는 요청은 캐시 항목 하나를 함께 사용
+        bucket = pick_variant_width(requested_width, float('inf')) if requested_width else None
+        cache_key = (filename, bucket, fmt)
+        
+        # 최근에 없다고 확인한 파일명은 DB 조회 없이 자리표시 이미지
+        # (메뉴 버전은 이 프로세스가 가진 스냅샷 기준 - 메모리만 확인)
+        snapshot = _menu_snapshot
+        label = missing_images.get(filename, snapshot.version if snapshot else None)
+        if label is not None:
+            return serve_placeholder_image(filename, 'missing', bucket, label)
+        
+        conn = get_db()
+        try:
+            image_cache.check_version(get_images_version(conn))
+            cached = image_cache.get(cache_key)
+            if cached is None:
+                # 메타데이터만 조회 (이미지 바이트는 파일에서 읽음)
+                result = conn.execute(
+                    'SELECT content_type, sha256, width FROM images WHERE filename = ?', (filename,)
+                ).fetchone()
+                job_status = get_image_job_status(conn, filename)[0] if not result else None
         finally:
             conn.close()
-            print("데이터베이스 연결 종료")
+        
+        if cached is not None:
+            response = image_bytes_response(*cached)
+        else:
+            if job_status == 'pending':
+                # 업로드 이미지 처리 중 - 자리표시 이미지
+                # (202는 캐시 정책 대상이 아니므로 no-store로 나가 완료 후 바로 교체됨)
+                return serve_placeholder_image(filename, 'pending', bucket)
+            if job_status == 'failed':
+                # 처리하지 못한 업로드는 예전처럼 기본 로고로 대신함
+                print(f"이미지 처리 실패로 로고 사용: {filename}")
+                return serve_image('logo.png')
+            if not result:
+                print(f"이미지를 찾을 수 없음: {filename}, 자리표시 이미지 사용")
+                return serve_placeholder_image(filename, 'missing', bucket, remember_missing_image(filename))
+            
+            if not image_store.exists(result['sha256']):
+                print(f"이미지 파일 없음: {filename} ({result['sha256']}), 자리표시 이미지 사용")
+                return serve_placeholder_image(filename, 'missing', bucket, remember_missing_image(filename))
+            
+            original_width = result['width'] or 0
+            width = original_width
+            if requested_width:
+                width = pick_variant_width(requested_width, original_width) or original_width
+            
+            digest, content_type = result['sha256'], result['content_type']
+            if width and (fmt or width != original_width):
+                variant = get_image_variant(filename, result['sha256'], width, fmt or 'jpeg')
+                if variant:
+                    digest, content_type = variant
+            
+            # 저장할 때 검사/변환을 마친 파일을 그대로 전송 (작은 파일은 메모리 캐시에 보관)
+            if os.path.getsize(image_store.path_for(digest)) <= image_cache.max_entry_bytes:
+                data = image_store.read(digest)
+                image_cache.put(cache_key, digest, content_type, data)
+                response = image_bytes_response(digest, content_type, data)
+            else:
+                response = image_file_response(digest, content_type)
+        
+        # 같은 URL이라도 Accept에 따라 다른 형식을 보내므로 캐시에 알림
+        response.vary.add('Accept')
+        return response
             
     except Exception as e:
-        print(f"기본 이미지 생성 실패: {str(e)}")
+        print(f"이미지 처리 중 오류 발생: {str(e)}")
         import traceback
         print("상세 오류:")
         print(traceback.format_exc())
-        return jsonify({'error': '이미지를 생성할 수 없습니다.'}), 500
-    finally:
-        print(f"=== 기본 이미지 생성 종료: {filename} ===\n")
+        return jsonify({'error': str(e)}), 500
+
+def render_placeholder_image(text, size=(200, 200)):
+    """회색 배경 가운데에 text를 쓴 자리표시 이미지의 JPEG 바이트"""
+    img = Image.new('RGB', size, color='#CCCCCC')
+    
+    # 텍스트 추가
+    try:
+        from PIL import ImageDraw, ImageFont
+        draw = ImageDraw.Draw(img)
+        
+        # 기본 폰트 사용
+        try:
+            font_size = 20
+            font = ImageFont.truetype("Arial", font_size)
+        except:
+            print("Arial 폰트 로드 실패, 기본 폰트 사용")
+            font = ImageFont.load_default()
+        
+        bbox = draw.textbbox((0, 0), text, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        
+        # 텍스트를 이미지 중앙에 배치
+        x = (size[0] - text_width) / 2
+        y = (size[1] - text_height) / 2
+        draw.text((x, y), text, font=font, fill='#666666')
+        
+    except Exception as text_error:
+        print(f"텍스트 추가 실패: {str(text_error)}")
+    
+    # 이미지를 JPEG로 변환
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+@app.route('/api/images/<filename>/status', methods=['GET'])
+def image_status(filename):
+    """업로드 이미지 처리 상태 (ready/pending/failed) - ?wait=초 만큼 완료를 기다릴 수 있음"""
+    try:
+        wait = min(max(request.args.get('wait', 0, type=float), 0), IMAGE_JOB_MAX_WAIT)
+        deadline = time.time() + wait
+        
+        # 이 프로세스에서 처리 중이면 완료될 때까지 대기
+        future = _image_futures.get(filename)
+        if future is not None and wait:
+            wait_futures([future], timeout=wait)
+        
+        # 다른 워커가 처리 중이면 상태 테이블을 다시 확인 (결과 기록도 여기서 기다림)
+        while True:
+            conn = get_db()
+            try:
+                status, error = get_image_job_status(conn, filename)
+            finally:
+                conn.close()
+            if status != 'pending' or time.time() >= deadline:
+                break
+            time.sleep(0.2)
+        
+        if status is None:
+            return jsonify({'error': '이미지를 찾을 수 없습니다.'}), 404
+        return jsonify({'filename': filename, 'status': status, 'error': error})
+        
+    except Exception as e:
+        print(f"이미지 처리 상태 조회 실패: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# 자리표시 이미지 기본 크기 (?w= 요청은 변형 크기에 맞춰 그림)
+PLACEHOLDER_SIZE = 200
+
+@lru_cache(maxsize=128)
+def placeholder_image(label, width=PLACEHOLDER_SIZE):
+    """(라벨, 가로)별 자리표시 이미지 - (JPEG 바이트, ETag), 프로세스마다 한 번만 그림"""
+    data = render_placeholder_image(label, (width, width))
+    return data, f"placeholder-{content_hash(data)[:16]}"
+
+def placeholder_label(filename, snapshot=None):
+    """메뉴에서 쓰는 파일명이면 이름(확장자 제외)을, 아니면 공통 라벨을 표시
+
+    요청 파일명을 그대로 쓰면 임의의 파일명마다 새로 그려야 하므로 라벨 종류를 제한한다.
+    """
+    for items in (snapshot or get_menu_snapshot()).menu.values():
+        for item in items:
+            if item['image'] == filename:
+                return filename.split('.')[0]
+    return 'No Image'
+
+def remember_missing_image(filename):
+    """없는 파일명을 부정 캐시에 라벨과 함께 저장하고 라벨 반환"""
+    snapshot = get_menu_snapshot()
+    label = placeholder_label(filename, snapshot)
+    missing_images.add(filename, label, snapshot.version)
+    return label
+
+def serve_placeholder_image(filename, kind, width=None, label=None):
+    """없는(missing) 또는 처리 중(pending) 이미지 대신 메모리의 자리표시 이미지로 응답 (DB에 저장하지 않음)"""
+    missing_images.count_placeholder(kind)
+    if kind == 'pending':
+        data, _ = placeholder_image('...', width or PLACEHOLDER_SIZE)
+        return app.response_class(data, status=202, mimetype='image/jpeg')
+    data, etag = placeholder_image(label or placeholder_label(filename), width or PLACEHOLDER_SIZE)
+    return image_bytes_response(etag, 'image/jpeg', data)
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
@@ -1194,68 +2918,19 @@ def get_categories():
         print("=== 카테고리 목록 조회 시작 ===")
         
         try:
-            # 데이터베이스에서 직접 카테고리 조회 (순서 고려)
-            conn = get_db()
-            cursor = conn.cursor()
-            
-            # 카테고리 순서 테이블에서 먼저 조회 시도
-            cursor.execute("""
-                SELECT category
-                FROM category_order
-                ORDER BY order_index ASC
-            """)
-            
-            ordered_categories = [row['category'] for row in cursor.fetchall()]
-            print(f"카테고리 순서 테이블에서 조회된 카테고리: {ordered_categories}")
-            
-            # 순서 테이블에 없는 카테고리를 일반 메뉴 테이블에서 조회
-            if not ordered_categories:
-                cursor.execute("""
-                    SELECT DISTINCT category 
-                    FROM menu
-                    ORDER BY category ASC
-                """)
-                ordered_categories = [row['category'] for row in cursor.fetchall()]
-                print(f"메뉴 테이블에서 조회된 카테고리: {ordered_categories}")
-                
-                # 순서 테이블에 카테고리 추가 시도
-                try:
-                    cursor.execute("BEGIN TRANSACTION")
-                    for idx, category in enumerate(ordered_categories):
-                        cursor.execute("""
-                            INSERT OR REPLACE INTO category_order (category, order_index)
-                            VALUES (?, ?)
-                        """, (category, idx))
-                    cursor.execute("COMMIT")
-                    print(f"카테고리 {len(ordered_categories)}개를 순서 테이블에 동기화함")
-                except Exception as e:
-                    cursor.execute("ROLLBACK")
-                    print(f"카테고리 순서 테이블 동기화 중 오류: {str(e)}")
-            
-            conn.close()
-            
-            # 백업: 데이터베이스에서 가져온 카테고리가 없으면 menu_data 사용
-            if not ordered_categories:
-                menu_data = load_menu_data()
-                ordered_categories = list(menu_data.keys())
-                print(f"menu_data에서 대체로 가져온 카테고리 목록: {ordered_categories}")
-            
+            # 메뉴 스냅샷의 카테고리 순서 사용
+            snapshot = get_menu_snapshot()
+            print(f"조회된 카테고리: {list(snapshot.categories)}")
             print("=== 카테고리 목록 조회 완료 ===")
             
-            # 캐시 방지 및 타임스탬프 추가
-            response = jsonify({
-                "categories": ordered_categories,
-                "timestamp": int(time.time()),
+            # timestamp는 마지막 변경 시각 (같은 버전이면 같은 응답 바이트)
+            return cached_json_response('categories', snapshot, lambda: {
+                "categories": list(snapshot.categories),
+                "timestamp": int(snapshot.updated_at),
+                "version": snapshot.version,
                 "server": "Render" if os.environ.get('RENDER') else "Local"
             })
             
-            # 캐시 관련 헤더만 추가 (CORS 헤더는 after_request에서 추가됨)
-            response.headers.add('Cache-Control', 'no-cache, no-store, must-revalidate')
-            response.headers.add('Pragma', 'no-cache')
-            response.headers.add('Expires', '0')
-            
-            return response
-            
         except Exception as db_error:
             print(f"데이터베이스에서 카테고리 조회 중 오류: {str(db_error)}")
             import traceback
@@ -1336,12 +3011,6 @@ def add_category():
         if not category_name:
             return jsonify({'error': '카테고리 이름이 필요합니다.'}), 400
         
-        # 데이터베이스 초기화 확인
-        try:
-            ensure_db()
-        except Exception as e:
-            print(f"데이터베이스 초기화 확인 실패: {str(e)}")
-        
         # 카테고리를 데이터베이스에 직접 추가
         try:
             conn = get_db()
@@ -1351,55 +3020,25 @@ def add_category():
             cursor.execute("BEGIN TRANSACTION")
             
             # 카테고리 존재 여부 확인
-            cursor.execute("SELECT COUNT(*) FROM menu WHERE category = ?", (category_name,))
-            if cursor.fetchone()[0] > 0:
+            if get_category_id(conn, category_name) is not None:
                 cursor.execute("ROLLBACK")
                 conn.close()
                 return jsonify({'error': '이미 존재하는 카테고리입니다.'}), 400
             
-            # 카테고리 추가 (빈 메뉴 항목 사용)
-            cursor.execute("""
-                INSERT INTO menu (category, name, price, image, temperature, order_index)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (category_name, "대표메뉴", "0", "logo.png", "", 0))
-            
-            # 카테고리 순서 테이블에도 추가
-            # 먼저 현재 최대 order_index 조회
-            cursor.execute("SELECT MAX(order_index) as max_order FROM category_order")
-            result = cursor.fetchone()
-            next_order = (result['max_order'] or -1) + 1
-            
-            # 카테고리 순서 추가
-            cursor.execute("""
-                INSERT INTO category_order (category, order_index)
-                VALUES (?, ?)
-            """, (category_name, next_order))
+            # 카테고리를 맨 뒤에 추가
+            ensure_category(conn, category_name)
+            bump_menu_version(conn)
+            # 변경 기록 (로컬 환경이면 Render 서버로 백그라운드 전송)
+            synced = log_changes(conn, [category_change(conn, category_name)])
             
             # 변경사항 커밋
             cursor.execute("COMMIT")
             conn.close()
+            refresh_menu_snapshot()
+            if synced:
+                sync_worker.wake()
             
             print(f"카테고리 '{category_name}'가 데이터베이스에 추가되었습니다.")
-            
-            # Render 서버와 동기화 (로컬 환경에서만)
-            if not os.environ.get('RENDER'):
-                try:
-                    response = requests.post(
-                        f"{RENDER_API_URL}/api/categories",
-                        json={'name': category_name},
-                        headers={'Content-Type': 'application/json'},
-                        timeout=10  # 타임아웃 10초 설정
-                    )
-                    
-                    print(f"Render 서버 응답 상태 코드: {response.status_code}")
-                    if response.status_code == 201:
-                        print("Render 서버에 카테고리 추가 성공")
-                    else:
-                        print(f"Render 서버에 카테고리 추가 실패: {response.text}")
-                except Exception as e:
-                    print(f"Render 서버 동기화 중 오류: {str(e)}")
-                    # Render 서버 동기화 실패는 무시하고 계속 진행
-            
             print("=== 카테고리 추가 완료 ===")
             return jsonify({'message': f'카테고리 "{category_name}"가 추가되었습니다.'}), 201
             
@@ -1438,13 +3077,8 @@ def delete_category(category_name):
             cursor.execute('BEGIN TRANSACTION')
             
             # 카테고리 존재 여부 확인
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM menu 
-                WHERE category = ?
-            """, (category_name,))
-            
-            if cursor.fetchone()[0] == 0:
+            category_id = get_category_id(conn, category_name)
+            if category_id is None:
                 cursor.execute('ROLLBACK')
                 conn.close()
                 return jsonify({'error': '존재하지 않는 카테고리입니다.'}), 404
@@ -1452,43 +3086,26 @@ def delete_category(category_name):
             # 해당 카테고리의 모든 항목 삭제
             cursor.execute("""
                 DELETE FROM menu
-                WHERE category = ?
-            """, (category_name,))
+                WHERE category_id = ?
+            """, (category_id,))
             
             deleted_count = cursor.rowcount
             print(f"삭제된 메뉴 항목 수: {deleted_count}")
             
-            # 카테고리 순서 테이블에서도 삭제
-            cursor.execute("""
-                DELETE FROM category_order
-                WHERE category = ?
-            """, (category_name,))
-            
-            print(f"카테고리 순서 테이블에서 '{category_name}' 삭제됨")
+            # 카테고리 삭제
+            cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            bump_menu_version(conn)
+            # 변경 기록 (로컬 환경이면 Render 서버로 백그라운드 전송)
+            synced = log_changes(conn, [('category', category_name, 'delete', None)])
             
             # 커밋
             cursor.execute('COMMIT')
             conn.close()
+            refresh_menu_snapshot()
+            if synced:
+                sync_worker.wake()
             
             print(f"카테고리 '{category_name}'가 데이터베이스에서 삭제되었습니다.")
-            
-            # Render 서버와 동기화 (로컬 환경에서만)
-            if not os.environ.get('RENDER'):
-                try:
-                    response = requests.delete(
-                        f"{RENDER_API_URL}/api/categories/{category_name}",
-                        timeout=10  # 타임아웃 10초 설정
-                    )
-                    
-                    print(f"Render 서버 응답 상태 코드: {response.status_code}")
-                    if response.status_code == 200:
-                        print("Render 서버에서 카테고리 삭제 성공")
-                    else:
-                        print(f"Render 서버에서 카테고리 삭제 실패: {response.text}")
-                except Exception as e:
-                    print(f"Render 서버 동기화 중 오류: {str(e)}")
-                    # Render 서버 동기화 실패는 무시하고 계속 진행
-        
             print(f"=== 카테고리 '{category_name}' 삭제 완료 ===")
             return jsonify({'message': f'카테고리 "{category_name}"가 삭제되었습니다.'}), 200
             
@@ -1532,58 +3149,32 @@ def update_category(category_name):
             cursor.execute("BEGIN TRANSACTION")
             
             # 카테고리 존재 여부 확인
-            cursor.execute("SELECT COUNT(*) FROM menu WHERE category = ?", (category_name,))
-            if cursor.fetchone()[0] == 0:
+            category_id = get_category_id(conn, category_name)
+            if category_id is None:
                 cursor.execute("ROLLBACK")
                 conn.close()
                 return jsonify({'error': '카테고리가 존재하지 않습니다'}), 404
                 
             # 새 이름이 이미 존재하는지 확인
-            cursor.execute("SELECT COUNT(*) FROM menu WHERE category = ?", (new_name,))
-            if cursor.fetchone()[0] > 0:
+            if get_category_id(conn, new_name) is not None:
                 cursor.execute("ROLLBACK")
                 conn.close()
                 return jsonify({'message': '이미 존재하는 카테고리 이름입니다'}), 200
             
-            # 메뉴 테이블에서 카테고리 이름 변경
-            cursor.execute("""
-                UPDATE menu
-                SET category = ?
-                WHERE category = ?
-            """, (new_name, category_name))
-            
-            # 카테고리 순서 테이블에서도 변경
-            cursor.execute("""
-                UPDATE category_order
-                SET category = ?
-                WHERE category = ?
-            """, (new_name, category_name))
+            # 카테고리 행 하나만 이름 변경 (메뉴는 category_id로 참조)
+            cursor.execute("UPDATE categories SET name = ? WHERE id = ?", (new_name, category_id))
+            bump_menu_version(conn)
+            # 변경 기록 (로컬 환경이면 Render 서버로 백그라운드 전송)
+            synced = log_changes(conn, [('category', category_name, 'rename', {'name': new_name})])
             
             # 변경사항 커밋
             cursor.execute("COMMIT")
             conn.close()
+            refresh_menu_snapshot()
+            if synced:
+                sync_worker.wake()
             
             print(f"카테고리 이름을 '{category_name}'에서 '{new_name}'으로 변경 완료")
-            
-            # Render 서버와 동기화 (로컬 환경에서만)
-            if not os.environ.get('RENDER'):
-                try:
-                    response = requests.put(
-                        f"{RENDER_API_URL}/api/categories/{category_name}",
-                        json={'name': new_name},
-                        headers={'Content-Type': 'application/json'},
-                        timeout=10  # 타임아웃 10초 설정
-                    )
-                    
-                    print(f"Render 서버 응답 상태 코드: {response.status_code}")
-                    if response.status_code == 200:
-                        print("Render 서버에서 카테고리 수정 성공")
-                    else:
-                        print(f"Render 서버에서 카테고리 수정 실패: {response.text}")
-                except Exception as e:
-                    print(f"Render 서버 동기화 중 오류: {str(e)}")
-                    # Render 서버 동기화 실패는 무시하고 계속 진행
-        
             print(f"=== 카테고리 수정 완료 ===")
             return jsonify({'message': '카테고리가 수정되었습니다'}), 200
             
@@ -1606,6 +3197,34 @@ def update_category(category_name):
         print(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/categories/<category_name>/move', methods=['POST'])
+def move_category_route(category_name):
+    try:
+        data = request.get_json(silent=True) or {}
+        before = data.get('before')
+        after = data.get('after')
+        if (before is None) == (after is None):
+            return jsonify({'error': 'before 또는 after 중 하나만 지정해야 합니다.'}), 400
+        
+        try:
+            changed, version = move_category(category_name, before=before, after=after)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'message': '카테고리 순서가 업데이트되었습니다.',
+            'changed': changed,
+            'version': version
+        }), 200
+    except Exception as e:
+        print(f"카테고리 이동 중 오류 발생: {str(e)}")
+        import traceback
+        print("상세 오류:")
+        print(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
 # 새로운 메뉴 ID 생성
 def generate_new_menu_id(menu_data):
     max_id = 0
@@ -1633,6 +3252,18 @@ def update_menu_order():
         print("=== 메뉴 순서 업데이트 시작 ===")
         print(f"받은 메뉴 데이터: {new_menu_data}")
         
+        # 순서 전용 요청: {카테고리: [id, id, ...]}
+        if is_reorder_payload(new_menu_data):
+            try:
+                changed, version = reorder_menu_items(new_menu_data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'message': '메뉴 순서가 업데이트되었습니다.',
+                'changed': changed,
+                'version': version
+            }), 200
+        
         # 기존 메뉴 데이터 로드
         menu_data = load_menu_data()
         print(f"기존 메뉴 데이터: {menu_data}")
@@ -1658,7 +3289,7 @@ def update_menu_order():
                     if existing_item:
                         # 기존 항목의 데이터를 유지하면서 order_index만 업데이트
                         item_with_order = existing_item.copy()
-                        item_with_order['order_index'] = index
+                        item_with_order['order_index'] = (index + 1) * ORDER_GAP
                         updated_menu_data[category].append(item_with_order)
                     else:
                         # 새로운 항목인 경우 필수 필드 확인
@@ -1670,7 +3301,7 @@ def update_menu_order():
                                 'price': item['price'],
                                 'image': item.get('image', 'logo.png'),
                                 'temperature': item.get('temperature', ''),
-                                'order_index': index
+                                'order_index': (index + 1) * ORDER_GAP
                             }
                             updated_menu_data[category].append(item_with_order)
                         else:
@@ -1681,24 +3312,17 @@ def update_menu_order():
         
         print(f"순서가 추가된 메뉴 데이터: {updated_menu_data}")
         
-        # 변경사항 저장
+        # 변경사항 저장 (바뀐 행만 변경 기록으로 Render 서버에 전송)
         try:
-            save_menu_data(updated_menu_data)
+            changes = save_menu_data(updated_menu_data)
             print("메뉴 데이터 저장 완료")
             
-            # Render 서버와 동기화 (로컬 환경에서만)
-            if not os.environ.get('RENDER'):
-                try:
-                    if save_menu_to_render(updated_menu_data):
-                        print("Render 서버와 동기화 완료")
-                    else:
-                        print("Render 서버와 동기화 실패")
-                except Exception as e:
-                    print(f"Render 서버 동기화 중 오류: {str(e)}")
-                    # Render 서버 동기화 실패는 무시하고 계속 진행
-            
             # 응답 준비 - CORS 헤더는 after_request에서 추가됨
-            response = jsonify({'message': '카테고리 순서가 업데이트되었습니다.', 'categories': list(updated_menu_data.keys())})
+            response = jsonify({
+                'message': '카테고리 순서가 업데이트되었습니다.',
+                'categories': list(updated_menu_data.keys()),
+                'changes': changes
+            })
             
             # 캐시 관련 헤더만 추가
             response.headers.add('Cache-Control', 'no-cache, no-store, must-revalidate')
@@ -1718,22 +3342,178 @@ def update_menu_order():
         print(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
-def sync_image_to_local(image_filename):
-    try:
-        if os.environ.get('RENDER'):
-            # Render 서버에서 이미지 다운로드
-            response = requests.get(f"{RENDER_API_URL}/static/images/{image_filename}")
-            if response.status_code == 200:
-                # 로컬에 이미지 저장
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], image_filename)
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                print(f"이미지 동기화 성공: {image_filename}")
-                return True
-        return False
-    except Exception as e:
-        print(f"이미지 동기화 실패: {str(e)}")
-        return False
+# 이미지 동기화
+#
+# 다른 서버의 이미지 목록(GET /api/images-manifest: 파일명, 내용 해시, 크기)을
+# 로컬 images 테이블과 비교해 없거나 내용이 다른 원본만 받아 온다. 내용이 다른
+# 이미지는 마지막 동기화 이후 로컬에서 바꾸지 않은 경우(sha256 = synced_sha256)에만
+# 교체하고, 로고(logo.png)는 받아 오지 않는다. 같은 해시의 파일이 이미 저장소에
+# 있으면 다운로드 없이 등록만 하고, 받은 파일은 해시를 확인한 뒤 저장한다.
+# 다운로드는 서버별 keep-alive 세션으로 동시에 진행하며, 크기별 변형과 로고
+# 아이콘은 처음 요청될 때 로컬에서 만든다.
+
+def load_image_manifest(conn):
+    return [
+        {
+            'filename': row['filename'],
+            'sha256': row['sha256'],
+            'size': row['size'],
+            'content_type': row['content_type'],
+            'width': row['width'],
+            'height': row['height']
+        }
+        for row in conn.execute(
+            'SELECT filename, sha256, size, content_type, width, height FROM images ORDER BY filename'
+        )
+    ]
+
+class ImageSyncJob:
+    """다른 서버와 이미지 목록을 비교해 없는/바뀐 이미지만 받아 오는 작업 (프로세스에서 한 번에 하나)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_result = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, source):
+        """백그라운드에서 동기화 시작 (이미 진행 중이면 False)"""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self._run, args=(source,), name='image-sync', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, source):
+        try:
+            self.run(source)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"이미지 동기화 실패: {str(e)}")
+
+    def run(self, source):
+        """source 서버의 이미지를 받아 오고 결과 요약 반환"""
+        started = time.time()
+        session = sync_client.session(source)
+        response = session.get(f"{source}/api/images-manifest", timeout=SYNC_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        remote = response.json()['images']
+        
+        conn = get_db()
+        try:
+            local = {
+                row['filename']: (row['sha256'], row['synced_sha256'])
+                for row in conn.execute('SELECT filename, sha256, synced_sha256 FROM images ORDER BY filename')
+            }
+        finally:
+            conn.close()
+        
+        wanted = []
+        same = []
+        skipped = 0
+        for entry in remote:
+            if entry['filename'] == 'logo.png':
+                continue
+            current, synced = local.get(entry['filename'], (None, None))
+            if current == entry['sha256']:
+                if synced != current:
+                    same.append(entry['filename'])
+            elif current is None or current == synced:
+                wanted.append(entry)
+            else:
+                # 마지막 동기화 이후 로컬에서 교체한 이미지는 덮어쓰지 않음
+                skipped += 1
+        result = {
+            'source': source,
+            'remote': len(remote),
+            'missing': sum(1 for entry in wanted if entry['filename'] not in local),
+            'changed': sum(1 for entry in wanted if entry['filename'] in local),
+            'skipped_local': skipped,
+            'reused': 0,
+            'downloaded': 0,
+            'bytes': 0,
+            'failed': {}
+        }
+        print(f"이미지 동기화 시작: {source} - 전체 {len(remote)}개 중 {len(wanted)}개 필요")
+        
+        # 저장소에 같은 내용이 있으면 받지 않음 (다른 파일명으로 저장된 경우 등)
+        fetched = [entry for entry in wanted if image_store.exists(entry['sha256'])]
+        result['reused'] = len(fetched)
+        downloads = [entry for entry in wanted if not image_store.exists(entry['sha256'])]
+        if downloads:
+            with ThreadPoolExecutor(max_workers=IMAGE_SYNC_WORKERS, thread_name_prefix='image-sync') as executor:
+                futures = {executor.submit(self._download, session, source, entry): entry for entry in downloads}
+                for future in as_completed(futures):
+                    entry = futures[future]
+                    try:
+                        length = future.result()
+                    except Exception as e:
+                        result['failed'][entry['filename']] = str(e)
+                        continue
+                    result['downloaded'] += 1
+                    result['bytes'] += length
+                    fetched.append(entry)
+        
+        # 받은 이미지를 한 트랜잭션으로 등록 (그사이 로컬에서 교체된 이미지는 건너뜀)
+        if fetched or same:
+            with get_db() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for entry in fetched:
+                    row = conn.execute(
+                        'SELECT sha256, synced_sha256 FROM images WHERE filename = ?', (entry['filename'],)
+                    ).fetchone()
+                    if row and row['sha256'] != row['synced_sha256']:
+                        result['skipped_local'] += 1
+                        continue
+                    record_image(
+                        conn, entry['filename'], entry['sha256'], entry['content_type'],
+                        entry['size'], (entry.get('width'), entry.get('height'))
+                    )
+                    same.append(entry['filename'])
+                # 양쪽 내용이 같아진 이미지는 동기화 기준 해시로 기록
+                conn.executemany(
+                    'UPDATE images SET synced_sha256 = sha256 WHERE filename = ?',
+                    [(filename,) for filename in same]
+                )
+        
+        result['elapsed'] = round(time.time() - started, 3)
+        self.last_result = result
+        self.last_error = None
+        print(
+            f"이미지 동기화 완료: 다운로드 {result['downloaded']}개 ({result['bytes']} bytes), "
+            f"재사용 {result['reused']}개, 실패 {len(result['failed'])}개, {result['elapsed']}초"
+        )
+        return result
+
+    def _download(self, session, source, entry):
+        """원본 이미지 하나를 받아 해시 확인 후 저장소에 저장하고 바이트 수 반환"""
+        if entry['size'] > UPLOAD_MAX_BYTES:
+            raise ValueError(f"이미지가 너무 큽니다: {entry['size']} bytes")
+        response = session.get(
+            f"{source}/api/images/{quote(entry['filename'], safe='')}",
+            timeout=IMAGE_SYNC_TIMEOUT
+        )
+        if response.status_code != 200:
+            raise ValueError(f"HTTP {response.status_code}")
+        data = response.content
+        if content_hash(data) != entry['sha256']:
+            raise ValueError("내용 해시가 목록과 다릅니다")
+        image_store.put(data)
+        return len(data)
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'last_result': self.last_result,
+            'last_error': self.last_error
+        }
+
+image_sync = ImageSyncJob()
 
 def create_default_logo():
     try:
@@ -1749,14 +3529,8 @@ def create_default_logo():
         # 데이터베이스에 이미지 저장
         conn = get_db()
         try:
-            # 기존 이미지 삭제
-            conn.execute('DELETE FROM images WHERE filename = ?', ('logo.png',))
-            
-            # 새 이미지 저장
-            conn.execute(
-                'INSERT INTO images (filename, data, content_type) VALUES (?, ?, ?)',
-                ('logo.png', image_data, 'image/jpeg')
-            )
+            # 기존 이미지 교체 (아이콘 세트도 함께 다시 만듦)
+            store_logo(conn, image_data, 'image/jpeg', img.size)
             conn.commit()
             print("기본 로고 이미지 생성 및 저장 완료")
             
@@ -1815,7 +3589,10 @@ def upload_image():
             return jsonify({'error': '선택된 파일이 없습니다.'}), 400
         
         if file and allowed_file(file.filename):
-            filename = save_image(file)
+            try:
+                filename = save_image(file)
+            except ValueError as e:
+                return upload_error_response(e)
             return jsonify({'filename': filename}), 200
         
         return jsonify({'error': '허용되지 않는 파일 형식입니다.'}), 400
@@ -1824,6 +3601,144 @@ def upload_image():
         print(f"이미지 업로드 중 오류 발생: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def read_batch_uploads():
+    """일괄 업로드 요청의 파일들을 [(결과 키, 파일 이름, 데이터)]로 반환 (zip은 안의 파일들로 펼침)
+
+    데이터는 spool_upload의 결과(바이트 또는 임시 파일 경로)이므로 다 쓴 뒤 release_upload()로
+    정리한다. 결과 키는 파일 이름이며, 겹치면 뒤에 #2, #3 ...을 붙인다. 제한을 넘으면 ValueError.
+    """
+    uploads = []
+    names = set()
+    total = 0
+    too_large = f"전체 파일 크기가 {BATCH_UPLOAD_MAX_BYTES // (1024 * 1024)}MB를 넘습니다."
+    
+    def add(name, stream):
+        nonlocal total
+        if len(uploads) >= BATCH_UPLOAD_MAX_FILES:
+            raise ValueError(f"한 번에 최대 {BATCH_UPLOAD_MAX_FILES}개까지 업로드할 수 있습니다.")
+        remaining = BATCH_UPLOAD_MAX_BYTES - total
+        try:
+            data = spool_upload(stream, min(UPLOAD_MAX_BYTES, remaining))
+        except ValueError:
+            raise ValueError(too_large if remaining < UPLOAD_MAX_BYTES else f"{name}: 파일 크기가 {UPLOAD_MAX_BYTES // (1024 * 1024)}MB를 넘습니다.")
+        total += len(data) if isinstance(data, bytes) else os.path.getsize(data)
+        unique, n = name, 1
+        while unique in names:
+            n += 1
+            unique = f"{name}#{n}"
+        names.add(unique)
+        uploads.append((unique, name, data))
+    
+    try:
+        for file in request.files.getlist('images') + request.files.getlist('archive'):
+            if not file or not file.filename:
+                continue
+            if not file.filename.lower().endswith('.zip'):
+                add(file.filename, file.stream)
+                continue
+            try:
+                with zipfile.ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        basename = os.path.basename(info.filename)
+                        # 폴더와 macOS 메타데이터(__MACOSX/, ._파일) 제외
+                        if info.is_dir() or info.filename.startswith('__MACOSX/') or basename.startswith('.'):
+                            continue
+                        # 압축 해제 전에 선언된 크기로 먼저 확인 (압축 폭탄 방지)
+                        if total + info.file_size > BATCH_UPLOAD_MAX_BYTES:
+                            raise ValueError(too_large)
+                        with archive.open(info) as entry:
+                            add(info.filename, entry)
+            except zipfile.BadZipFile:
+                raise ValueError(f"zip 파일을 열 수 없습니다: {file.filename}")
+    except Exception:
+        for _, _, data in uploads:
+            release_upload(data)
+        raise
+    return uploads
+
+@app.route('/api/upload-images', methods=['POST'])
+def upload_images():
+    """여러 이미지(images 필드 여러 개 또는 zip)를 처리 풀에서 병렬로 변환하고 한 트랜잭션으로 저장
+
+    응답의 results는 업로드한 파일 이름별 {'filename': 새 파일명} 또는 {'error': 이유}.
+    """
+    uploads = []
+    running = set()  # 시간 초과 후에도 실행 중인 작업의 임시 파일 (작업이 끝난 뒤 정리)
+    try:
+        try:
+            uploads = read_batch_uploads()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not uploads:
+            return jsonify({'error': '이미지 파일이 없습니다.'}), 400
+        print(f"=== 이미지 일괄 업로드 시작: {len(uploads)}개 ===")
+        
+        results = {}
+        jobs = []  # (이름, 새 파일명, 업로드 데이터, Future)
+        for name, original_name, data in uploads:
+            if not allowed_file(original_name):
+                results[name] = {'error': '허용되지 않는 파일 형식입니다.'}
+                continue
+            filename = f"{uuid.uuid4()}.jpg"
+            future = submit_process_upload(data)
+            if future is None:
+                # 처리 풀을 쓰지 않으면 바로 변환
+                future = Future()
+                try:
+                    future.set_result(process_upload(data))
+                except Exception as e:
+                    future.set_exception(e)
+            jobs.append((name, filename, data, future))
+        
+        # 모든 변환이 끝나기를 기다림 (파일은 처리 프로세스가 이미 저장소에 씀)
+        deadline = time.time() + BATCH_UPLOAD_TIMEOUT
+        processed = []
+        for name, filename, data, future in jobs:
+            try:
+                result = future.result(timeout=max(0, deadline - time.time()))
+            except FutureTimeoutError:
+                # 아직 시작하지 않은 작업은 취소하고, 이미 실행 중이면 끝난 뒤 임시 파일 정리
+                # (결과는 기록하지 않으므로 저장소에 쓴 파일은 collect_garbage가 정리)
+                if not future.cancel():
+                    running.add(id(data))
+                    future.add_done_callback(lambda done, data=data: release_upload(data))
+                results[name] = {'error': '처리 시간 초과'}
+                continue
+            except ValueError as e:
+                results[name] = {'error': str(e)}
+                continue
+            except Exception as e:
+                print(f"이미지 변환 실패: {name} - {str(e)}")
+                results[name] = {'error': '이미지 파일을 처리할 수 없습니다.'}
+                continue
+            processed.append((name, filename, result))
+        
+        # 결과 행은 한 트랜잭션으로 추가
+        with get_db() as conn:
+            for name, filename, result in processed:
+                record_processed_image(conn, filename, result)
+        for name, filename, result in processed:
+            results[name] = {'filename': filename}
+        
+        print(f"=== 이미지 일괄 업로드 완료: 성공 {len(processed)}개, 실패 {len(results) - len(processed)}개 ===")
+        return jsonify({
+            'results': results,
+            'succeeded': len(processed),
+            'failed': len(results) - len(processed)
+        }), 200
+        
+    except Exception as e:
+        print(f"이미지 일괄 업로드 중 오류 발생: {str(e)}")
+        import traceback
+        print("상세 오류:")
+        print(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+    finally:
+        # 임시 파일로 받은 업로드 정리 (실행 중인 작업의 파일은 작업이 끝난 뒤)
+        for _, _, data in uploads:
+            if id(data) not in running:
+                release_upload(data)
+
 @app.route('/api/categories/order', methods=['GET', 'PUT'])
 def update_category_order():
     try:
@@ -1832,28 +3747,17 @@ def update_category_order():
         # GET 요청 처리 - 현재 카테고리 순서 반환
         if request.method == 'GET':
             print("카테고리 순서 조회 요청")
-            conn = get_db()
-            cursor = conn.cursor()
-            
-            # 카테고리 순서 조회
-            cursor.execute("SELECT category FROM category_order ORDER BY order_index")
-            ordered_categories = [row['category'] for row in cursor.fetchall()]
-            
-            # 순서가 없는 경우 메뉴에서 카테고리 목록 가져오기
-            if not ordered_categories:
-                print("저장된 카테고리 순서가 없어 메뉴에서 카테고리 목록 가져오기")
-                cursor.execute("SELECT DISTINCT category FROM menu")
-                ordered_categories = [row['category'] for row in cursor.fetchall()]
+            # 카테고리 순서 조회 (메뉴 스냅샷)
+            snapshot = get_menu_snapshot()
             
-            conn.close()
-            
-            print(f"반환할 카테고리 순서: {ordered_categories}")
+            print(f"반환할 카테고리 순서: {list(snapshot.categories)}")
             
-            return jsonify({
-                'categories': ordered_categories,
+            return cached_json_response('categories_order', snapshot, lambda: {
+                'categories': list(snapshot.categories),
                 'server': 'Render',
-                'timestamp': int(time.time())
-            }), 200
+                'timestamp': int(snapshot.updated_at),
+                'version': snapshot.version
+            })
         
         # PUT 요청 처리 - 카테고리 순서 업데이트
         data = request.get_json()
@@ -1861,10 +3765,11 @@ def update_category_order():
         if not data or 'categories' not in data:
             return jsonify({'error': '카테고리 목록이 필요합니다.'}), 400
         
-        categories = data['categories']
+        # 중복 제거 (처음 나온 위치 유지)
+        categories = list(dict.fromkeys(data['categories']))
         print(f"받은 카테고리 순서: {categories}")
         
-        # 동기화 소스 확인 (무한 루프 방지)
+        # 이전 버전 서버가 보낸 동기화 요청 (다시 전달하지 않음)
         sync_source = data.get('sync_source', None)
         is_sync_request = sync_source is not None
         
@@ -1879,79 +3784,46 @@ def update_category_order():
             cursor.execute("BEGIN TRANSACTION")
             
             # 기존 카테고리 정보 조회
-            cursor.execute("SELECT category FROM category_order ORDER BY order_index")
-            existing_categories = [row['category'] for row in cursor.fetchall()]
-            print(f"기존 카테고리 순서: {existing_categories}")
-            
-            # 모든 카테고리 순서 초기화
-            cursor.execute("DELETE FROM category_order")
-            print("기존 카테고리 순서 초기화")
-            
-            # 새 순서 저장
-            for index, category in enumerate(categories):
-                cursor.execute("""
-                    INSERT INTO category_order (category, order_index)
-                    VALUES (?, ?)
-                """, (category, index))
-                print(f"카테고리 '{category}' 순서 {index}로 저장")
-            
-            # 없는 카테고리가 있는지 확인하고 필요하면 메뉴 항목 추가
-            cursor.execute("SELECT DISTINCT category FROM menu")
-            menu_categories = [row['category'] for row in cursor.fetchall()]
-            
-            for category in categories:
-                if category not in menu_categories:
-                    print(f"새 카테고리 '{category}' 발견, 메뉴 항목 추가")
-                    cursor.execute("""
-                        INSERT INTO menu (category, name, price, image, temperature, order_index)
-                        VALUES (?, '대표메뉴', '0', 'logo.png', '', ?)
-                    """, (category, -999))
+            cursor.execute("SELECT name, order_index FROM categories ORDER BY order_index, id")
+            existing_keys = {row['name']: row['order_index'] for row in cursor.fetchall()}
+            print(f"기존 카테고리 순서: {list(existing_keys)}")
+            
+            # 목록에 없는 기존 카테고리는 삭제하지 않고 기존 순서대로 뒤에 유지
+            ordered = categories + [name for name in existing_keys if name not in categories]
+            
+            # 상대 순서가 바뀐 카테고리만 새 정렬 키로 저장
+            new_keys = plan_order_keys(ordered, existing_keys)
+            cursor.executemany(
+                "UPDATE categories SET order_index = ? WHERE name = ?",
+                [(key, name) for name, key in new_keys.items() if name in existing_keys]
+            )
+            cursor.executemany(
+                "INSERT INTO categories (name, order_index) VALUES (?, ?)",
+                [(name, key) for name, key in new_keys.items() if name not in existing_keys]
+            )
+            print(f"카테고리 순서 저장: {len(new_keys)}개 변경")
+            entries = []
+            if new_keys:
+                bump_menu_version(conn)
+                entries = log_changes(conn, [category_change(conn, name, key) for name, key in new_keys.items()])
             
             # 변경사항 커밋
             cursor.execute("COMMIT")
+            if new_keys:
+                refresh_menu_snapshot(conn)
+                sync_worker.wake()
             conn.close()
             
             print("카테고리 순서 업데이트 완료")
             
-            # 다른 서버로 동기화 (동기화 요청이 아닌 경우에만)
-            if not is_sync_request:
-                try:
-                    # 모든 환경에서 명시적으로 동기화 서버 URL 지정
-                    sync_servers = ["https://bariosk.onrender.com", "http://localhost:3000", "https://www.bariosk.com"]
-                    current_host = request.host_url.rstrip('/')
-                    
-                    print(f"현재 호스트: {current_host}")
-                    print(f"동기화할 서버 목록: {sync_servers}")
-                    
-                    # 현재 호스트가 아닌 다른 모든 서버로 동기화 요청 보내기
-                    for server_url in sync_servers:
-                        if server_url != current_host:
-                            print(f"{server_url}에 카테고리 순서 동기화 요청 보내기")
-                            try:
-                                response = requests.put(
-                                    f"{server_url}/api/categories/order",
-                                    json={'categories': categories, 'sync_source': current_host},
-                                    headers={
-                                        'Content-Type': 'application/json',
-                                        'Cache-Control': 'no-cache, no-store, must-revalidate',
-                                        'Pragma': 'no-cache',
-                                        'Expires': '0'
-                                    },
-                                    timeout=8  # 타임아웃 줄임
-                                )
-                                
-                                print(f"{server_url} 응답 상태 코드: {response.status_code}")
-                                if response.status_code == 200:
-                                    print(f"{server_url}에 카테고리 순서 동기화 성공")
-                                else:
-                                    print(f"{server_url}에 카테고리 순서 동기화 실패: {response.text}")
-                            except Exception as server_error:
-                                print(f"{server_url} 동기화 중 오류: {str(server_error)}")
-                                # 개별 서버 동기화 실패는 무시하고 계속 진행
-                except Exception as e:
-                    print(f"서버 동기화 중 일반 오류: {str(e)}")
-                    # 동기화 실패는 무시하고 계속 진행
-            else:
+            # 다른 서버로 바뀐 순서만 전달 (연속된 드래그는 모아서 마지막 순서만 백그라운드 전송)
+            # 같은 변경이 대기열로도 전송되지만 change_id로 한 번만 적용됨
+            if entries and not is_sync_request:
+                current_host = request.host_url.rstrip('/')
+                peers = [server_url for server_url in SYNC_PEERS if server_url != current_host]
+                print(f"동기화할 서버 목록: {peers}")
+                peer_fanout.submit(peers, entries)
+            elif is_sync_request:
                 print(f"동기화 요청으로 추가 동기화는 수행하지 않음")
             
             # CORS 헤더 추가
@@ -1987,13 +3859,12 @@ def update_category_order():
 def api_update_schema():
     try:
         print("=== API를 통한 데이터베이스 스키마 업데이트 시작 ===")
-        conn = get_db()
-        update_schema(conn)
-        conn.close()
+        version = init_db()
         print("=== API를 통한 데이터베이스 스키마 업데이트 완료 ===")
         return jsonify({
             'message': '데이터베이스 스키마 업데이트가 완료되었습니다.',
             'success': True,
+            'schema_version': version,
             'timestamp': int(time.time())
         }), 200
     except Exception as e:
@@ -2006,6 +3877,35 @@ def api_update_schema():
             'timestamp': int(time.time())
         }), 500
 
+@app.route('/api/db/health', methods=['GET'])
+def db_health():
+    try:
+        status = get_db_pool().health_check()
+        status['timestamp'] = int(time.time())
+        return jsonify(status), 200 if status['healthy'] else 503
+    except Exception as e:
+        print(f"데이터베이스 상태 확인 실패: {str(e)}")
+        return jsonify({
+            'healthy': False,
+            'error': str(e),
+            'timestamp': int(time.time())
+        }), 503
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    try:
+        snapshot = _menu_snapshot
+        return jsonify({
+            'responses': response_cache.stats(),
+            'images': image_cache.stats(),
+            'missing_images': missing_images.stats(),
+            'menu_version': snapshot.version if snapshot else None,
+            'timestamp': int(time.time())
+        }), 200
+    except Exception as e:
+        print(f"캐시 통계 조회 실패: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/add-logo', methods=['POST'])
 def add_logo():
     try:
@@ -2018,23 +3918,27 @@ def add_logo():
             return jsonify({'error': '선택된 파일이 없습니다.'}), 400
             
         if file and allowed_file(file.filename):
+            file_data = None
             try:
-                # 파일 데이터를 메모리에 로드
-                file_data = file.read()
+                # 큰 파일은 메모리 대신 임시 파일에 받음
+                try:
+                    file_data = spool_upload(file.stream)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 413
                 if not file_data:
                     return jsonify({'error': '파일 데이터가 비어있습니다.'}), 400
                 
+                # 저장 전에 한 번 검사 (서빙할 때는 바이트를 그대로 전송)
+                try:
+                    content_type = validate_image_data(file_data)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                
                 # 데이터베이스에 저장
                 conn = get_db()
                 try:
-                    # 기존 로고 삭제
-                    conn.execute('DELETE FROM images WHERE filename = ?', ('logo.png',))
-                    
-                    # 새 로고 저장
-                    conn.execute(
-                        'INSERT INTO images (filename, data, content_type) VALUES (?, ?, ?)',
-                        ('logo.png', file_data, file.content_type or 'image/jpeg')
-                    )
+                    # 기존 로고 교체 (아이콘 세트도 함께 다시 만듦)
+                    store_logo(conn, file_data, content_type)
                     conn.commit()
                     print("새 로고 이미지 저장 완료")
                     return jsonify({'message': '로고가 성공적으로 추가되었습니다.'}), 200
@@ -2046,6 +3950,9 @@ def add_logo():
             except Exception as e:
                 print(f"파일 처리 실패: {str(e)}")
                 return jsonify({'error': '파일 처리 실패'}), 500
+            finally:
+                if file_data:
+                    release_upload(file_data)
         return jsonify({'error': '허용되지 않는 파일 형식입니다.'}), 400
     except Exception as e:
         print(f"로고 추가 중 오류 발생: {str(e)}")
@@ -2055,39 +3962,50 @@ def add_logo():
 def serve_upload_page():
     return send_from_directory('.', 'upload.html')
 
+# 홈 화면/PWA용 웹 앱 매니페스트 (아이콘은 /icons/<이름>)
+WEB_MANIFEST = json.dumps({
+    'name': '바리오스크',
+    'short_name': '바리오스크',
+    'start_url': '/',
+    'display': 'standalone',
+    'background_color': '#FFFFFF',
+    'theme_color': '#FFFFFF',
+    'icons': [
+        {'src': f'/icons/{name}', 'sizes': f'{width}x{width}', 'type': ICON_MIME_TYPES[fmt]}
+        for name, (width, fmt) in LOGO_ICONS.items() if fmt == 'png'
+    ]
+}, ensure_ascii=False).encode('utf-8')
+
 @app.route('/favicon.ico')
 def favicon():
+    return logo_icon('favicon.ico')
+
+@app.route('/apple-touch-icon.png')
+def apple_touch_icon():
+    return logo_icon('apple-touch-icon.png')
+
+@app.route('/icons/<name>')
+def logo_icon(name):
+    """로고가 바뀔 때 만들어 둔 아이콘을 메모리 캐시에서 전송 (ETag는 아이콘 내용 해시)"""
+    if name not in LOGO_ICONS:
+        return jsonify({'error': '아이콘을 찾을 수 없습니다.'}), 404
     try:
-        # 데이터베이스에서 로고 이미지 가져오기
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT data FROM images WHERE filename = ?', ('logo.png',))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result and result['data']:
-            # 로고 이미지를 PIL Image로 변환
-            img = Image.open(io.BytesIO(result['data']))
-            # 32x32 크기로 리사이즈
-            img = img.resize((32, 32), Image.LANCZOS)
-            # ICO 형식으로 변환
-            ico_output = io.BytesIO()
-            img.save(ico_output, format='ICO', sizes=[(32, 32)])
-            ico_output.seek(0)
-            
-            return send_file(
-                ico_output,
-                mimetype='image/x-icon'
-            )
+        icon = get_logo_icon(name)
+        if icon:
+            return image_bytes_response(*icon)
     except Exception as e:
-        print(f"Favicon 생성 실패: {str(e)}")
+        print(f"아이콘 조회 실패: {name} - {str(e)}")
     
-    # 오류 발생 시 빈 favicon 반환
-    img = Image.new('RGB', (32, 32), color='#CCCCCC')
-    output = io.BytesIO()
-    img.save(output, format='ICO', sizes=[(32, 32)])
-    output.seek(0)
-    return send_file(output, mimetype='image/x-icon')
+    # 로고가 없거나 오류 발생 시 빈 아이콘 반환 (저장하지 않음)
+    width, fmt = LOGO_ICONS[name]
+    data = image_processing.encode_icon(Image.new('RGB', (width, width), color='#CCCCCC'), width, fmt)
+    return app.response_class(data, mimetype=ICON_MIME_TYPES[fmt])
+
+@app.route('/manifest.webmanifest')
+def web_manifest():
+    response = app.response_class(WEB_MANIFEST, mimetype='application/manifest+json')
+    response.set_etag(content_hash(WEB_MANIFEST)[:16])
+    return response.make_conditional(request)
 
 def ensure_menu_images():
     try:
@@ -2122,6 +4040,20 @@ def ensure_menu_images():
         if 'conn' in locals():
             conn.close()
 
+def collect_image_files():
+    """images 테이블에서 더 이상 참조하지 않는 저장소 파일 정리"""
+    try:
+        conn = get_db()
+        try:
+            referenced = {row['sha256'] for row in conn.execute('SELECT DISTINCT sha256 FROM images')}
+            referenced.update(row['sha256'] for row in conn.execute('SELECT DISTINCT sha256 FROM image_variants'))
+        finally:
+            conn.close()
+        removed = image_store.collect_garbage(referenced)
+        print(f"사용하지 않는 이미지 파일 정리: {removed}개 삭제")
+    except Exception as e:
+        print(f"이미지 파일 정리 중 오류: {str(e)}")
+
 # 서버 실행
 if __name__ == '__main__':
     try:
@@ -2141,14 +4073,6 @@ if __name__ == '__main__':
             print(f"업로드 디렉토리 생성 실패: {str(e)}")
             raise
         
-        # 데이터베이스 초기화
-        try:
-            init_db()
-            print("데이터베이스 초기화 완료")
-        except Exception as e:
-            print(f"데이터베이스 초기화 실패: {str(e)}")
-            raise
-        
         # 기본 로고 이미지 확인 및 생성
         try:
             ensure_default_logo()
@@ -2164,6 +4088,9 @@ if __name__ == '__main__':
         except Exception as e:
             print(f"메뉴 이미지 확인 실패: {str(e)}")
             raise
+        
+        # 교체/삭제된 이미지 파일 정리
+        collect_image_files()
 
         # 서버 실행
         port = int(os.environ.get('PORT', 3000))
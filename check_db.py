@@ -33,7 +33,11 @@ def check_database():
         
         # 메뉴 데이터 확인
         print("\n=== 메뉴 데이터 ===")
-        cursor.execute("SELECT * FROM menu ORDER BY category, order_index;")
+        cursor.execute("""
+            SELECT m.*, c.name AS category
+            FROM menu m JOIN categories c ON c.id = m.category_id
+            ORDER BY c.order_index, c.id, m.order_index, m.id;
+        """)
         rows = cursor.fetchall()
         
         # 카테고리별로 데이터 정리
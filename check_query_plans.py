@@ -0,0 +1,143 @@
+import ast
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+import migrations
+
+# app.py의 SQL 쿼리 실행 계획 점검
+#
+# app.py에서 execute/executemany에 문자열 상수로 넘기는 SQL을 모두 찾아,
+# 마이그레이션을 적용하고 큰 메뉴를 채운 임시 데이터베이스에서
+# EXPLAIN QUERY PLAN을 실행한다. 인덱스 없이 테이블 전체를 읽거나
+# (SCAN <table>) 정렬/중복 제거용 임시 B-트리를 만드는 쿼리가 있으면
+# 실패로 처리한다. 의도된 전체 조회는 ALLOWED_PLANS에 이유와 함께 등록한다.
+#
+# 사용법: python check_query_plans.py [app.py 경로]
+
+# 대용량 메뉴 (카테고리 수 x 카테고리당 메뉴 수)
+SEED_CATEGORIES = 50
+SEED_ITEMS_PER_CATEGORY = 40
+SEED_IMAGES = 200
+
+# (SQL 정규식, 이유) - 정규식은 공백을 하나로 합친 SQL에 대해 검사
+ALLOWED_PLANS = [
+    (r'^SELECT id, category_id, name, price, image, temperature, order_index FROM menu$',
+     'save_menu_data: 저장 요청과 비교하기 위해 전체 메뉴를 한 번 읽음'),
+]
+
+# 실행 계획을 확인하지 않는 문장 (트랜잭션 제어, 스키마 변경 등)
+SKIPPED_PREFIXES = ('PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'CREATE', 'ALTER', 'DROP')
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(\w+)( AS \w+)?$')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE')
+
+def normalize_sql(sql):
+    return ' '.join(sql.split()).rstrip(';')
+
+def extract_queries(path):
+    """파일에서 execute/executemany 호출의 SQL 문자열 상수를 (줄 번호, SQL) 목록으로 반환"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    queries = []
+    dynamic = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        if not isinstance(node.func, ast.Attribute) or node.func.attr not in ('execute', 'executemany'):
+            continue
+        arg = node.args[0]
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            queries.append((node.lineno, normalize_sql(arg.value)))
+        else:
+            dynamic.append(node.lineno)
+    queries.sort()
+    return queries, sorted(dynamic)
+
+def seed_database(conn, path):
+    """마이그레이션 후 실제 규모보다 큰 메뉴/이미지 데이터 채우기"""
+    migrations.migrate(conn, {'image_root': os.path.join(os.path.dirname(path), 'images')})
+    conn.execute("DELETE FROM menu")
+    conn.execute("DELETE FROM categories")
+    conn.executemany(
+        "INSERT INTO categories (id, name, order_index) VALUES (?, ?, ?)",
+        [(c + 1, f'category-{c}', (c + 1) * migrations.ORDER_GAP) for c in range(SEED_CATEGORIES)]
+    )
+    conn.executemany(
+        "INSERT INTO menu (category_id, name, price, image, temperature, order_index) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (c + 1, f'menu-{c}-{i}', '1000', f'image-{(c * SEED_ITEMS_PER_CATEGORY + i) % SEED_IMAGES}.png',
+             'H', (i + 1) * migrations.ORDER_GAP)
+            for c in range(SEED_CATEGORIES)
+            for i in range(SEED_ITEMS_PER_CATEGORY)
+        ]
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO images (filename, sha256, content_type, size) VALUES (?, ?, ?, ?)",
+        [(f'image-{n}.png', f'{n:064x}', 'image/png', 1024) for n in range(SEED_IMAGES)]
+    )
+    conn.commit()
+
+def allowed_reason(sql):
+    for pattern, reason in ALLOWED_PLANS:
+        if re.search(pattern, sql):
+            return reason
+    return None
+
+def check_plan(conn, sql):
+    """문제가 되는 실행 계획 줄 목록과 전체 계획을 반환"""
+    params = [None] * sql.count('?')
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+    problems = [
+        detail for detail in plan
+        if FULL_SCAN.match(detail) or TEMP_BTREE.search(detail)
+    ]
+    return problems, plan
+
+def main(argv):
+    path = argv[1] if len(argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    queries, dynamic = extract_queries(path)
+    print(f"{path}: SQL {len(queries)}개 확인 (동적 SQL {len(dynamic)}개 건너뜀)")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'plans.db')
+        conn = sqlite3.connect(db_path)
+        try:
+            seed_database(conn, db_path)
+            failures = 0
+            checked = set()
+            for lineno, sql in queries:
+                if sql.upper().startswith(SKIPPED_PREFIXES) or sql in checked:
+                    continue
+                checked.add(sql)
+                try:
+                    problems, plan = check_plan(conn, sql)
+                except sqlite3.Error as e:
+                    print(f"\n[오류] {path}:{lineno}\n  {sql}\n  {e}")
+                    failures += 1
+                    continue
+                if not problems:
+                    continue
+                reason = allowed_reason(sql)
+                if reason:
+                    print(f"\n[허용] {path}:{lineno} - {reason}\n  {sql}")
+                    continue
+                failures += 1
+                print(f"\n[실패] {path}:{lineno}\n  {sql}")
+                for detail in plan:
+                    marker = '!!' if detail in problems else '  '
+                    print(f"  {marker} {detail}")
+        finally:
+            conn.close()
+
+    if failures:
+        print(f"\n실행 계획 점검 실패: {failures}개 쿼리")
+        return 1
+    print(f"\n실행 계획 점검 통과: {len(checked)}개 쿼리")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,98 @@
+import io
+
+from PIL import Image, ImageOps
+
+# AVIF는 Pillow 11.2 미만에서는 pillow-avif-plugin이 설치된 경우에만 사용 가능
+try:
+    import pillow_avif
+except ImportError:
+    pass
+
+from image_store import ImageStore
+
+# 업로드 이미지 변환
+#
+# 업로드된 사진을 줄이고 JPEG/WebP/AVIF로 인코딩하는 CPU 작업을 모은 모듈.
+# app.py의 이미지 처리 프로세스 풀에서 실행되므로 Flask 앱이나 데이터베이스에
+# 의존하지 않는다. 결과 파일은 워커 프로세스가 직접 이미지 저장소에 쓰고,
+# 부모 프로세스에는 해시와 크기 같은 메타데이터만 돌려준다.
+
+def open_image(source, max_pixels):
+    """바이트 또는 파일 경로의 이미지를 열고 픽셀 수 확인 (헤더만 읽고 아직 디코딩하지 않음)"""
+    img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    if img.width * img.height > max_pixels:
+        img.close()
+        raise ValueError(f"이미지 해상도가 너무 큽니다: {img.width}x{img.height}")
+    return img
+
+def variant_targets(original_width, widths, modern_formats):
+    """업로드 시 만들 (가로, 형식) 목록 - 작은 크기의 JPEG와 모든 크기의 최신 형식"""
+    targets = []
+    sizes = [width for width in widths if width < original_width] + [original_width]
+    for width in sizes:
+        if width < original_width:
+            targets.append((width, 'jpeg'))
+        targets.extend((width, fmt) for fmt in modern_formats)
+    return targets
+
+def encode_image(img, width, encoding):
+    """이미지를 가로 width로 줄여 encoding((PIL 형식, MIME 타입, 저장 옵션))의 바이트로 변환"""
+    if width < img.width:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.LANCZOS)
+    pil_format, _, params = encoding
+    output = io.BytesIO()
+    img.convert('RGB').save(output, format=pil_format, **params)
+    return output.getvalue()
+
+def encode_icon(img, width, fmt):
+    """이미지를 width x width 정사각형 아이콘(PNG 또는 16/32/48px ICO) 바이트로 변환
+
+    비율을 유지해 가운데에 놓고 남는 부분은 흰색으로 채운다. (iOS는 투명 부분을 검게 표시)
+    """
+    icon = Image.new('RGB', (width, width), '#FFFFFF')
+    source = ImageOps.contain(img.convert('RGBA'), (width, width), Image.LANCZOS)
+    icon.paste(source, ((width - source.width) // 2, (width - source.height) // 2), source)
+    output = io.BytesIO()
+    if fmt == 'ico':
+        icon.save(output, format='ICO', sizes=[(16, 16), (32, 32), (48, 48)])
+    else:
+        icon.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+def process_upload(source, image_root, max_size, max_pixels, widths, encodings, modern_formats):
+    """업로드(바이트 또는 임시 파일 경로)를 max_size 이하 JPEG 원본과 크기/형식별 변형으로 변환해 저장
+
+    반환값: {'sha256', 'content_type', 'size', 'width', 'height',
+             'variants': [(가로, 형식, 해시, MIME 타입, 바이트 수), ...]}
+    """
+    store = ImageStore(image_root)
+    with open_image(source, max_pixels) as img:
+        # JPEG는 디코딩 단계에서 1/2~1/8로 줄여 읽음 (max_size보다 작아지지는 않음)
+        img.draft('RGB', max_size)
+
+        # RGB 모드로 변환
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # 이미지 크기 조정 (최대 800x800)
+        img.thumbnail(max_size, Image.LANCZOS)
+
+        jpeg = encodings['jpeg']
+        image_data = encode_image(img, img.width, jpeg)
+        result = {
+            'sha256': store.put(image_data),
+            'content_type': jpeg[1],
+            'size': len(image_data),
+            'width': img.width,
+            'height': img.height,
+            'variants': []
+        }
+
+        # 목록 화면용 작은 크기 변형과 WebP/AVIF도 함께 저장
+        for width, fmt in variant_targets(img.width, widths, modern_formats):
+            variant = encode_image(img, width, encodings[fmt])
+            result['variants'].append(
+                (width, fmt, store.put(variant), encodings[fmt][1], len(variant))
+            )
+    return result
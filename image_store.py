@@ -0,0 +1,108 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+# 이미지 파일 저장소
+#
+# 이미지 바이트는 SHA-256 내용 주소로 <root>/<해시 앞 2자리>/<해시> 파일에
+# 저장하고, 데이터베이스(images 테이블)에는 파일명 -> 해시 등 메타데이터만
+# 둔다. 같은 내용은 한 번만 저장되며(중복 제거), 파일은 만든 뒤 수정하지
+# 않으므로 웹 서버의 sendfile로 바로 전송할 수 있다.
+
+# 파일을 해시/복사할 때 한 번에 읽는 크기
+CHUNK_SIZE = 1024 * 1024
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def file_hash(path):
+    """파일 내용을 나눠 읽으며 SHA-256 계산"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ImageStore:
+    """SHA-256 내용 주소 기반 파일 저장소"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path_for(digest))
+
+    def put(self, data):
+        """바이트를 저장하고 해시 반환 (이미 있으면 다시 쓰지 않음)"""
+        digest = content_hash(data)
+        self._write(digest, lambda f: f.write(data))
+        return digest
+
+    def put_file(self, src_path):
+        """파일 내용을 저장하고 해시 반환 - put()과 같지만 내용을 메모리에 한꺼번에 올리지 않음"""
+        digest = file_hash(src_path)
+
+        def copy(f):
+            with open(src_path, 'rb') as src:
+                shutil.copyfileobj(src, f, CHUNK_SIZE)
+
+        self._write(digest, copy)
+        return digest
+
+    def _write(self, digest, write):
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            # 정리 작업이 방금 다시 쓰인 파일을 지우지 않도록 시각 갱신
+            os.utime(path)
+            return
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # 임시 파일에 쓴 뒤 이름 변경 (읽는 쪽은 완성된 파일만 보게 됨)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read(self, digest):
+        with open(self.path_for(digest), 'rb') as f:
+            return f.read()
+
+    def iter_digests(self):
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.startswith('.tmp-'):
+                    yield name
+
+    def collect_garbage(self, referenced, grace_seconds=3600):
+        """참조되지 않는 파일 삭제 (최근에 쓰인 파일은 업로드 중일 수 있어 유예)"""
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for digest in list(self.iter_digests()):
+            if digest in referenced:
+                continue
+            path = self.path_for(digest)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
@@ -1,6 +1,8 @@
 import sqlite3
 import os
 
+import migrations
+
 def init_database():
     conn = None
     try:
@@ -13,80 +15,27 @@ def init_database():
         
         # 데이터베이스 연결
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
         
-        # 테이블이 존재하는지 확인
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='menu';")
-        table_exists = cursor.fetchone() is not None
+        # 스키마 생성 및 초기 데이터 삽입은 앱과 같은 마이그레이션 사용
+        version = migrations.migrate(conn)
+        print(f"데이터베이스 초기화 완료 (스키마 버전: {version})")
         
-        if not table_exists:
-            # 트랜잭션 시작
-            conn.execute("BEGIN TRANSACTION")
-            
-            try:
-                # 테이블 생성
-                cursor.execute('''
-                    CREATE TABLE menu (
-                        id INTEGER PRIMARY KEY,
-                        category TEXT NOT NULL,
-                        name TEXT NOT NULL,
-                        price TEXT NOT NULL,
-                        image TEXT NOT NULL,
-                        temperature TEXT,
-                        order_index INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # 초기 데이터 준비
-                initial_data = [
-                    # Coffee 카테고리
-                    (1, 'coffee', '아메리카노', '2000', 'logo.png', 'H', 0),
-                    (2, 'coffee', '아메리카노', '2000', 'logo.png', 'I', 1),
-                    (3, 'coffee', '카페라떼', '2500', 'logo.png', 'H', 2),
-                    (4, 'coffee', '카페라떼', '2500', 'logo.png', 'I', 3),
-                    
-                    # Non-Coffee 카테고리
-                    (5, 'non-coffee', '초코라떼', '3000', 'logo.png', 'H', 0),
-                    (6, 'non-coffee', '초코라떼', '3000', 'logo.png', 'I', 1),
-                    (7, 'non-coffee', '딸기라떼', '3500', 'logo.png', 'I', 2),
-                    
-                    # Dessert 카테고리
-                    (8, 'dessert', '휘낭시에', '2000', 'logo.png', '', 0),
-                    (9, 'dessert', '크로플', '3500', 'logo.png', '', 1),
-                ]
-                
-                # 데이터 삽입
-                cursor.executemany('''
-                    INSERT INTO menu (id, category, name, price, image, temperature, order_index)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', initial_data)
-                
-                # 트랜잭션 커밋
-                conn.commit()
-                print("데이터베이스 초기화 및 기본 데이터 삽입 완료")
-                
-                # 삽입된 데이터 확인
-                cursor.execute("SELECT category, name, price, temperature FROM menu ORDER BY category, order_index")
-                rows = cursor.fetchall()
-                print("\n=== 삽입된 메뉴 목록 ===")
-                for row in rows:
-                    print(f"카테고리: {row[0]}, 메뉴: {row[1]}, 가격: {row[2]}, 온도: {row[3]}")
-                    
-            except Exception as e:
-                # 오류 발생 시 롤백
-                conn.rollback()
-                raise e
-        else:
-            print("데이터베이스가 이미 존재합니다. 초기화를 건너뜁니다.")
+        # 데이터 확인
+        cursor = conn.execute("""
+            SELECT c.name, m.name, m.price, m.temperature
+            FROM menu m JOIN categories c ON c.id = m.category_id
+            ORDER BY c.order_index, c.id, m.order_index, m.id
+        """)
+        rows = cursor.fetchall()
+        print("\n=== 메뉴 목록 ===")
+        for row in rows:
+            print(f"카테고리: {row[0]}, 메뉴: {row[1]}, 가격: {row[2]}, 온도: {row[3]}")
             
     except Exception as e:
         print(f"오류 발생: {str(e)}")
-        if conn:
-            conn.close()
     finally:
         if conn:
             conn.close()
 
 if __name__ == "__main__":
-    init_database() 
\ No newline at end of file
+    init_database() 
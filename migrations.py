@@ -0,0 +1,458 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+
+from image_store import ImageStore
+
+# 데이터베이스 스키마 마이그레이션
+#
+# 스키마 변경은 모두 아래 MIGRATIONS 목록에 순서대로 등록한다.
+# 적용된 버전은 schema_version 테이블에 기록되며, 각 마이그레이션은
+# BEGIN IMMEDIATE 트랜잭션 안에서 한 번만 실행된다. (여러 워커가 동시에
+# 시작해도 SQLite 쓰기 잠금으로 직렬화된다.)
+
+_migration_lock = threading.Lock()
+
+# 정렬 키(order_index) 간격 - app.py의 이동/재배치 로직과 공유
+ORDER_GAP = 1 << 16
+
+def _column_names(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+def _create_base_tables(conn, options):
+    # 메뉴 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS menu (
+            id INTEGER PRIMARY KEY,
+            category TEXT NOT NULL,
+            name TEXT NOT NULL,
+            price TEXT NOT NULL,
+            image TEXT NOT NULL,
+            temperature TEXT,
+            order_index INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 이미지 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS images (
+            filename TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            content_type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 카테고리 순서 전용 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS category_order (
+            id INTEGER PRIMARY KEY,
+            category TEXT NOT NULL,
+            order_index INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(category)
+        )
+    ''')
+
+def _add_menu_order_index(conn, options):
+    # update_db.py 이전에 만들어진 menu 테이블에는 order_index 칼럼이 없음
+    if 'order_index' in _column_names(conn, 'menu'):
+        return
+
+    print("order_index 칼럼이 없어 추가합니다.")
+    conn.execute("ALTER TABLE menu ADD COLUMN order_index INTEGER DEFAULT 0")
+
+    # 카테고리별로 id 순서대로 order_index 부여
+    rows = conn.execute("SELECT id, category FROM menu ORDER BY id").fetchall()
+    category_indices = {}
+    updates = []
+    for item_id, category in rows:
+        index = category_indices.get(category, 0)
+        updates.append((index, item_id))
+        category_indices[category] = index + 1
+    conn.executemany("UPDATE menu SET order_index = ? WHERE id = ?", updates)
+    print(f"order_index 값 업데이트 완료: {len(updates)}개 항목")
+
+def _backfill_category_order(conn, options):
+    # category_order 테이블에 없는 기존 카테고리를 순서 테이블에 추가
+    row = conn.execute("SELECT MAX(order_index) FROM category_order").fetchone()
+    next_order = (row[0] + 1) if row[0] is not None else 0
+    rows = conn.execute('''
+        SELECT DISTINCT category FROM menu
+        WHERE category NOT IN (SELECT category FROM category_order)
+        ORDER BY category
+    ''').fetchall()
+    for offset, (category,) in enumerate(rows):
+        conn.execute(
+            "INSERT INTO category_order (category, order_index) VALUES (?, ?)",
+            (category, next_order + offset)
+        )
+    if rows:
+        print(f"{len(rows)}개 카테고리를 category_order 테이블에 추가 완료")
+
+def _seed_initial_menu(conn, options):
+    # 메뉴가 비어 있는 새 데이터베이스에만 기본 메뉴 삽입
+    if conn.execute("SELECT COUNT(*) FROM menu").fetchone()[0] > 0:
+        print("기존 데이터가 있어 초기 데이터 삽입을 건너뜁니다.")
+        return
+
+    print("데이터베이스가 비어있어 초기 데이터를 삽입합니다.")
+    conn.execute(
+        "INSERT OR IGNORE INTO category_order (category, order_index) VALUES (?, ?)",
+        ('coffee', 0)
+    )
+    conn.executemany(
+        'INSERT INTO menu (id, category, name, price, image, temperature, order_index) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [
+            (1, 'coffee', '아메리카노', '2000', 'logo.png', 'H', 0),
+            (2, 'coffee', '카페라떼', '2500', 'logo.png', 'H', 1),
+        ]
+    )
+
+def _index_menu_category_order(conn, options):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_menu_category_order ON menu (category, order_index)")
+
+def _create_app_meta(conn, options):
+    # 메뉴 데이터 버전 등 앱 전역 값 저장
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL,
+            updated_at REAL NOT NULL DEFAULT (strftime('%s', 'now'))
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('menu_version', 1)")
+
+def _sparse_order_keys(conn, options):
+    # 0..n 연속 정렬 키를 ORDER_GAP 간격으로 다시 배치 (시스템 항목 제외)
+    rows = conn.execute('''
+        SELECT id, category FROM menu
+        WHERE order_index > -900
+        ORDER BY category, order_index, id
+    ''').fetchall()
+    category_indices = {}
+    updates = []
+    for item_id, category in rows:
+        index = category_indices.get(category, 0) + 1
+        category_indices[category] = index
+        updates.append((index * ORDER_GAP, item_id))
+    conn.executemany("UPDATE menu SET order_index = ? WHERE id = ?", updates)
+
+    rows = conn.execute("SELECT id FROM category_order ORDER BY order_index, id").fetchall()
+    conn.executemany(
+        "UPDATE category_order SET order_index = ? WHERE id = ?",
+        [((index + 1) * ORDER_GAP, row[0]) for index, row in enumerate(rows)]
+    )
+
+def _normalize_categories(conn, options):
+    # 카테고리 전용 테이블 (정수 키, 이름 고유)
+    conn.execute('''
+        CREATE TABLE categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            order_index INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO categories (name, order_index)
+        SELECT category, order_index FROM category_order ORDER BY order_index
+    ''')
+
+    # category_order에 없던 카테고리는 뒤에 추가
+    row = conn.execute("SELECT MAX(order_index) FROM categories").fetchone()
+    next_order = (row[0] or 0) + ORDER_GAP
+    rows = conn.execute('''
+        SELECT DISTINCT category FROM menu
+        WHERE category NOT IN (SELECT name FROM categories)
+        ORDER BY category
+    ''').fetchall()
+    for offset, (category,) in enumerate(rows):
+        conn.execute(
+            "INSERT INTO categories (name, order_index) VALUES (?, ?)",
+            (category, next_order + offset * ORDER_GAP)
+        )
+
+    # menu.category 문자열을 category_id 외래 키로 교체 (테이블 재생성)
+    conn.execute('''
+        CREATE TABLE menu_new (
+            id INTEGER PRIMARY KEY,
+            category_id INTEGER NOT NULL REFERENCES categories (id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            price TEXT NOT NULL,
+            image TEXT NOT NULL,
+            temperature TEXT,
+            order_index INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # 빈 카테고리 유지를 위해 넣었던 시스템 항목("bariosk", "대표메뉴")은 옮기지 않음
+    cursor = conn.execute('''
+        INSERT INTO menu_new (id, category_id, name, price, image, temperature, order_index, created_at)
+        SELECT m.id, c.id, m.name, m.price, m.image, m.temperature, COALESCE(m.order_index, 0), m.created_at
+        FROM menu m JOIN categories c ON c.name = m.category
+        WHERE NOT (
+            m.name = 'bariosk'
+            OR m.order_index <= -900
+            OR (m.name = '대표메뉴' AND m.price = '0' AND m.image = 'logo.png')
+        )
+    ''')
+    print(f"메뉴 {cursor.rowcount}개 항목을 category_id 기반 테이블로 이전")
+    conn.execute("DROP TABLE menu")
+    conn.execute("ALTER TABLE menu_new RENAME TO menu")
+    conn.execute("CREATE INDEX idx_menu_category_order ON menu (category_id, order_index)")
+    conn.execute("DROP TABLE category_order")
+
+def _add_covering_indexes(conn, options):
+    # 카테고리 목록/조인은 (order_index, id) 순서로 읽고 name까지 인덱스에서 해결
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_categories_order ON categories (order_index, id, name)")
+    # 이미지 정리(ensure_menu_images)의 DISTINCT image 조회용
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_menu_image ON menu (image)")
+
+def _add_image_hashes(conn, options):
+    # 이미지 내용 해시(ETag) 칼럼 추가 후 기존 이미지 검사 및 값 채우기
+    from PIL import Image
+
+    if 'sha256' not in _column_names(conn, 'images'):
+        conn.execute("ALTER TABLE images ADD COLUMN sha256 TEXT")
+
+    updates = []
+    invalid = []
+    for filename, data, content_type in conn.execute("SELECT filename, data, content_type FROM images"):
+        # 서빙할 때는 더 이상 검사하지 않으므로 열 수 없는 이미지는 여기서 제거
+        # (요청 시 기본 이미지가 다시 생성됨)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.verify()
+                content_type = Image.MIME.get(img.format, content_type)
+        except Exception:
+            invalid.append((filename,))
+            continue
+        updates.append((hashlib.sha256(data).hexdigest(), content_type, filename))
+
+    conn.executemany("UPDATE images SET sha256 = ?, content_type = ? WHERE filename = ?", updates)
+    conn.executemany("DELETE FROM images WHERE filename = ?", invalid)
+    print(f"이미지 해시 계산 완료: {len(updates)}개, 열 수 없는 이미지 제거: {len(invalid)}개")
+
+def _image_root(conn, options):
+    # 지정하지 않으면 데이터베이스 파일 옆의 images 폴더 사용
+    if options.get('image_root'):
+        return options['image_root']
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'images')
+
+def _move_images_to_disk(conn, options):
+    # images 테이블의 BLOB을 내용 주소 파일 저장소로 옮기고 메타데이터만 남김
+    from PIL import Image
+
+    store = ImageStore(_image_root(conn, options))
+    conn.execute('''
+        CREATE TABLE images_new (
+            filename TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    rows = []
+    for filename, data, content_type, created_at in conn.execute(
+        "SELECT filename, data, content_type, created_at FROM images"
+    ):
+        digest = store.put(data)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                width, height = img.size
+        except Exception:
+            width = height = None
+        rows.append((filename, digest, content_type, len(data), width, height, created_at))
+
+    conn.executemany(
+        "INSERT INTO images_new (filename, sha256, content_type, size, width, height, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.execute("DROP TABLE images")
+    conn.execute("ALTER TABLE images_new RENAME TO images")
+    # 파일 정리 시 해시별 참조 확인용
+    conn.execute("CREATE INDEX idx_images_sha256 ON images (sha256)")
+    print(f"이미지 {len(rows)}개를 {store.root}로 이동")
+    # BLOB이 빠진 공간을 파일에서 반환 (트랜잭션 밖에서 실행)
+    options['vacuum'] = True
+
+def _create_image_variants(conn, options):
+    # 크기별 이미지 변형 (파일은 원본과 같은 내용 주소 저장소에 저장)
+    # 기존 이미지의 변형은 처음 요청될 때 만들어짐
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS image_variants (
+            filename TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            format TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (filename, width, format)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_image_variants_sha256 ON image_variants (sha256)")
+
+def _add_images_version(conn, options):
+    # 기존 파일명의 이미지가 교체될 때마다 올라가는 버전 (프로세스별 이미지 캐시 무효화용)
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('images_version', 1)")
+
+def _create_image_jobs(conn, options):
+    # 백그라운드 이미지 처리 상태 (pending -> ready/failed) - 완료되면 images에 행이 생김
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS image_jobs (
+            filename TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+
+def _create_sync_outbox(conn, options):
+    # Render 서버로 보낼 변경 (커밋과 같은 트랜잭션에서 추가, 백그라운드 작업이 순서대로 전송)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            method TEXT NOT NULL,
+            path TEXT NOT NULL,
+            body TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            locked_until REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_outbox_status ON sync_outbox (status, id)")
+
+def _create_change_log(conn, options):
+    # 메뉴/카테고리 변경 기록 (추가만 함) - 다른 서버는 seq 이후의 변경만 받아 적용
+    # change_id는 변경마다 한 번 만드는 고유 키로, 같은 변경을 두 번 적용하지 않는 데 사용
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            change_id TEXT NOT NULL UNIQUE,
+            origin TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            entity_key TEXT NOT NULL,
+            op TEXT NOT NULL,
+            data TEXT,
+            created_at REAL NOT NULL
+        )
+    ''')
+    # 동기화 대상 서버에서 마지막으로 받아 온 변경 번호
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('change_pull_seq', 0)")
+
+def _add_image_synced_hash(conn, options):
+    # 다른 서버에서 마지막으로 받아 온 내용 해시 - sha256과 다르면 로컬에서 교체한 이미지
+    # (record_image가 행을 새로 쓰면 NULL이 되므로 로컬 업로드는 자동으로 구분됨)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(images)").fetchall()]
+    if 'synced_sha256' not in columns:
+        conn.execute("ALTER TABLE images ADD COLUMN synced_sha256 TEXT")
+
+def _add_menu_sync_key(conn, options):
+    # 서버 간 메뉴 식별 키 - menu.id는 서버마다 따로 증가하므로 변경 기록에는 이 키를 씀
+    # 기존 행은 id를 그대로 키로 사용 (이전까지 id로 주고받던 변경과 호환, 새 메뉴는 uuid)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(menu)").fetchall()]
+    if 'sync_key' not in columns:
+        conn.execute("ALTER TABLE menu ADD COLUMN sync_key TEXT")
+    conn.execute("UPDATE menu SET sync_key = CAST(id AS TEXT) WHERE sync_key IS NULL")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_menu_sync_key ON menu(sync_key)")
+
+def _add_change_aliases(conn, options):
+    # 합쳐서 보낸 변경에 포함된 이전 change_id - 따로 늦게 도착해도 중복으로 처리
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(change_log)").fetchall()]
+    if 'merged_ids' not in columns:
+        conn.execute("ALTER TABLE change_log ADD COLUMN merged_ids TEXT")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_aliases (
+            change_id TEXT PRIMARY KEY
+        )
+    ''')
+
+# (버전, 설명, 함수) - 반드시 버전 순서대로 추가
+MIGRATIONS = [
+    (1, '기본 테이블 생성 (menu, images, category_order)', _create_base_tables),
+    (2, 'menu.order_index 칼럼 추가 및 값 채우기', _add_menu_order_index),
+    (3, '기존 카테고리를 category_order에 추가', _backfill_category_order),
+    (4, '초기 메뉴 데이터 삽입', _seed_initial_menu),
+    (5, 'menu (category, order_index) 인덱스 생성', _index_menu_category_order),
+    (6, 'app_meta 테이블 생성 (메뉴 데이터 버전)', _create_app_meta),
+    (7, '정렬 키를 간격 있는 값으로 재배치', _sparse_order_keys),
+    (8, 'categories 테이블 도입 및 menu.category_id 외래 키로 전환', _normalize_categories),
+    (9, 'categories 정렬/menu 이미지 커버링 인덱스 생성', _add_covering_indexes),
+    (10, 'images.sha256 내용 해시 칼럼 추가 및 기존 이미지 검사', _add_image_hashes),
+    (11, '이미지 BLOB을 내용 주소 파일 저장소로 이동', _move_images_to_disk),
+    (12, 'image_variants 테이블 생성 (크기별 이미지)', _create_image_variants),
+    (13, 'app_meta에 images_version 추가', _add_images_version),
+    (14, 'image_jobs 테이블 생성 (업로드 이미지 처리 상태)', _create_image_jobs),
+    (15, 'sync_outbox 테이블 생성 (Render 동기화 대기열)', _create_sync_outbox),
+    (16, 'change_log 테이블 생성 (변경 기록)', _create_change_log),
+    (17, 'images.synced_sha256 칼럼 추가 (이미지 동기화 기준 해시)', _add_image_synced_hash),
+    (18, 'menu.sync_key 칼럼 추가 (서버 간 메뉴 식별 키)', _add_menu_sync_key),
+    (19, 'change_aliases 테이블 생성 (합쳐진 변경 id)', _add_change_aliases),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn):
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def migrate(conn, options=None):
+    """등록된 마이그레이션 중 아직 적용되지 않은 것을 순서대로 적용하고 최종 버전을 반환"""
+    options = dict(options or {})
+    with _migration_lock:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        if current_version(conn) >= LATEST_VERSION:
+            return LATEST_VERSION
+
+        for version, description, func in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 잠금을 잡은 뒤 다시 확인 (다른 워커가 먼저 적용했을 수 있음)
+                if current_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                print(f"마이그레이션 {version} 적용: {description}")
+                func(conn, options)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        if options.pop('vacuum', False):
+            print("데이터베이스 파일 정리 (VACUUM)")
+            conn.execute("VACUUM")
+
+        return current_version(conn)
+
+def migrate_database(db_path, options=None):
+    """경로로 데이터베이스를 열어 마이그레이션 (독립 실행 스크립트용)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return migrate(conn, options)
+    finally:
+        conn.close()
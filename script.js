@@ -150,13 +150,14 @@ async function apiRequest(url, options = {}, retries = 2) {
             `API 요청: ${url} (남은 재시도: ${retries}, 타임아웃: ${REQUEST_TIMEOUT}ms)`
         );
 
+        // cache: "no-cache" - 브라우저 캐시에 저장된 응답을 ETag로 재검증
+        // (변경이 없으면 서버가 본문 없이 304로 응답)
         const response = await fetch(url, {
+            cache: "no-cache",
             ...options,
             signal: controller.signal,
             headers: {
                 "Content-Type": "application/json",
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                Pragma: "no-cache",
                 ...options.headers,
             },
         });
@@ -401,8 +402,10 @@ document.addEventListener("DOMContentLoaded", () => {
                 throw new Error(errorData.error || "메뉴 추가 실패");
             }
 
+            const result = await response.json();
             addMenuForm.reset();
             loadMenuData();
+            refreshWhenImageReady(result.image);
             alert("메뉴가 추가되었습니다.");
         } catch (error) {
             console.error("Error:", error);
@@ -438,9 +441,11 @@ document.addEventListener("DOMContentLoaded", () => {
                 throw new Error(errorData.error || "메뉴 수정 실패");
             }
 
+            const result = await response.json();
             editMenuForm.reset();
             editMenuForm.style.display = "none";
             loadMenuData();
+            refreshWhenImageReady(result.image);
             alert("메뉴가 수정되었습니다.");
         } catch (error) {
             console.error("Error:", error);
@@ -599,8 +604,6 @@ async function initializeApp() {
 
 // 서버에서 데이터 로드 함수 (초기화 시와 백그라운드 업데이트에 모두 사용)
 async function loadServerData(isInitialLoad = true) {
-    // 타임스탬프 생성 (캐시 방지)
-    const timestamp = new Date().getTime();
     console.log(
         `loadServerData 호출 (초기 로드: ${isInitialLoad}, 장치: ${
             isMobileDevice() ? "모바일" : "PC"
@@ -639,28 +642,22 @@ async function loadServerData(isInitialLoad = true) {
             // 카테고리 목록과 메뉴 데이터를 병렬로 요청 (시간 단축)
             const [categoriesResponse, menuResponse] = await Promise.all([
                 fetch(
-                    `${API_BASE_URL}/api/categories/order?t=${timestamp}&device=${
+                    `${API_BASE_URL}/api/categories/order?device=${
                         isMobileDevice() ? "mobile" : "pc"
                     }`,
                     {
-                        headers: {
-                            "Cache-Control":
-                                "no-cache, no-store, must-revalidate",
-                            Pragma: "no-cache",
-                        },
+                        // ETag 재검증 (변경이 없으면 304, 본문 재전송 없음)
+                        cache: "no-cache",
                         signal: controller.signal,
                     }
                 ),
                 fetch(
-                    `${API_BASE_URL}/api/menu?t=${timestamp}&device=${
+                    `${API_BASE_URL}/api/menu?device=${
                         isMobileDevice() ? "mobile" : "pc"
                     }`,
                     {
-                        headers: {
-                            "Cache-Control":
-                                "no-cache, no-store, must-revalidate",
-                            Pragma: "no-cache",
-                        },
+                        // ETag 재검증 (변경이 없으면 304, 본문 재전송 없음)
+                        cache: "no-cache",
                         signal: controller.signal,
                     }
                 ),
@@ -760,9 +757,7 @@ async function loadServerData(isInitialLoad = true) {
 async function loadCategories() {
     try {
         console.log("카테고리 목록 로딩 시작");
-        // 캐시 방지를 위한 타임스탬프 추가
-        const timestamp = new Date().getTime();
-        const url = `${API_BASE_URL}/api/categories/order?t=${timestamp}`;
+        const url = `${API_BASE_URL}/api/categories/order`;
         console.log(`API URL에서 카테고리 목록 로드 시도: ${url}`);
 
         // 먼저 로컬 스토리지에서 저장된 카테고리 가져오기
@@ -772,17 +767,8 @@ async function loadCategories() {
         // 서버에서 카테고리 목록 로드 시도
         let serverCategories = [];
         try {
-            // 서버에서 카테고리 목록 로드 (캐시 방지 헤더 추가)
-            const response = await apiRequest(
-                url,
-                {
-                    headers: {
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        Pragma: "no-cache",
-                    },
-                },
-                3
-            ); // 재시도 횟수 증가
+            // 서버에서 카테고리 목록 로드 (ETag 재검증)
+            const response = await apiRequest(url, {}, 3); // 재시도 횟수 증가
 
             const data = await response.json();
 
@@ -1104,6 +1090,36 @@ function getTemperatureText(temperature) {
     return "";
 }
 
+// 서버가 미리 만들어 두는 메뉴 이미지 가로 크기 (?w= 요청)
+const MENU_IMAGE_WIDTHS = [160, 320, 800];
+
+// 메뉴 타일용 srcset - 화면 크기/픽셀 밀도에 맞는 크기를 브라우저가 선택
+function getMenuImageSrcset(image) {
+    const base = `${API_BASE_URL}/api/images/${image}`;
+    return MENU_IMAGE_WIDTHS.map((width) => `${base}?w=${width} ${width}w`).join(
+        ", "
+    );
+}
+
+// 업로드한 사진은 서버에서 처리하는 동안 자리표시 이미지로 보이므로
+// 처리가 끝나면 메뉴를 다시 그림
+async function refreshWhenImageReady(image) {
+    if (!image || image === "logo.png") return;
+    try {
+        const response = await fetch(
+            `${API_BASE_URL}/api/images/${image}/status?wait=10`,
+            { cache: "no-store" }
+        );
+        if (!response.ok) return;
+        const { status } = await response.json();
+        if (status !== "pending") {
+            loadMenuData();
+        }
+    } catch (error) {
+        console.error("이미지 처리 상태 확인 실패:", error);
+    }
+}
+
 // 메뉴 데이터 로드
 async function loadMenuData() {
     try {
@@ -1178,7 +1194,7 @@ async function loadMenuData() {
 async function refreshMenuData() {
     const startTime = performance.now();
     try {
-        const url = `${API_BASE_URL}/api/menu?t=${Date.now()}`;
+        const url = `${API_BASE_URL}/api/menu`;
         console.log(`API URL에서 최신 메뉴 데이터 로드 시도: ${url}`);
 
         const response = await apiRequest(url);
@@ -1468,16 +1484,9 @@ function toggleAdminMode() {
         try {
             // 메뉴 데이터 먼저 로드
             console.log("관리자 모드 전환 후 메뉴 데이터 다시 로드 시도");
-            const timestamp = new Date().getTime();
-            const menuResponse = await fetch(
-                `${API_BASE_URL}/api/menu?t=${timestamp}`,
-                {
-                    headers: {
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        Pragma: "no-cache",
-                    },
-                }
-            );
+            const menuResponse = await fetch(`${API_BASE_URL}/api/menu`, {
+                cache: "no-cache",
+            });
 
             if (menuResponse.ok) {
                 menuData = await menuResponse.json();
@@ -1651,6 +1660,16 @@ async function handleDrop() {
     if (dragStartIndex !== dragEndIndex) {
         // 메뉴 데이터 업데이트
         const items = menuData[category];
+        if (
+            !items ||
+            dragStartIndex < 0 ||
+            dragStartIndex >= items.length ||
+            dragEndIndex < 0 ||
+            dragEndIndex >= items.length
+        ) {
+            console.warn("잘못된 드래그 위치, 메뉴 순서 변경 무시");
+            return;
+        }
         const [movedItem] = items.splice(dragStartIndex, 1);
         items.splice(dragEndIndex, 0, movedItem);
 
@@ -1667,17 +1686,32 @@ async function handleDrop() {
             items.map((item) => `${item.name} (order: ${item.order_index})`)
         );
 
-        // 변경된 데이터 저장
+        // 옮긴 메뉴 하나만 이웃 메뉴 기준으로 저장 (다음 메뉴 앞, 없으면 이전 메뉴 뒤)
+        const next = items[dragEndIndex + 1];
+        const prev = dragEndIndex > 0 ? items[dragEndIndex - 1] : undefined;
+        const anchor = next
+            ? { before: next.id }
+            : prev
+            ? { after: prev.id }
+            : null;
+        if (!anchor) {
+            // 기준이 될 이웃 메뉴가 없으면 저장할 순서 변경도 없음 - 서버 상태로 되돌림
+            await loadMenuData();
+            return;
+        }
         try {
-            const response = await fetch(`${API_BASE_URL}/api/menu`, {
-                method: "PUT",
-                headers: {
-                    "Content-Type": "application/json",
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    Pragma: "no-cache",
-                },
-                body: JSON.stringify(menuData),
-            });
+            const response = await fetch(
+                `${API_BASE_URL}/api/menu/${movedItem.id}/move`,
+                {
+                    method: "POST",
+                    headers: {
+                        "Content-Type": "application/json",
+                        "Cache-Control": "no-cache, no-store, must-revalidate",
+                        Pragma: "no-cache",
+                    },
+                    body: JSON.stringify(anchor),
+                }
+            );
 
             if (!response.ok) {
                 // 응답이 JSON이 아닐 수 있으므로 안전하게 처리
@@ -1699,6 +1733,8 @@ async function handleDrop() {
         } catch (error) {
             console.error("메뉴 순서 저장 오류:", error);
             alert("메뉴 순서 저장 중 오류가 발생했습니다: " + error.message);
+            // 저장되지 않은 순서가 화면에 남지 않도록 서버 상태로 되돌림
+            await loadMenuData();
         }
     }
 }
@@ -1733,10 +1769,12 @@ function createMenuItem(item) {
         : "";
 
     menuItem.innerHTML = `
-        <img src="${API_BASE_URL}/api/images/${item.image || "logo.png"}" 
+        <img src="${API_BASE_URL}/api/images/${item.image || "logo.png"}?w=320" 
+             srcset="${getMenuImageSrcset(item.image || "logo.png")}" 
+             sizes="(max-width: 600px) 100vw, 320px" 
              alt="${item.name}" 
              class="menu-image" 
-             onerror="this.onerror=null; this.src='${API_BASE_URL}/api/images/logo.png';" />
+             onerror="this.onerror=null; this.removeAttribute('srcset'); this.src='${API_BASE_URL}/api/images/logo.png?w=320';" />
         <div class="menu-info">
             <h3>${item.name}</h3>
             <p class="price">${item.price.toLocaleString()}원</p>
@@ -2252,18 +2290,10 @@ function applyLocalCategoryOrder() {
 async function fetchCategoryOrder() {
     try {
         console.log("서버에서 카테고리 순서 조회 시도");
-        const timestamp = new Date().getTime();
-
-        // 새로운 카테고리 순서 전용 엔드포인트 사용
-        const response = await fetch(
-            `${API_BASE_URL}/api/categories/order?t=${timestamp}`,
-            {
-                headers: {
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    Pragma: "no-cache",
-                },
-            }
-        );
+        // 새로운 카테고리 순서 전용 엔드포인트 사용 (ETag 재검증)
+        const response = await fetch(`${API_BASE_URL}/api/categories/order`, {
+            cache: "no-cache",
+        });
 
         if (!response.ok) {
             throw new Error(`서버 응답 오류: ${response.status}`);
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 다른 서버로 보내는 동기화 요청
+#
+# 서버(피어)마다 연결을 재사용하는 requests.Session을 하나씩 두고, 여러 서버에
+# 보내는 요청은 크기가 제한된 스레드 풀에서 동시에 보낸다. 전체 요청은 마감
+# 시간 안에 끝나지 않으면 기다리지 않고 결과를 'timeout'으로 돌려준다.
+# 연속으로 실패한 서버는 회로 차단기가 열려 잠시 요청을 보내지 않고, 대기 시간이
+# 지나면 요청 하나만 시험 삼아 보내(half-open) 성공해야 다시 정상 전송한다.
+
+class CircuitBreaker:
+    """서버 하나의 회로 차단기 (closed -> open -> half_open -> closed)"""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """요청을 보내도 되는지 확인 (half-open에서는 시험 요청 하나만 허용)"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            self.last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            # 시험 요청이 실패하면 대기 시간을 다시 시작
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+class SyncClient:
+    """여러 서버에 같은 요청을 동시에 보내는 클라이언트 (프로세스마다 세션/스레드 풀 생성)"""
+
+    def __init__(self, max_workers=4, timeout=8, deadline=10, failure_threshold=3, reset_timeout=30):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._sessions = {}
+        self._breakers = {}
+
+    def _ensure_process(self):
+        # fork된 워커는 부모의 스레드와 소켓을 쓸 수 없으므로 새로 만듦
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sync-client')
+            self._sessions = {}
+
+    def session(self, peer):
+        """서버별 keep-alive 세션"""
+        with self._lock:
+            self._ensure_process()
+            session = self._sessions.get(peer)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[peer] = session
+            return session
+
+    def breaker(self, peer):
+        with self._lock:
+            breaker = self._breakers.get(peer)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[peer] = breaker
+            return breaker
+
+    def _send(self, peer, method, path, timeout, **kwargs):
+        breaker = self.breaker(peer)
+        started = time.monotonic()
+        try:
+            response = self.session(peer).request(method, f"{peer}{path}", timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            breaker.record_failure(str(e))
+            return {'status': 'error', 'error': str(e), 'elapsed': round(time.monotonic() - started, 3)}
+        result = {
+            'status': 'ok' if response.status_code < 400 else 'error',
+            'status_code': response.status_code,
+            'elapsed': round(time.monotonic() - started, 3)
+        }
+        # 서버가 요청을 거절한 경우(4xx)는 서버 장애가 아니므로 차단기에 반영하지 않음
+        if response.status_code >= 500:
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        if result['status'] == 'error':
+            result['error'] = response.text[:200]
+        return result
+
+    def fan_out(self, peers, method, path, **kwargs):
+        """peers에 같은 요청을 동시에 보내고 {서버: 결과} 반환
+
+        결과 status: 'ok', 'error', 'skipped'(회로 차단기 열림), 'timeout'(마감 시간 초과)
+        kwargs는 requests의 요청 인자(json, headers 등)로 그대로 전달한다.
+        """
+        results = {}
+        futures = {}
+        started = time.monotonic()
+        timeout = min(self.timeout, self.deadline)
+        for peer in peers:
+            if not self.breaker(peer).allow():
+                results[peer] = {'status': 'skipped', 'error': self.breaker(peer).last_error}
+                continue
+            with self._lock:
+                self._ensure_process()
+                executor = self._executor
+            futures[executor.submit(self._send, peer, method, path, timeout, **kwargs)] = peer
+
+        done, _ = wait(futures, timeout=max(0, self.deadline - (time.monotonic() - started)))
+        for future, peer in futures.items():
+            # 마감 시간이 지난 요청은 백그라운드에서 끝나며 결과는 차단기에만 반영됨
+            if future not in done:
+                results[peer] = {'status': 'timeout'}
+            elif future.exception() is not None:
+                results[peer] = {'status': 'error', 'error': str(future.exception())}
+            else:
+                results[peer] = future.result()
+        return results
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            peer: {
+                'state': breaker.state,
+                'failures': breaker.failures,
+                'last_error': breaker.last_error
+            }
+            for peer, breaker in breakers.items()
+        }
@@ -1,6 +1,8 @@
 import sqlite3
 import os
 
+import migrations
+
 def update_database():
     try:
         # 데이터베이스 파일 경로
@@ -8,34 +10,21 @@ def update_database():
         
         # 데이터베이스 연결
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
         
-        # order_index 컬럼 추가
-        try:
-            cursor.execute("ALTER TABLE menu ADD COLUMN order_index INTEGER DEFAULT 0;")
-            print("order_index 컬럼 추가 완료")
-        except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e):
-                print("order_index 컬럼이 이미 존재합니다")
-            else:
-                raise
+        # 적용되지 않은 마이그레이션 실행 (order_index 칼럼 추가 등)
+        before = migrations.current_version(conn) if conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='schema_version'"
+        ).fetchone() else 0
+        version = migrations.migrate(conn)
+        print(f"스키마 버전: {before} -> {version}")
         
-        # 기존 데이터의 order_index 업데이트
+        # 업데이트된 데이터 확인
+        cursor = conn.cursor()
         cursor.execute("""
-            UPDATE menu 
-            SET order_index = (
-                SELECT COUNT(*) 
-                FROM menu m2 
-                WHERE m2.category = menu.category 
-                AND m2.id <= menu.id
-            ) - 1;
+            SELECT c.name, m.name, m.order_index
+            FROM menu m JOIN categories c ON c.id = m.category_id
+            ORDER BY c.order_index, c.id, m.order_index, m.id;
         """)
-        
-        conn.commit()
-        print("order_index 값 업데이트 완료")
-        
-        # 업데이트된 데이터 확인
-        cursor.execute("SELECT category, name, order_index FROM menu ORDER BY category, order_index;")
         rows = cursor.fetchall()
         print("\n=== 업데이트된 메뉴 순서 ===")
         for row in rows:
@@ -50,4 +39,4 @@ def update_database():
             conn.close()
 
 if __name__ == "__main__":
-    update_database() 
\ No newline at end of file
+    update_database() 